@@ -25,12 +25,77 @@ class Settings(BaseSettings):
     MONGODB_PASSWORD: str
     MONGODB_AUTH_SOURCE: str = "admin"
 
+    # Monitoramento de consultas lentas
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_LOG_SIZE: int = 500
+    SLOW_QUERY_EXPLAIN: bool = True
+
+    # Profiling sob demanda (?__profile=1 ou header X-Profile: 1, com API token)
+    PROFILING_ENABLED: bool = True
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILING_MAX_STORED: int = 20
+
+    # Predição em lote
+    PREDICTION_BATCH_MAX_ROWS: int = 10000
+
+    # Micro-lotes de inferência (requisições concorrentes avaliadas juntas)
+    INFERENCE_MAX_BATCH_SIZE: int = 64
+    INFERENCE_MAX_WAIT_MS: float = 2.0
+
+    # Cache LRU de predições (0 desativa)
+    PREDICTION_CACHE_SIZE: int = 4096
+
+    # Auditoria das predições em ai_requests, gravada em lotes por um worker
+    AUDIT_ENABLED: bool = True
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_MS: float = 1000.0
+    AUDIT_QUEUE_MAX_SIZE: int = 10000
+    # Espera máxima por espaço na fila cheia antes de descartar o registro
+    AUDIT_ENQUEUE_TIMEOUT_MS: float = 50.0
+
+    # Carregamento do modelo: no startup (com warm-up) ou na primeira predição
+    MODEL_LOAD_ON_STARTUP: bool = True
+    # Registro de versões do modelo; MODEL_VERSION vazio usa a versão ativa
+    MODEL_REGISTRY_DIR: str = "model/registry"
+    MODEL_VERSION: str = ""
+    # Intervalo com que cada worker confere o ACTIVE do registro para seguir uma troca feita em outro (0 desliga)
+    MODEL_ACTIVE_CHECK_INTERVAL_S: float = 5.0
+    # Artefatos compilados (.npy) abertos com mmap e compartilhados entre workers
+    MODEL_ARTIFACTS_DIR: str = "model/compiled"
+    MODEL_MMAP: bool = True
+
+    # Floresta compilada em arrays NumPy (usada até COMPILED_FOREST_MAX_ROWS linhas)
+    COMPILED_FOREST_ENABLED: bool = True
+    COMPILED_FOREST_MAX_ROWS: int = 512
+    COMPILED_FOREST_VERIFY_ROWS: int = 2000
+
+    # Seeding dos CSVs: linhas por bloco e threads de escrita no MongoDB
+    SEED_CHUNK_SIZE: int = 5000
+    SEED_WRITERS: int = 4
+
+    # Pipeline de seeding: etapas em paralelo e snapshots da collection mesclada
+    # (vazio = mongo-seeders/snapshots), mantendo os SEED_SNAPSHOTS_TO_KEEP mais recentes
+    SEED_PIPELINE_WORKERS: int = 3
+    SEED_SNAPSHOT_DIR: str = ""
+    SEED_SNAPSHOTS_TO_KEEP: int = 3
+
+    # Leitura dos CSVs: cache por hash do arquivo (vazio = .cache ao lado dos CSVs),
+    # processos de leitura (0 = núcleos disponíveis) e leitor do pandas (c ou pyarrow)
+    CSV_CACHE_ENABLED: bool = True
+    CSV_CACHE_DIR: str = ""
+    CSV_PARSE_WORKERS: int = 0
+    CSV_ENGINE: str = "c"
+
     # Configurações de CORS
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:8000"]
 
     # Configurações de logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/app.log"
+    # Envia as mensagens para uma fila consumida por uma thread de background
+    LOG_ENQUEUE: bool = True
+    # Fração das requisições registradas no access log (erros 5xx sempre são)
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
 
     @property
     def mongodb_connection_string(self) -> str:
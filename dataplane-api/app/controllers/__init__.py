@@ -1,5 +1,7 @@
 from .ai_controller import ai_router
 from .health_controller import health_router
 from .ocurrence_controller import ocurrence_router
+from .metrics_controller import metrics_router
+from .admin_controller import admin_router
 
-__all__ = ["ai_router", "health_router", "ocurrence_router"] 
\ No newline at end of file
+__all__ = ["ai_router", "health_router", "ocurrence_router", "metrics_router", "admin_router"] 
\ No newline at end of file
@@ -0,0 +1,161 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from app.middleware.api_token import verify_api_token
+from app.models.monitoring import slow_query_log
+from app.services.ai_service import ai_service
+from app.utils.profiler import profile_store
+from app.utils.allocation_profiler import allocation_tracker
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(verify_api_token)]
+)
+
+
+@admin_router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(default=100, ge=1, le=1000, description="Número máximo de entradas recentes")
+):
+    """
+    Retorna o log de consultas lentas do MongoDB
+    
+    - **entries**: comandos acima de SLOW_QUERY_THRESHOLD_MS, do mais recente ao mais antigo
+    - **shapes**: agregado por formato de filtro (valores omitidos), com o resumo do
+      `explain('executionStats')` capturado na primeira ocorrência de cada formato
+    """
+    return slow_query_log.report(limit=limit)
+
+
+@admin_router.delete("/slow-queries")
+async def clear_slow_queries():
+    """Limpa o log de consultas lentas"""
+    slow_query_log.clear()
+    return {"message": "Log de consultas lentas limpo"}
+
+
+@admin_router.get("/profiles")
+async def list_profiles():
+    """
+    Lista os profiles de requisições armazenados
+    
+    Para gerar um profile, repita a requisição com `?__profile=1` (ou o header
+    `X-Profile: 1`) e o API token; o id volta no header `X-Profile-Id`.
+    """
+    return {"profiles": profile_store.list()}
+
+
+@admin_router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """
+    Retorna as pilhas amostradas no formato folded
+    
+    Compatível com flamegraph.pl, speedscope e inferno, ex:
+    `curl ... | flamegraph.pl > profile.svg`
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' não encontrado")
+    return PlainTextResponse(profile["folded"])
+
+
+@admin_router.delete("/profiles")
+async def clear_profiles():
+    """Remove os profiles armazenados"""
+    profile_store.clear()
+    return {"message": "Profiles removidos"}
+
+
+@admin_router.post("/tracemalloc/start")
+async def start_allocation_tracking(
+    nframes: int = Query(default=10, ge=1, le=100, description="Profundidade das pilhas registradas"),
+    requests: int = Query(default=0, ge=0, description="Tira o snapshot automaticamente após N requisições (0 = manual)")
+):
+    """
+    Inicia o tracemalloc e tira o snapshot inicial
+    
+    Com `requests=N`, o segundo snapshot é tirado ao fim da N-ésima requisição
+    não administrativa; sem ele, use `POST /admin/tracemalloc/snapshot`.
+    Enquanto ativo, o tracemalloc deixa as alocações mais lentas.
+    """
+    await run_in_threadpool(allocation_tracker.start, nframes, requests)
+    return allocation_tracker.status()
+
+
+@admin_router.post("/tracemalloc/snapshot")
+async def take_allocation_snapshot():
+    """Tira manualmente o snapshot comparado com o inicial"""
+    try:
+        await run_in_threadpool(allocation_tracker.snapshot)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return allocation_tracker.status()
+
+
+@admin_router.get("/tracemalloc/report")
+async def get_allocation_report(
+    limit: int = Query(default=20, ge=1, le=200, description="Número de pontos de alocação"),
+    group_by: str = Query(default="lineno", pattern="^(lineno|filename|traceback)$", description="Agrupamento das alocações")
+):
+    """
+    Retorna os pontos de alocação que mais cresceram entre os snapshots
+    
+    Sem snapshot final, compara o inicial com o estado atual.
+    """
+    try:
+        return await run_in_threadpool(allocation_tracker.report, limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@admin_router.post("/tracemalloc/stop")
+async def stop_allocation_tracking():
+    """Para o tracemalloc e descarta os snapshots"""
+    await run_in_threadpool(allocation_tracker.stop)
+    return allocation_tracker.status()
+
+
+@admin_router.get("/models")
+async def list_model_versions():
+    """
+    Lista as versões do registro de modelos
+    
+    Inclui a versão servida no momento e o estado da última troca de versão.
+    """
+    return {
+        "current_version": ai_service.model_version,
+        "active_version": ai_service.registry.active_version(),
+        "reload": ai_service.reload_status,
+        "versions": ai_service.registry.list_versions(),
+    }
+
+
+@admin_router.post("/models/{version}/load", status_code=202)
+async def load_model_version(version: str, background_tasks: BackgroundTasks):
+    """
+    Carrega uma versão do registro em background e a coloca em produção
+    
+    O novo modelo é carregado e aquecido enquanto o atual continua
+    respondendo; a troca é atômica e as requisições em andamento terminam
+    com a versão com que começaram. Acompanhe por `GET /admin/models`.
+
+    A troca é feita no worker que recebeu a requisição; os demais workers
+    a seguem pelo ACTIVE do registro em até MODEL_ACTIVE_CHECK_INTERVAL_S
+    (mais o tempo de carga), e até lá respondem com a versão anterior.
+    """
+    try:
+        manifest = ai_service.registry.get_manifest(version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Versão '{version}' não encontrada no registro")
+    if ai_service.reload_status.get("state") == "loading":
+        raise HTTPException(
+            status_code=409,
+            detail=f"A versão '{ai_service.reload_status['version']}' ainda está sendo carregada"
+        )
+    ai_service.reload_status = {"state": "loading", "version": version}
+    # Função síncrona: o FastAPI a executa no threadpool depois de responder
+    background_tasks.add_task(ai_service.load_version, version)
+    return {"message": f"Carregando a versão '{version}'", "reload": ai_service.reload_status}
@@ -1,7 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from app.services.ai_service import ai_service, AIService
-from app.models.schemas import PredictionRequest, PredictionResponse
-from typing import Dict, List
+from app.services.inference_batcher import inference_batcher
+from app.services.audit_writer import audit_writer, prediction_record
+from app.services.prediction_history_service import PredictionHistoryService
+from app.models.schemas import (
+    PredictionRequest,
+    PredictionResponse,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    PredictionHistoryResponse,
+    PredictionStatsResponse,
+)
+from app.config.settings import settings
+from app.utils.metrics import PREDICTION_DURATION
+from typing import Dict, List, Optional
 
 ai_router = APIRouter()
 
@@ -11,17 +25,92 @@ async def predict_damage(
     service: AIService = Depends(lambda: ai_service)
 ):
     try:
-        prediction_data = service.predict(request.dict())
-        return prediction_data
+        start_time = time.perf_counter()
+        inputs = request.dict()
+        # A inferência roda no executor dedicado, agrupada em micro-lotes
+        prediction_data = await inference_batcher.predict(inputs)
+        latency = time.perf_counter() - start_time
+        PREDICTION_DURATION.labels("predict").observe(latency)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # Registro de auditoria gravado em lote pelo worker, fora do caminho da resposta
+    await audit_writer.record(prediction_record("predict", inputs, prediction_data, latency))
+    return prediction_data
+
+@ai_router.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_damage_batch(
+    request: BatchPredictionRequest,
+    service: AIService = Depends(lambda: ai_service)
+):
+    """
+    Prediz o nível de dano para vários cenários numa única chamada ao modelo
+    
+    Linhas com categorias desconhecidas voltam com `error` preenchido, sem
+    afetar as demais. Limite de linhas: PREDICTION_BATCH_MAX_ROWS.
+    """
+    if len(request.rows) > settings.PREDICTION_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"O lote excede o limite de {settings.PREDICTION_BATCH_MAX_ROWS} linhas"
+        )
+    try:
+        start_time = time.perf_counter()
+        rows = [row.dict() for row in request.rows]
+        results = await inference_batcher.predict_many(rows)
+        latency = time.perf_counter() - start_time
+        PREDICTION_DURATION.labels("predict_batch").observe(latency)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await audit_writer.record_many([
+        prediction_record("predict_batch", row, result, latency, batch_size=len(rows))
+        for row, result in zip(rows, results)
+    ])
+
+    failed = sum(1 for result in results if result["error"] is not None)
+    return {
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        # O lote inteiro é avaliado pelo mesmo bundle
+        "model_version": results[0]["model_version"],
+        "results": results
+    }
 
 @ai_router.get("/predict/form-options", response_model=Dict[str, List[str]])
 async def get_form_options(
     service: AIService = Depends(lambda: ai_service)
 ):
-    options = {}
-    for feature, encoder in service.label_encoders.items():
-        # Excluindo valores '<NA>' ou '***' que podem estar nos encoders
-        options[feature] = [cls for cls in encoder.classes_ if cls not in ['<NA>', '***']]
-    return options 
\ No newline at end of file
+    # Pré-calculado no carregamento do modelo (sem '<NA>' e '***');
+    # na primeira chamada o modelo ainda é carregado, fora do event loop
+    if not service.loaded:
+        return await run_in_threadpool(service.get_form_options)
+    return service.get_form_options()
+
+@ai_router.get("/predict/history", response_model=PredictionHistoryResponse)
+async def get_prediction_history(
+    limit: int = Query(default=50, ge=1, le=500, description="Número máximo de registros por página"),
+    cursor: Optional[str] = Query(default=None, description="`next_cursor` da página anterior"),
+    model_version: Optional[str] = Query(default=None, description="Filtra por versão do modelo")
+):
+    """
+    Predições registradas, da mais recente para a mais antiga
+
+    A paginação é por cursor: passe o `next_cursor` da resposta para obter a
+    próxima página. O custo de cada página não depende de quantas vieram antes.
+    """
+    try:
+        return await PredictionHistoryService.get_history(limit, cursor, model_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@ai_router.get("/predict/history/stats", response_model=PredictionStatsResponse)
+async def get_prediction_stats(
+    hours: int = Query(default=24, ge=1, le=24 * 90, description="Janela, em horas, até agora"),
+    model_version: Optional[str] = Query(default=None, description="Filtra por versão do modelo")
+):
+    """
+    Distribuição das predições, histograma de confiança e percentis de
+    latência na janela, calculados a partir dos buckets por hora mantidos
+    pelo gravador de auditoria (ai_requests_hourly)
+    """
+    return await PredictionHistoryService.get_stats(hours, model_version)
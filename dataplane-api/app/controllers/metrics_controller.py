@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils.metrics import REGISTRY
+
+metrics_router = APIRouter(tags=["metrics"])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Expõe as métricas da aplicação no formato texto do Prometheus"""
+    return PlainTextResponse(
+        REGISTRY.expose(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from app.services.ocurrence_service import OcurrenceService
 from app.services.merged_ocurrence_service import MergedOcurrenceService
 from app.services.filter_options_service import FilterOptionsService
 from app.utils.logger import app_logger
+from app.utils.timing import timed, get_timing
 
 
 ocurrence_router = APIRouter(prefix="/ocurrence", tags=["ocurrence"])
@@ -33,7 +36,10 @@ async def get_ocurrences_coordinates(
     
     # Filtros de data
     date_start: Optional[str] = Query(default=None, description="Data inicial (formato YYYY-MM-DD)"),
-    date_end: Optional[str] = Query(default=None, description="Data final (formato YYYY-MM-DD)")
+    date_end: Optional[str] = Query(default=None, description="Data final (formato YYYY-MM-DD)"),
+
+    # Diagnóstico
+    debug_timing: bool = Query(default=False, description="Se True, inclui no corpo da resposta o tempo de cada fase (ms)")
 ):
     """
     Busca ocorrências com coordenadas válidas com filtros customizados
@@ -41,6 +47,10 @@ async def get_ocurrences_coordinates(
     - **limit**: Número máximo de ocorrências para retornar (1-20000)
     - **skip**: Número de ocorrências para pular (paginação)  
     - **complete**: Se True, retorna dados COMPLETOS da collection mesclada
+    - **debug_timing**: Se True, inclui o bloco `timings` com a duração de cada fase
+    
+    O header `Server-Timing` sempre traz as fases `db_find`, `db_count`,
+    `transform`, `db_stats` (apenas com complete=true) e `serialize`.
     
     ### Filtros disponíveis:
     - **Básicos**: states, cities, classifications, countries, date_start, date_end
@@ -88,7 +98,8 @@ async def get_ocurrences_coordinates(
             )
             
             # Obtém estatísticas
-            stats = await MergedOcurrenceService.get_merged_stats()
+            with timed("db_stats"):
+                stats = await MergedOcurrenceService.get_merged_stats()
             
             response = {
                 "total": total,
@@ -134,7 +145,14 @@ async def get_ocurrences_coordinates(
             }
         
         app_logger.info(f"Retornando {len(ocurrences)} ocorrências de um total de {total}")
-        return response
+        
+        timing = get_timing()
+        if debug_timing and timing is not None:
+            response["timings"] = timing.as_dict()
+        
+        # Serializa aqui para que o tempo de encoding entre no Server-Timing
+        with timed("serialize"):
+            return JSONResponse(content=jsonable_encoder(response))
         
     except Exception as e:
         app_logger.error(f"Erro ao buscar coordenadas de ocorrências: {e}")
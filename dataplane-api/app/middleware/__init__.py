@@ -1,4 +1,7 @@
 from .logging import LoggingMiddleware
+from .metrics import MetricsMiddleware
+from .server_timing import ServerTimingMiddleware
+from .profiling import ProfilingMiddleware
 from .cors import setup_cors
 
-__all__ = ["setup_cors", "LoggingMiddleware"] 
\ No newline at end of file
+__all__ = ["setup_cors", "LoggingMiddleware", "MetricsMiddleware", "ServerTimingMiddleware", "ProfilingMiddleware"] 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import secrets
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config.settings import settings
@@ -5,12 +6,16 @@ from app.config.settings import settings
 # Instância do esquema de segurança
 security = HTTPBearer()
 
+def is_valid_api_token(token: str) -> bool:
+    """Compara o token recebido com o token das configurações em tempo constante"""
+    return secrets.compare_digest(token.encode("utf-8"), settings.API_TOKEN.encode("utf-8"))
+
 async def verify_api_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Dependência para verificar o API token.
     Usa o HTTPBearer para extrair o token e o compara com o token das configurações.
     """
-    if credentials.credentials != settings.API_TOKEN:
+    if not is_valid_api_token(credentials.credentials):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API token inválido",
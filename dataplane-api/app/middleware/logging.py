@@ -1,33 +1,55 @@
+import random
 import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config.settings import settings
 from app.utils.logger import app_logger
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware para logging de requisições HTTP"""
-    
-    async def dispatch(self, request: Request, call_next):
+class LoggingMiddleware:
+    """
+    Middleware ASGI puro para access log de requisições HTTP.
+
+    Não usa BaseHTTPMiddleware: a resposta passa direto para o servidor
+    (sem task extra nem buffering), o que mantém respostas em streaming
+    intactas. Emite uma única linha por requisição, com amostragem
+    configurável via ACCESS_LOG_SAMPLE_RATE; erros 5xx são sempre logados.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = None):
+        self.app = app
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Tempo de início
-        start_time = time.time()
-        
-        # Log da requisição
-        app_logger.info(f"Requisição iniciada: {request.method} {request.url}")
-        
-        # Processa a requisição
-        response = await call_next(request)
-        
-        # Calcula o tempo de processamento
-        process_time = time.time() - start_time
-        
-        # Log da resposta
-        app_logger.info(
-            f"Requisição finalizada: {request.method} {request.url} - "
-            f"Status: {response.status_code} - "
-            f"Tempo: {process_time:.4f}s"
-        )
-        
-        # Adiciona header com tempo de processamento
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response 
\ No newline at end of file
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Adiciona header com tempo de processamento
+                process_time = time.perf_counter() - start_time
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", str(process_time).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            process_time = time.perf_counter() - start_time
+            if status_code >= 500 or self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+                path = scope.get("path", "")
+                query_string = scope.get("query_string", b"")
+                if query_string:
+                    path = f"{path}?{query_string.decode('latin-1')}"
+                app_logger.info(
+                    f"{scope.get('method', '-')} {path} - "
+                    f"Status: {status_code} - "
+                    f"Tempo: {process_time:.4f}s"
+                )
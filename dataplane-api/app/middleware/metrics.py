@@ -0,0 +1,51 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.metrics import (
+    HTTP_REQUESTS_TOTAL,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    HTTP_RESPONSE_SIZE,
+)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro que alimenta as métricas HTTP expostas em /metrics.
+
+    O label de rota usa o template da rota (ex: /api/v1/ocurrence/coordinates),
+    nunca o path bruto, para manter a cardinalidade limitada.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            duration = time.perf_counter() - start_time
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            method = scope.get("method", "-")
+            status = str(status_code)
+            HTTP_REQUESTS_TOTAL.labels(method, route_path, status).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_path, status).observe(duration)
+            HTTP_RESPONSE_SIZE.labels(method, route_path).observe(response_size)
@@ -0,0 +1,121 @@
+import time
+from urllib.parse import parse_qsl
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config.settings import settings
+from app.middleware.api_token import is_valid_api_token
+from app.utils.profiler import StackSampler, profile_store
+from app.utils.allocation_profiler import allocation_tracker
+from app.utils.logger import app_logger
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI puro que executa uma única requisição sob o profiler
+    por amostragem quando pedido com `?__profile=1` ou `X-Profile: 1`.
+
+    Exige o API token no header Authorization. O profile fica guardado em
+    memória e o id volta no header `X-Profile-Id`; o conteúdo (formato
+    folded, para flame graph) é obtido em /api/v1/admin/profiles/{id}.
+    Requisições sem o marcador seguem direto, sem custo adicional.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._authorized(scope):
+            response = JSONResponse(
+                {"detail": "API token inválido"},
+                status_code=401,
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+            await response(scope, receive, send)
+            return
+
+        status_code = 500
+        sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+        profile_id = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, profile_id
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # O profile cobre o processamento até o início da resposta
+                profile_id = self._store(scope, sampler, status_code, time.perf_counter() - start_time)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile_id is None:
+                self._store(scope, sampler, status_code, time.perf_counter() - start_time)
+
+    @staticmethod
+    def _store(scope: Scope, sampler: StackSampler, status_code: int, duration: float) -> str:
+        folded = sampler.stop()
+        return profile_store.add(
+            method=scope.get("method", "-"),
+            path=scope.get("path", ""),
+            status_code=status_code,
+            duration=duration,
+            samples=sampler.samples,
+            folded=folded
+        )
+
+    @staticmethod
+    def _profiling_requested(scope: Scope) -> bool:
+        query_string = scope.get("query_string", b"")
+        if b"__profile=" in query_string:
+            params = dict(parse_qsl(query_string.decode("latin-1")))
+            if params.get("__profile") in ("1", "true"):
+                return True
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                return value in (b"1", b"true")
+        return False
+
+    @staticmethod
+    def _authorized(scope: Scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                return scheme.lower() == "bearer" and is_valid_api_token(token.strip())
+        return False
+
+
+class AllocationTrackingMiddleware:
+    """
+    Middleware ASGI puro que conta as requisições concluídas enquanto o
+    rastreador de alocações (tracemalloc) aguarda N requisições, e tira o
+    snapshot na N-ésima, no threadpool. Fica ativo mesmo com o profiling
+    sob demanda desligado; sem contagem pendente, só lê um booleano.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Requisições administrativas não entram na contagem do tracemalloc
+        self.admin_prefix = f"{settings.API_V1_STR}/admin"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not allocation_tracker.counting:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if not scope.get("path", "").startswith(self.admin_prefix) and allocation_tracker.on_request_finished():
+                # take_snapshot percorre todas as alocações rastreadas: fora do event loop
+                await run_in_threadpool(allocation_tracker.snapshot)
+                app_logger.info(f"Snapshot de alocações tirado após {allocation_tracker.seen_requests} requisições")
@@ -0,0 +1,33 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.timing import start_timing
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI puro que adiciona o header Server-Timing às respostas.
+
+    As fases são registradas pelos serviços e controllers via
+    ``app.utils.timing.timed``; o middleware acrescenta a fase ``total``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        timing = start_timing()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                header = timing.header_value(total=time.perf_counter() - start_time)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", header.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,7 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 from typing import Optional
 from app.config.settings import settings
 from app.utils.logger import app_logger
+from app.models.monitoring import command_listener
 from datetime import datetime
 import asyncio
 
@@ -20,8 +22,9 @@ class MongoDB:
             connection_string = settings.mongodb_connection_string
             app_logger.info(f"Conectando ao MongoDB: {connection_string.replace(settings.MONGODB_PASSWORD or '', '***') if settings.MONGODB_PASSWORD else connection_string}")
             
-            self.client = AsyncIOMotorClient(connection_string)
+            self.client = AsyncIOMotorClient(connection_string, event_listeners=[command_listener])
             self.database = self.client[settings.MONGODB_DB]
+            command_listener.bind(self.database, asyncio.get_running_loop())
             
             # Testa a conexão
             await self.client.admin.command('ping')
@@ -77,10 +80,37 @@ async def save_ai_request(collection, ai_request_data: dict):
         raise
 
 
-async def get_ai_requests_history(collection, limit: int = 50, skip: int = 0):
-    """Obtém histórico de requisições de IA"""
+async def save_ai_requests(collection, ai_requests_data: list) -> int:
+    """
+    Salva várias requisições de IA com um único insert_many não ordenado.
+    Retorna quantos documentos foram gravados: um documento com erro não
+    impede a gravação dos demais.
+    """
     try:
-        cursor = collection.find().sort("created_at", -1).skip(skip).limit(limit)
+        result = await collection.insert_many(ai_requests_data, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        app_logger.error(f"Erro ao salvar parte das requisições de IA: {e.details.get('writeErrors', [])[:3]}")
+        return e.details.get("nInserted", 0)
+
+
+async def get_ai_requests_history(collection, limit: int = 50, before=None, query: Optional[dict] = None):
+    """
+    Obtém histórico de requisições de IA, da mais recente para a mais antiga
+
+    `before` é a posição (created_at, _id) do último item já entregue: a
+    consulta continua a partir dela pelo índice (created_at, _id), em vez de
+    pular documentos com skip.
+    """
+    try:
+        query = dict(query or {})
+        if before is not None:
+            created_at, document_id = before
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": document_id}},
+            ]
+        cursor = collection.find(query).sort([("created_at", -1), ("_id", -1)]).limit(limit)
         documents = await cursor.to_list(length=limit)
         return documents
     except Exception as e:
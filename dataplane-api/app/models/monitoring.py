@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import monitoring
+from app.config.settings import settings
+from app.utils.logger import app_logger
+from app.utils.metrics import MONGO_COMMAND_DURATION
+
+
+# Comandos cujo plano pode ser obtido com explain
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# Campos de sessão/protocolo que não podem ir dentro de um explain
+_INTERNAL_COMMAND_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "cursor"}
+
+
+def redact_shape(value: Any) -> Any:
+    """
+    Substitui os valores de um filtro/pipeline por '?', mantendo campos e
+    operadores. Listas viram uma única posição para que `$in` com
+    quantidades diferentes de valores tenha o mesmo formato.
+    """
+    if isinstance(value, dict):
+        return {key: redact_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact_shape(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def _command_shape(command_name: str, command: dict) -> dict:
+    shape = {"command": command_name, "collection": command.get(command_name)}
+    for field in ("filter", "query", "pipeline", "sort", "key"):
+        if field in command:
+            shape[field] = command[field] if field == "key" else redact_shape(command[field])
+    if "projection" in command:
+        shape["projection"] = sorted(command["projection"].keys())
+    return shape
+
+
+def _docs_returned(command_name: str, reply: dict) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        if batch is not None:
+            return len(batch)
+    if command_name == "count":
+        return reply.get("n")
+    if command_name == "distinct":
+        return len(reply.get("values", []))
+    return None
+
+
+def _find_key(document: Any, key: str) -> Optional[Any]:
+    """Busca recursivamente a primeira ocorrência de uma chave no explain"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        for value in document.values():
+            found = _find_key(value, key)
+            if found is not None:
+                return found
+    elif isinstance(document, list):
+        for item in document:
+            found = _find_key(item, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _plan_stages(plan: Optional[dict]) -> List[str]:
+    stages = []
+    while isinstance(plan, dict):
+        stage = plan.get("stage")
+        if stage:
+            stages.append(f"{stage}({plan['indexName']})" if plan.get("indexName") else stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Resume o resultado de um explain('executionStats')"""
+    stats = _find_key(explain, "executionStats") or {}
+    winning_plan = _find_key(explain, "winningPlan")
+    if isinstance(winning_plan, dict) and "queryPlan" in winning_plan:
+        winning_plan = winning_plan["queryPlan"]
+    stages = _plan_stages(winning_plan)
+    return {
+        "winning_plan": stages,
+        "uses_collection_scan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_returned": stats.get("nReturned"),
+        "execution_time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class SlowQueryLog:
+    """
+    Registro em memória dos comandos lentos do MongoDB.
+
+    Guarda as últimas entradas num buffer circular e, por formato de
+    filtro, contagem, tempos e o resumo do explain capturado.
+    """
+
+    def __init__(self, max_entries: int):
+        self.entries = deque(maxlen=max_entries)
+        self.shapes: Dict[str, dict] = {}
+
+    def record(self, shape_id: str, shape: dict, duration_ms: float, docs_returned: Optional[int]) -> bool:
+        """Registra um comando lento; retorna True se o formato é novo"""
+        new_summary = {
+            "shape": shape,
+            "count": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "first_seen": datetime.utcnow(),
+            "explain": None,
+        }
+        summary = self.shapes.setdefault(shape_id, new_summary)
+        summary["count"] += 1
+        summary["total_ms"] += duration_ms
+        summary["max_ms"] = max(summary["max_ms"], duration_ms)
+        self.entries.append({
+            "timestamp": datetime.utcnow(),
+            "shape_id": shape_id,
+            "collection": shape.get("collection"),
+            "command": shape.get("command"),
+            "duration_ms": round(duration_ms, 3),
+            "docs_returned": docs_returned,
+        })
+        return summary is new_summary
+
+    def set_explain(self, shape_id: str, explain_summary: dict):
+        if shape_id in self.shapes:
+            self.shapes[shape_id]["explain"] = explain_summary
+
+    def report(self, limit: int = 100) -> dict:
+        entries = list(self.entries)[-limit:][::-1]
+        for entry in entries:
+            explain = self.shapes.get(entry["shape_id"], {}).get("explain") or {}
+            entry["docs_examined"] = explain.get("docs_examined")
+        shapes = [
+            {"shape_id": shape_id, **summary, "avg_ms": round(summary["total_ms"] / summary["count"], 3)}
+            for shape_id, summary in list(self.shapes.items())
+        ]
+        shapes.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "entries": entries,
+            "shapes": shapes,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.shapes.clear()
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Listener de comandos do pymongo que registra a duração de cada comando
+    por collection e operação e alimenta o log de consultas lentas.
+
+    Os callbacks rodam nas threads do executor do motor, por isso só
+    fazem operações baratas e sem locks; o explain dos formatos novos é
+    agendado no event loop.
+    """
+
+    def __init__(self, slow_query_log: SlowQueryLog):
+        self._pending = {}
+        self.slow_query_log = slow_query_log
+        self._database = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, database, loop: asyncio.AbstractEventLoop):
+        """Associa o listener ao banco e ao event loop usados para o explain"""
+        self._database = database
+        self._loop = loop
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else "-"
+        command = event.command if event.command_name in EXPLAINABLE_COMMANDS else None
+        self._pending[(event.connection_id, event.request_id)] = (collection, command)
+
+    def _finish(self, event, outcome: str, reply: Optional[dict] = None):
+        collection, command = self._pending.pop((event.connection_id, event.request_id), ("-", None))
+        duration = event.duration_micros / 1_000_000
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name, outcome).observe(duration)
+
+        duration_ms = duration * 1000
+        if command is None or duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+
+        shape = _command_shape(event.command_name, command)
+        shape_key = json.dumps(shape, sort_keys=True, default=str)
+        shape_id = hashlib.sha1(shape_key.encode("utf-8")).hexdigest()[:12]
+        docs_returned = _docs_returned(event.command_name, reply or {})
+        is_new = self.slow_query_log.record(shape_id, shape, duration_ms, docs_returned)
+        app_logger.warning(
+            f"Consulta lenta ({duration_ms:.1f} ms) em {collection}.{event.command_name} "
+            f"[{shape_id}] - retornados: {docs_returned} - formato: {shape_key}"
+        )
+        if is_new and settings.SLOW_QUERY_EXPLAIN:
+            self._schedule_explain(shape_id, event.command_name, command)
+
+    def _schedule_explain(self, shape_id: str, command_name: str, command: dict):
+        if self._loop is None or self._database is None or self._loop.is_closed():
+            return
+        explain_command = {
+            key: value for key, value in command.items() if key not in _INTERNAL_COMMAND_FIELDS
+        }
+        if command_name == "aggregate":
+            explain_command["cursor"] = {}
+        self._loop.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(self._explain(shape_id, explain_command))
+        )
+
+    async def _explain(self, shape_id: str, command: dict):
+        try:
+            start = time.perf_counter()
+            explain = await self._database.command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+            summary = summarize_explain(explain)
+            summary["captured_in_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self.slow_query_log.set_explain(shape_id, summary)
+            app_logger.warning(f"Explain da consulta lenta [{shape_id}]: {summary}")
+        except Exception as e:
+            app_logger.error(f"Erro ao capturar explain da consulta [{shape_id}]: {e}")
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, "success", event.reply)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, "failure")
+
+
+# Instâncias globais do log de consultas lentas e do listener
+slow_query_log = SlowQueryLog(max_entries=settings.SLOW_QUERY_LOG_SIZE)
+command_listener = CommandMetricsListener(slow_query_log)
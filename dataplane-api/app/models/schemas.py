@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
@@ -22,8 +22,85 @@ class PredictionRequest(BaseModel):
 
 class PredictionResponse(BaseModel):
     """Schema para a resposta da predição."""
+    # Libera o prefixo "model_" reservado pelo pydantic, usado em model_version
+    model_config = ConfigDict(protected_namespaces=())
+
     prediction: str
     confidence: float
+    model_version: str = Field(..., description="Versão do modelo que gerou a predição")
+
+
+class BatchPredictionRequest(BaseModel):
+    """Schema para a requisição de predição em lote."""
+    rows: List[PredictionRequest] = Field(..., min_length=1, description="Cenários a serem avaliados")
+
+
+class BatchPredictionItem(BaseModel):
+    """Resultado de uma linha da predição em lote."""
+    index: int = Field(..., description="Posição da linha na requisição")
+    prediction: Optional[str] = Field(None, description="Nível de dano previsto")
+    confidence: Optional[float] = Field(None, description="Probabilidade da classe prevista")
+    error: Optional[str] = Field(None, description="Motivo da falha da linha, se houver")
+
+
+class BatchPredictionResponse(BaseModel):
+    """Schema para a resposta da predição em lote."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    total: int
+    succeeded: int
+    failed: int
+    model_version: str = Field(..., description="Versão do modelo que avaliou o lote")
+    results: List[BatchPredictionItem]
+
+
+class PredictionHistoryItem(BaseModel):
+    """Registro de auditoria de uma predição (collection ai_requests)."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    id: str
+    endpoint: Optional[str] = None
+    inputs: Dict[str, Any]
+    prediction: Optional[str] = None
+    confidence: Optional[float] = None
+    error: Optional[str] = None
+    model_version: Optional[str] = None
+    latency_ms: float
+    batch_size: Optional[int] = None
+    created_at: datetime
+
+
+class PredictionHistoryResponse(BaseModel):
+    """Página do histórico de predições."""
+    items: List[PredictionHistoryItem]
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página; nulo na última")
+
+
+class ConfidenceBin(BaseModel):
+    min: float
+    max: float
+    count: int
+
+
+class HourlyPredictionCount(BaseModel):
+    hour: datetime
+    total: int
+    errors: int
+
+
+class PredictionStatsResponse(BaseModel):
+    """Estatísticas das predições numa janela de tempo, a partir dos buckets por hora."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    start: datetime
+    end: datetime
+    model_version: Optional[str] = None
+    total: int
+    errors: int
+    predictions: Dict[str, int] = Field(..., description="Quantidade de predições por nível de dano")
+    confidence_histogram: List[ConfidenceBin]
+    latency_ms: Dict[str, Optional[float]] = Field(..., description="Média e percentis aproximados (p50, p90, p99)")
+    hourly: List[HourlyPredictionCount]
 
 
 class ErrorResponse(BaseModel):
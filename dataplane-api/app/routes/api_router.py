@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.controllers import health_router, ai_router, ocurrence_router
+from app.controllers import health_router, ai_router, ocurrence_router, admin_router
 from app.config.settings import settings
 
 # Cria o roteador principal da API
@@ -8,4 +8,5 @@ api_router = APIRouter()
 # Inclui todos os roteadores
 api_router.include_router(health_router)
 api_router.include_router(ai_router) 
-api_router.include_router(ocurrence_router)
\ No newline at end of file
+api_router.include_router(ocurrence_router)
+api_router.include_router(admin_router)
\ No newline at end of file
@@ -1,36 +1,235 @@
-import joblib
-import pandas as pd
-from typing import Dict, Any
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+from app.config.settings import settings
+from app.services.model_bundle import ModelBundle
+from app.services.model_registry import (
+    model_registry, COMPILED_DIR, LABEL_ENCODERS_FILE, MODEL_FILE, TARGET_ENCODER_FILE
+)
+from app.services.prediction_cache import PredictionCache
+from app.utils.logger import app_logger
+from app.utils.process import resident_memory_bytes
+
+# Checkpoint usado quando o registro de versões está vazio
+MODEL_PATH = 'model/checkpoint/random_forest_model.joblib'
+LABEL_ENCODERS_PATH = 'model/label_encoders/label_encoders.joblib'
+TARGET_ENCODER_PATH = 'model/target_encoders/target_encoder.joblib'
 
 class AIService:
+    """
+    Serviço de predição do nível de dano.
+
+    Nada é carregado no import: `load()` roda no startup da aplicação (com
+    warm-up) ou, se MODEL_LOAD_ON_STARTUP estiver desligado, na primeira
+    predição. A versão vem do registro (MODEL_VERSION, ou a versão ativa);
+    sem registro, usa o checkpoint em model/checkpoint.
+
+    `load_version()` monta e aquece um novo bundle em paralelo às
+    predições e o troca de uma vez; quem já estava predizendo termina com
+    o bundle antigo. Com vários workers, os que não receberam a troca a
+    notam pelo mtime do ACTIVE do registro (ver `_follow_active_version`).
+    """
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(AIService, cls).__new__(cls)
-            cls._instance._load_model_and_encoders()
+            cls._instance.bundle = None
+            cls._instance.registry = model_registry
+            cls._instance._load_lock = threading.Lock()
+            cls._instance.load_error = None
+            cls._instance.reload_status = {"state": "idle"}
+            cls._instance._active_mtime = None
+            cls._instance._next_active_check = 0.0
+            cls._instance._follow_lock = threading.Lock()
+            cls._instance.prediction_cache = PredictionCache(max_size=settings.PREDICTION_CACHE_SIZE)
         return cls._instance
 
-    def _load_model_and_encoders(self):
-        self.model = joblib.load('model/checkpoint/random_forest_model.joblib')
-        self.label_encoders = joblib.load('model/label_encoders/label_encoders.joblib')
-        self.target_encoder = joblib.load('model/target_encoders/target_encoder.joblib')
-    
-    def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        df_novo = pd.DataFrame([data])
-
-        features_to_encode = ['aeronave_tipo_operacao', 'fator_area', 'aeronave_tipo_veiculo', 'ocorrencia_uf']
-        for col in features_to_encode:
-            le = self.label_encoders[col]
-            df_novo[col] = le.transform(df_novo[col].astype(str))
-
-        predicao_encoded = self.model.predict(df_novo)
-        predicao_original = self.target_encoder.inverse_transform(predicao_encoded)
-        
-        probas = self.model.predict_proba(df_novo)
-        classe_predita = predicao_encoded[0]
-        confianca = probas[0][classe_predita]
-
-        return {"prediction": predicao_original[0], "confidence": float(confianca)}
-
-ai_service = AIService() 
\ No newline at end of file
+    @property
+    def loaded(self) -> bool:
+        return self.bundle is not None
+
+    @property
+    def model_version(self) -> Optional[str]:
+        bundle = self.bundle
+        return bundle.version if bundle is not None else None
+
+    def load(self):
+        """Carrega a versão configurada uma única vez; seguro entre threads"""
+        if self.bundle is not None:
+            return
+        with self._load_lock:
+            if self.bundle is not None:
+                return
+            try:
+                self._active_mtime = self.registry.active_mtime()
+                self.bundle = self._load_bundle(settings.MODEL_VERSION or self.registry.active_version())
+            except Exception as e:
+                self.load_error = str(e)
+                app_logger.error(f"Erro ao carregar o modelo: {e}")
+                raise
+            self.load_error = None
+
+    def _load_bundle(self, version: Optional[str]) -> ModelBundle:
+        if version is None:
+            # Registro vazio: usa o checkpoint avulso, versionado pelo hash
+            checkpoint_version = self._file_hash(MODEL_PATH)
+            return ModelBundle.load(
+                checkpoint_version, "checkpoint", MODEL_PATH, LABEL_ENCODERS_PATH, TARGET_ENCODER_PATH,
+                os.path.join(settings.MODEL_ARTIFACTS_DIR, checkpoint_version)
+            )
+        if self.registry.get_manifest(version) is None:
+            raise ValueError(f"Versão '{version}' não encontrada no registro de modelos")
+        directory = self.registry.version_dir(version)
+        return ModelBundle.load(
+            version, "registry",
+            os.path.join(directory, MODEL_FILE),
+            os.path.join(directory, LABEL_ENCODERS_FILE),
+            os.path.join(directory, TARGET_ENCODER_FILE),
+            os.path.join(directory, COMPILED_DIR),
+        )
+
+    def load_version(self, version: str, activate: bool = True):
+        """
+        Carrega uma versão do registro, faz o warm-up e a torna a versão
+        ativa. Roda fora do event loop (tarefa em background do endpoint
+        administrativo); em caso de erro a versão atual continua servindo.
+        Com `activate=False` (worker seguindo a troca feita por outro), o
+        ACTIVE não é regravado.
+        """
+        self.reload_status = {
+            "state": "loading", "version": version, "started_at": datetime.utcnow(), "error": None
+        }
+        try:
+            bundle = self._load_bundle(version)
+            bundle.warm_up()
+        except Exception as e:
+            app_logger.error(f"Erro ao carregar a versão {version} do modelo: {e}")
+            self.reload_status.update({"state": "failed", "error": str(e), "finished_at": datetime.utcnow()})
+            return
+
+        previous = self.model_version
+        with self._load_lock:
+            self.bundle = bundle
+            self.load_error = None
+        if activate:
+            self.registry.set_active(version)
+            self._active_mtime = self.registry.active_mtime()
+        # As chaves antigas levam a versão anterior e não seriam mais consultadas
+        self.prediction_cache.clear()
+        self.reload_status.update({"state": "ready", "finished_at": datetime.utcnow()})
+        app_logger.info(f"Modelo trocado: {previous} -> {version}")
+
+    def _current(self) -> ModelBundle:
+        """Bundle ativo; a predição deve usar só esta referência do início ao fim"""
+        bundle = self.bundle
+        if bundle is None:
+            self.load()
+            bundle = self.bundle
+        else:
+            self._follow_active_version()
+        return bundle
+
+    def _follow_active_version(self):
+        """
+        A troca pelo endpoint administrativo acontece só no worker que
+        recebeu a requisição. Os demais conferem o mtime do ACTIVE a cada
+        MODEL_ACTIVE_CHECK_INTERVAL_S e, se a versão ativa mudou, carregam a
+        nova em background, servindo a atual até a troca.
+        """
+        interval = settings.MODEL_ACTIVE_CHECK_INTERVAL_S
+        if settings.MODEL_VERSION or interval <= 0 or time.monotonic() < self._next_active_check:
+            return
+        if not self._follow_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_active_check = time.monotonic() + interval
+            mtime = self.registry.active_mtime()
+            if mtime == self._active_mtime or self.reload_status.get("state") == "loading":
+                return
+            self._active_mtime = mtime
+            version = self.registry.active_version()
+            if version is None or version == self.model_version:
+                return
+            app_logger.info(f"Versão ativa alterada por outro worker: carregando {version}")
+            self.reload_status = {"state": "loading", "version": version}
+            threading.Thread(
+                target=self.load_version, args=(version, False), name="model-follow", daemon=True
+            ).start()
+        finally:
+            self._follow_lock.release()
+
+    @staticmethod
+    def _file_hash(path: str) -> str:
+        """Hash do artefato do modelo, usado como versão nas chaves do cache"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:12]
+
+    def warm_up(self) -> float:
+        """Carrega o modelo (se preciso) e faz o warm-up; retorna o tempo em ms"""
+        return self._current().warm_up()
+
+    def health_check(self) -> bool:
+        """
+        Saudável se o modelo carregou, ou se ainda não carregou por estar em
+        modo preguiçoso (MODEL_LOAD_ON_STARTUP desligado) e sem erro anterior
+        """
+        if self.bundle is not None:
+            return True
+        return self.load_error is None and not settings.MODEL_LOAD_ON_STARTUP
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Versão, backend de inferência, tempo de carga e memória do processo"""
+        bundle = self.bundle
+        info: Dict[str, Any] = {
+            "loaded": bundle is not None,
+            "load_error": self.load_error,
+            "reload": self.reload_status,
+            "resident_memory_bytes": resident_memory_bytes(),
+        }
+        if bundle is not None:
+            info.update(bundle.info())
+        return info
+
+    def get_form_options(self) -> Dict[str, List[str]]:
+        return self._current().form_options
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self._current().predict_proba(features)
+
+    def encode(self, data: Dict[str, Any]) -> np.ndarray:
+        """Monta a linha de features de um cenário, sem pandas"""
+        return self._current().encode(data)
+
+    def lookup(self, data: Dict[str, Any]) -> Tuple[Tuple, Optional[Dict[str, Any]]]:
+        """Codifica o cenário e consulta o cache, sem tocar no modelo"""
+        bundle = self._current()
+        key = bundle.cache_key(bundle.encode(data))
+        return key, self.prediction_cache.get(key)
+
+    def predict(self, data: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        bundle = self._current()
+        row = bundle.encode(data)
+        key = bundle.cache_key(row) if use_cache else None
+        if use_cache:
+            cached = self.prediction_cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = bundle.predict_row(row)
+        if use_cache:
+            self.prediction_cache.put(key, result)
+        return result
+
+    def predict_batch(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Avalia várias linhas com uma única chamada ao modelo (ver ModelBundle.predict_batch)"""
+        return self._current().predict_batch(rows)
+
+ai_service = AIService()
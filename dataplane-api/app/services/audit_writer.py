@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config.settings import settings
+from app.services.prediction_history_service import PredictionHistoryService
+from app.utils.logger import app_logger
+from app.utils.metrics import AUDIT_QUEUE_DEPTH, AUDIT_RECORDS
+
+# Marca o fim da fila no encerramento
+_STOP = object()
+
+
+def prediction_record(endpoint: str, inputs: Dict[str, Any], result: Dict[str, Any],
+                      latency_s: float, **extra) -> Dict[str, Any]:
+    """Documento de auditoria de uma predição, no formato da collection ai_requests"""
+    return {
+        "endpoint": endpoint,
+        "inputs": inputs,
+        "prediction": result.get("prediction"),
+        "confidence": result.get("confidence"),
+        "error": result.get("error"),
+        "model_version": result.get("model_version"),
+        "latency_ms": round(latency_s * 1000, 3),
+        "created_at": datetime.utcnow(),
+        **extra,
+    }
+
+
+class AuditWriter:
+    """
+    Grava as predições na collection `ai_requests` (e os buckets de hora das
+    estatísticas) sem custo de ida ao banco por requisição.
+
+    Os registros entram numa fila limitada (AUDIT_QUEUE_MAX_SIZE); um worker
+    os grava com um único insert_many(ordered=False) quando junta
+    AUDIT_BATCH_SIZE registros ou AUDIT_FLUSH_INTERVAL_MS depois do
+    primeiro. Com a fila cheia, a requisição espera no máximo
+    AUDIT_ENQUEUE_TIMEOUT_MS por espaço e, se o banco não acompanhar, o
+    registro é descartado (e contado) em vez de segurar a predição.
+    No encerramento, o que está na fila é gravado antes de sair.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict[str, Any]]], Awaitable[int]], batch_size: int,
+                 flush_interval_ms: float, max_queue_size: int, enqueue_timeout_ms: float):
+        # Grava um lote e retorna quantos registros foram gravados
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._written = AUDIT_RECORDS.labels("written")
+        self._dropped = AUDIT_RECORDS.labels("dropped")
+        self._failed = AUDIT_RECORDS.labels("failed")
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    async def start(self):
+        """Inicia o worker de gravação no event loop corrente"""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = asyncio.create_task(self._run())
+            app_logger.info(
+                f"Auditoria de predições iniciada (lote: {self.batch_size}, "
+                f"intervalo: {self.flush_interval * 1000:.0f} ms, fila máx: {self.max_queue_size})"
+            )
+
+    async def stop(self):
+        """Grava os registros pendentes e para o worker"""
+        if self._worker is None:
+            return
+        worker, self._worker = self._worker, None
+        # A fila pode estar cheia: espera o worker abrir espaço para o marcador
+        await self._queue.put(_STOP)
+        await worker
+        app_logger.info("Auditoria de predições encerrada")
+
+    async def record(self, document: Dict[str, Any]):
+        """Enfileira um registro; sem worker (ex: testes sem lifespan) não faz nada"""
+        await self.record_many([document])
+
+    async def record_many(self, documents: List[Dict[str, Any]]):
+        if self._worker is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        for position, document in enumerate(documents):
+            try:
+                self._queue.put_nowait(document)
+            except asyncio.QueueFull:
+                try:
+                    await asyncio.wait_for(self._queue.put(document), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    dropped = len(documents) - position
+                    self._dropped.inc(dropped)
+                    app_logger.warning(f"Fila de auditoria cheia: {dropped} registro(s) descartado(s)")
+                    return
+            AUDIT_QUEUE_DEPTH.inc()
+
+    async def _collect_batch(self) -> tuple:
+        """Junta até batch_size registros ou até o intervalo; indica se chegou o marcador de fim"""
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        stopping = False
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                stopping = True
+                break
+            batch.append(item)
+        AUDIT_QUEUE_DEPTH.dec(len(batch))
+        return batch, stopping
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            inserted = await self.write_batch(batch)
+        except Exception as e:
+            # Auditoria não pode derrubar o worker: o lote é descartado e contado
+            self._failed.inc(len(batch))
+            app_logger.error(f"Erro ao gravar {len(batch)} registro(s) de auditoria: {e}")
+            return
+        self._written.inc(inserted)
+        if inserted < len(batch):
+            self._failed.inc(len(batch) - inserted)
+
+    async def _run(self):
+        while True:
+            batch, stopping = await self._collect_batch()
+            if batch:
+                await self._flush(batch)
+            if stopping:
+                # Após o marcador, só restam registros de quem já estava esperando
+                remaining = []
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not _STOP:
+                        remaining.append(item)
+                AUDIT_QUEUE_DEPTH.dec(len(remaining))
+                for start in range(0, len(remaining), self.batch_size):
+                    await self._flush(remaining[start:start + self.batch_size])
+                return
+
+
+# Instância global do gravador de auditoria
+audit_writer = AuditWriter(
+    PredictionHistoryService.record_batch,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval_ms=settings.AUDIT_FLUSH_INTERVAL_MS,
+    max_queue_size=settings.AUDIT_QUEUE_MAX_SIZE,
+    enqueue_timeout_ms=settings.AUDIT_ENQUEUE_TIMEOUT_MS,
+)
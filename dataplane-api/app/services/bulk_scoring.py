@@ -0,0 +1,231 @@
+"""
+Pontuação em lote do histórico da collection `ocorrencia_completa`.
+
+Lê a collection em blocos ordenados por `_id`, monta as features de cada
+bloco com operações vetorizadas do pandas, avalia o bloco inteiro com uma
+única chamada a predict_proba e grava `predicted_damage` e
+`prediction_confidence` de volta com um bulk_write não ordenado.
+
+Na collection mesclada, `fator_area` guarda todos os fatores da ocorrência
+unidos por "; ", enquanto o modelo foi treinado com uma linha por fator.
+Cada documento é expandido em uma linha por fator e a predição da
+ocorrência é a média das probabilidades dessas linhas.
+
+O progresso fica em `scoring_checkpoints` (último `_id` gravado e versão do
+modelo): uma execução interrompida continua de onde parou, e uma versão
+nova do modelo recomeça do início.
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from app.services.model_bundle import ModelBundle
+
+SOURCE_COLLECTION = "ocorrencia_completa"
+CHECKPOINT_COLLECTION = "scoring_checkpoints"
+
+AERONAVE_TEXT_COLUMNS = ['aeronave_tipo_operacao', 'aeronave_tipo_veiculo']
+NUMERIC_COLUMNS = ['aeronave_ano_fabricacao', 'aeronave_fatalidades_total']
+FEATURE_FIELDS = AERONAVE_TEXT_COLUMNS + NUMERIC_COLUMNS + ['fator_area', 'ocorrencia_uf']
+
+# Ausentes como ficaram na collection mesclada (NaN vira "None" no clean_data)
+MISSING_TEXT = ['None', 'nan', 'NULL', '', '***', '****', '*****']
+FATOR_SEPARATOR = '; '
+
+
+@dataclass
+class ChunkScores:
+    """Resultado de um bloco: uma entrada por documento com predição"""
+    ids: List[Any]
+    labels: List[Optional[str]]
+    confidences: List[Optional[float]]
+    unscored: int = 0
+
+
+@dataclass
+class ScoringReport:
+    model_version: str
+    resumed_from: Any = None
+    documents: int = 0
+    scored: int = 0
+    unscored: int = 0
+    chunks: int = 0
+    elapsed_s: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.documents / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def build_feature_frame(documents: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Uma linha por (documento, fator_area), com os valores normalizados como
+    no treino: marcadores de ausente de aeronave viram "<NA>" e "***" em
+    fator_area vira "FATOR NÃO INFORMADO". A coluna `doc` aponta para a
+    posição do documento no bloco.
+    """
+    df = pd.DataFrame.from_records(documents, columns=['_id'] + FEATURE_FIELDS)
+    df['doc'] = np.arange(len(df))
+
+    for col in AERONAVE_TEXT_COLUMNS:
+        values = df[col].astype('string').str.strip()
+        df[col] = values.mask(values.isin(MISSING_TEXT)).fillna('<NA>').astype(object)
+    df['ocorrencia_uf'] = df['ocorrencia_uf'].astype('string').str.strip().fillna('<NA>').astype(object)
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    fatores = df['fator_area'].astype('string').str.split(FATOR_SEPARATOR)
+    df = df.assign(fator_area=fatores).explode('fator_area', ignore_index=True)
+    fator = df['fator_area'].astype('string').str.strip()
+    df['fator_area'] = fator.replace('***', 'FATOR NÃO INFORMADO').mask(fator.isin(MISSING_TEXT))
+    # Como no treino (dropna em fator_area): sem fator não há predição
+    return df.dropna(subset=['fator_area']).reset_index(drop=True)
+
+
+def encode_frame(bundle: ModelBundle, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codifica as colunas na ordem de features do modelo. Retorna a matriz e
+    a máscara das linhas com todas as categorias conhecidas pelos encoders.
+    """
+    features = np.empty((len(df), bundle.n_features), dtype=np.float64)
+    valid = np.ones(len(df), dtype=bool)
+    for col, position in bundle.categorical_positions:
+        classes = bundle.encoder_classes[col]
+        values = df[col].to_numpy(dtype=object)
+        codes = np.minimum(np.searchsorted(classes, values), len(classes) - 1)
+        valid &= classes[codes] == values
+        features[:, position] = codes
+    for col, position in bundle.numeric_positions:
+        features[:, position] = df[col].to_numpy(dtype=np.float64)
+    return features, valid
+
+
+def score_documents(bundle: ModelBundle, documents: List[Dict[str, Any]]) -> ChunkScores:
+    """Avalia um bloco de documentos com uma única chamada ao modelo"""
+    df = build_feature_frame(documents)
+    features, valid = encode_frame(bundle, df)
+    owners = df['doc'].to_numpy()[valid]
+
+    labels: List[Optional[str]] = [None] * len(documents)
+    confidences: List[Optional[float]] = [None] * len(documents)
+    if owners.size:
+        probas = bundle.predict_proba(features[valid])
+        # As linhas de um documento são contíguas: média por documento com reduceat
+        docs, starts, counts = np.unique(owners, return_index=True, return_counts=True)
+        means = np.add.reduceat(probas, starts, axis=0) / counts[:, None]
+        best = means.argmax(axis=1)
+        for doc, label_idx, confidence in zip(docs, best, means[np.arange(len(best)), best]):
+            labels[doc] = bundle.class_labels[label_idx]
+            confidences[doc] = round(float(confidence), 6)
+
+    ids = [document['_id'] for document in documents]
+    unscored = sum(label is None for label in labels)
+    return ChunkScores(ids=ids, labels=labels, confidences=confidences, unscored=unscored)
+
+
+def build_updates(scores: ChunkScores, model_version: str, scored_at: datetime) -> List[UpdateOne]:
+    """
+    Um UpdateOne por documento. Documentos sem predição (sem fator ou com
+    categoria desconhecida) recebem None, para não manter o valor de uma
+    versão anterior do modelo.
+    """
+    return [
+        UpdateOne({'_id': doc_id}, {'$set': {
+            'predicted_damage': label,
+            'prediction_confidence': confidence,
+            'prediction_model_version': model_version,
+            'predicted_at': scored_at,
+        }})
+        for doc_id, label, confidence in zip(scores.ids, scores.labels, scores.confidences)
+    ]
+
+
+class BulkScoringJob:
+    """Pontua a collection mesclada em blocos, com checkpoint por bloco"""
+
+    def __init__(self, db, bundle: ModelBundle, chunk_size: int = 2000,
+                 collection_name: str = SOURCE_COLLECTION, verbose: bool = True):
+        self.collection = db[collection_name]
+        self.checkpoints = db[CHECKPOINT_COLLECTION]
+        self.bundle = bundle
+        self.chunk_size = chunk_size
+        self.collection_name = collection_name
+        self.verbose = verbose
+
+    def _load_checkpoint(self, restart: bool) -> Optional[Dict[str, Any]]:
+        """Checkpoint da versão atual do modelo; sem ele, recomeça com contadores zerados"""
+        checkpoint = None if restart else self.checkpoints.find_one({'_id': self.collection_name})
+        if checkpoint is None or checkpoint.get('model_version') != self.bundle.version:
+            self.checkpoints.delete_one({'_id': self.collection_name})
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, last_id, scored: int, unscored: int, finished: bool = False):
+        self.checkpoints.update_one({'_id': self.collection_name}, {
+            '$set': {
+                'model_version': self.bundle.version,
+                'last_id': last_id,
+                'finished': finished,
+                'updated_at': datetime.utcnow(),
+            },
+            '$inc': {'scored': scored, 'unscored': unscored},
+        }, upsert=True)
+
+    def run(self, restart: bool = False, max_documents: Optional[int] = None) -> ScoringReport:
+        report = ScoringReport(model_version=self.bundle.version)
+        checkpoint = self._load_checkpoint(restart)
+        if checkpoint is not None and checkpoint.get('finished'):
+            if self.verbose:
+                print(f"✅ Collection já pontuada com a versão {report.model_version} (use --restart para refazer)")
+            return report
+
+        last_id = checkpoint['last_id'] if checkpoint else None
+        report.resumed_from = last_id
+        projection = {name: 1 for name in FEATURE_FIELDS}
+        timings = {'read': 0.0, 'score': 0.0, 'write': 0.0}
+        start = time.perf_counter()
+
+        while max_documents is None or report.documents < max_documents:
+            limit = self.chunk_size
+            if max_documents is not None:
+                limit = min(limit, max_documents - report.documents)
+
+            t0 = time.perf_counter()
+            query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+            documents = list(self.collection.find(query, projection).sort('_id', 1).limit(limit))
+            t1 = time.perf_counter()
+            if not documents:
+                break
+
+            scores = score_documents(self.bundle, documents)
+            t2 = time.perf_counter()
+            self.collection.bulk_write(
+                build_updates(scores, report.model_version, datetime.utcnow()), ordered=False
+            )
+            last_id = documents[-1]['_id']
+            self._save_checkpoint(last_id, len(documents) - scores.unscored, scores.unscored)
+            t3 = time.perf_counter()
+
+            timings['read'] += t1 - t0
+            timings['score'] += t2 - t1
+            timings['write'] += t3 - t2
+            report.chunks += 1
+            report.documents += len(documents)
+            report.unscored += scores.unscored
+            report.scored += len(documents) - scores.unscored
+            if self.verbose:
+                rate = report.documents / (time.perf_counter() - start)
+                print(f"   📦 Bloco {report.chunks}: {report.documents} documentos - {rate:,.0f} linhas/s")
+
+        report.elapsed_s = time.perf_counter() - start
+        report.timings = {name: round(value, 3) for name, value in timings.items()}
+        finished = max_documents is None or report.documents < max_documents
+        if finished and last_id is not None:
+            self._save_checkpoint(last_id, 0, 0, finished=True)
+            self.collection.create_index('predicted_damage')
+        return report
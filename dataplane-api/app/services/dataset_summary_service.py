@@ -0,0 +1,34 @@
+from typing import Any, Optional
+from app.models.database import get_collection
+from app.utils.logger import app_logger
+
+# Resumos pré-calculados pelo pipeline de seeding (estatísticas, opções de filtro)
+SUMMARIES_COLLECTION = "dataset_summaries"
+# Versão de cada dataset publicado, incrementada a cada rebuild
+DATASET_VERSIONS_COLLECTION = "dataset_versions"
+
+
+class DatasetSummaryService:
+    """
+    Leitura dos resumos gravados pelo pipeline de seeding. Um resumo só é
+    usado se foi calculado sobre a versão publicada do dataset; depois de um
+    rebuild ou de uma atualização incremental, os serviços voltam a
+    consultar a collection até o pipeline gravar um resumo novo.
+    """
+
+    @staticmethod
+    async def get(section: str, collection_name: str = "ocorrencia_completa") -> Optional[Any]:
+        try:
+            summaries = await get_collection(SUMMARIES_COLLECTION)
+            summary = await summaries.find_one({"_id": collection_name}, {section: 1, "dataset_version": 1})
+            if not summary or section not in summary:
+                return None
+            versions = await get_collection(DATASET_VERSIONS_COLLECTION)
+            current = await versions.find_one({"_id": collection_name}, {"version": 1})
+            if not current or current.get("version") != summary.get("dataset_version"):
+                return None
+            return summary[section]
+        except Exception as e:
+            # Sem resumo a resposta só fica mais lenta: os serviços calculam na hora
+            app_logger.warning(f"Erro ao ler o resumo '{section}' de {collection_name}: {e}")
+            return None
@@ -1,7 +1,87 @@
 from typing import List, Dict, Any
 from app.models.database import get_collection
+from app.services.dataset_summary_service import DatasetSummaryService
 from app.utils.logger import app_logger
 
+# Categoria -> (campo na collection mesclada, limite de valores)
+FILTER_FIELDS = {
+    # Filtros básicos de ocorrência
+    "states": ("ocorrencia_uf", 1000),
+    "cities": ("ocorrencia_cidade", 500),
+    "classifications": ("ocorrencia_classificacao", 1000),
+    "countries": ("ocorrencia_pais", 1000),
+    "aerodromes": ("ocorrencia_aerodromo", 300),
+
+    # Filtros de aeronave
+    "aircraft_manufacturers": ("aeronave_fabricante", 1000),
+    "aircraft_types": ("aeronave_tipo_veiculo", 1000),
+    "aircraft_models": ("aeronave_modelo", 200),
+    "damage_levels": ("aeronave_nivel_dano", 1000),
+    "aircraft_operators": ("aeronave_operador_categoria", 1000),
+    "operation_phases": ("aeronave_fase_operacao", 1000),
+    "operation_types": ("aeronave_tipo_operacao", 1000),
+
+    # Filtros de investigação
+    "investigation_status": ("investigacao_status", 1000),
+    "aircraft_released": ("investigacao_aeronave_liberada", 1000),
+
+    # Filtros de tipos de ocorrência
+    "occurrence_types": ("ocorrencia_tipo", 1000),
+    "occurrence_type_categories": ("ocorrencia_tipo_categoria", 1000),
+
+    # Filtros de fatores contribuintes
+    "factor_names": ("fator_nome", 200),
+    "factor_aspects": ("fator_aspecto", 1000),
+    "factor_areas": ("fator_area", 1000),
+}
+
+# Campos que podem ter múltiplos valores separados por '; '
+MULTI_VALUE_FIELDS = ["ocorrencia_tipo", "ocorrencia_tipo_categoria", "fator_nome", "fator_aspecto", "fator_area"]
+
+
+def distinct_values_pipeline(field_name: str, limit: int) -> List[Dict[str, Any]]:
+    """Pipeline de aggregation para buscar valores únicos de um campo"""
+    return [
+        {"$match": {field_name: {"$exists": True, "$ne": None, "$ne": ""}}},
+        {"$group": {"_id": f"${field_name}"}},
+        {"$sort": {"_id": 1}},
+        {"$limit": limit}
+    ]
+
+
+def clean_distinct_values(field_name: str, results: List[Dict[str, Any]]) -> List[str]:
+    """Extrai os valores do resultado da aggregation, limpa dados inválidos e ordena"""
+    values = []
+    for result in results:
+        value = result["_id"]
+        if value and isinstance(value, str):
+            cleaned = value.strip()
+            if cleaned and cleaned.lower() not in ['nan', 'null', '***', 'none', '-', 'n/a']:
+                if field_name in MULTI_VALUE_FIELDS:
+                    # Separa por '; ' e adiciona cada valor individualmente
+                    split_values = [v.strip() for v in cleaned.split(';') if v.strip()]
+                    values.extend(split_values)
+                else:
+                    values.append(cleaned)
+        elif value and not isinstance(value, str):
+            values.append(str(value))
+
+    return sorted(list(set(values)))  # Remove duplicatas e ordena
+
+
+def filter_options_result(filter_options: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Resposta de /filter-options com os metadados"""
+    total_options = sum(len(options) for options in filter_options.values())
+    return {
+        "filter_options": filter_options,
+        "metadata": {
+            "total_unique_options": total_options,
+            "fields_available": len(filter_options),
+            "data_source": "ocorrencia_completa",
+            "note": "Valores limpos e ordenados alfabeticamente"
+        }
+    }
+
 
 class FilterOptionsService:
     """Serviço para buscar opções de filtros da collection mesclada"""
@@ -21,35 +101,10 @@ class FilterOptionsService:
         try:
             collection = await get_collection("ocorrencia_completa")
             
-            # Pipeline de aggregation para buscar valores únicos
-            pipeline = [
-                {"$match": {field_name: {"$exists": True, "$ne": None, "$ne": ""}}},
-                {"$group": {"_id": f"${field_name}"}},
-                {"$sort": {"_id": 1}},
-                {"$limit": limit}
-            ]
-            
-            cursor = collection.aggregate(pipeline)
+            cursor = collection.aggregate(distinct_values_pipeline(field_name, limit))
             results = await cursor.to_list(length=limit)
             
-            # Extrai os valores e limpa dados inválidos
-            values = []
-            for result in results:
-                value = result["_id"]
-                if value and isinstance(value, str):
-                    cleaned = value.strip()
-                    if cleaned and cleaned.lower() not in ['nan', 'null', '***', 'none', '-', 'n/a']:
-                        # Campos que podem ter múltiplos valores separados por '; '
-                        if field_name in ["ocorrencia_tipo", "ocorrencia_tipo_categoria", "fator_nome", "fator_aspecto", "fator_area"]:
-                            # Separa por '; ' e adiciona cada valor individualmente
-                            split_values = [v.strip() for v in cleaned.split(';') if v.strip()]
-                            values.extend(split_values)
-                        else:
-                            values.append(cleaned)
-                elif value and not isinstance(value, str):
-                    values.append(str(value))
-            
-            return sorted(list(set(values)))  # Remove duplicatas e ordena
+            return clean_distinct_values(field_name, results)
             
         except Exception as e:
             app_logger.warning(f"Erro ao buscar valores para {field_name}: {e}")
@@ -64,54 +119,24 @@ class FilterOptionsService:
             Dicionário com todas as opções de filtros organizadas por categoria
         """
         try:
+            # Calculadas pelo pipeline de seeding para a versão publicada do dataset
+            precomputed = await DatasetSummaryService.get("filter_options")
+            if precomputed is not None:
+                return filter_options_result(precomputed)
+
             app_logger.info("Buscando todas as opções de filtros da collection mesclada")
             
-            # Busca opções para todos os campos de filtro em paralelo
             filter_options = {
-                # Filtros básicos de ocorrência
-                "states": await FilterOptionsService.get_distinct_values("ocorrencia_uf"),
-                "cities": await FilterOptionsService.get_distinct_values("ocorrencia_cidade", 500),
-                "classifications": await FilterOptionsService.get_distinct_values("ocorrencia_classificacao"),
-                "countries": await FilterOptionsService.get_distinct_values("ocorrencia_pais"),
-                "aerodromes": await FilterOptionsService.get_distinct_values("ocorrencia_aerodromo", 300),
-                
-                # Filtros de aeronave
-                "aircraft_manufacturers": await FilterOptionsService.get_distinct_values("aeronave_fabricante"),
-                "aircraft_types": await FilterOptionsService.get_distinct_values("aeronave_tipo_veiculo"),
-                "aircraft_models": await FilterOptionsService.get_distinct_values("aeronave_modelo", 200),
-                "damage_levels": await FilterOptionsService.get_distinct_values("aeronave_nivel_dano"),
-                "aircraft_operators": await FilterOptionsService.get_distinct_values("aeronave_operador_categoria"),
-                "operation_phases": await FilterOptionsService.get_distinct_values("aeronave_fase_operacao"),
-                "operation_types": await FilterOptionsService.get_distinct_values("aeronave_tipo_operacao"),
-                
-                # Filtros de investigação
-                "investigation_status": await FilterOptionsService.get_distinct_values("investigacao_status"),
-                "aircraft_released": await FilterOptionsService.get_distinct_values("investigacao_aeronave_liberada"),
-                
-                # Filtros de tipos de ocorrência
-                "occurrence_types": await FilterOptionsService.get_distinct_values("ocorrencia_tipo"),
-                "occurrence_type_categories": await FilterOptionsService.get_distinct_values("ocorrencia_tipo_categoria"),
-                
-                # Filtros de fatores contribuintes
-                "factor_names": await FilterOptionsService.get_distinct_values("fator_nome", 200),
-                "factor_aspects": await FilterOptionsService.get_distinct_values("fator_aspecto"),
-                "factor_areas": await FilterOptionsService.get_distinct_values("fator_area")
+                category: await FilterOptionsService.get_distinct_values(field_name, limit)
+                for category, (field_name, limit) in FILTER_FIELDS.items()
             }
             
-            # Calcula estatísticas
-            total_options = sum(len(options) for options in filter_options.values())
-            
-            result = {
-                "filter_options": filter_options,
-                "metadata": {
-                    "total_unique_options": total_options,
-                    "fields_available": len(filter_options),
-                    "data_source": "ocorrencia_completa",
-                    "note": "Valores limpos e ordenados alfabeticamente"
-                }
-            }
+            result = filter_options_result(filter_options)
             
-            app_logger.info(f"Opções de filtros obtidas: {total_options} valores únicos em {len(filter_options)} campos")
+            app_logger.info(
+                f"Opções de filtros obtidas: {result['metadata']['total_unique_options']} valores únicos "
+                f"em {len(filter_options)} campos"
+            )
             return result
             
         except Exception as e:
@@ -130,45 +155,15 @@ class FilterOptionsService:
             Lista de valores únicos para a categoria
         """
         try:
-            # Mapeamento de categorias para campos do MongoDB
-            field_mapping = {
-                "states": "ocorrencia_uf",
-                "cities": "ocorrencia_cidade",
-                "classifications": "ocorrencia_classificacao", 
-                "countries": "ocorrencia_pais",
-                "aerodromes": "ocorrencia_aerodromo",
-                "aircraft_manufacturers": "aeronave_fabricante",
-                "aircraft_types": "aeronave_tipo_veiculo",
-                "aircraft_models": "aeronave_modelo",
-                "damage_levels": "aeronave_nivel_dano",
-                "aircraft_operators": "aeronave_operador_categoria",
-                "operation_phases": "aeronave_fase_operacao",
-                "operation_types": "aeronave_tipo_operacao",
-                "investigation_status": "investigacao_status",
-                "aircraft_released": "investigacao_aeronave_liberada",
-                "occurrence_types": "ocorrencia_tipo",
-                "occurrence_type_categories": "ocorrencia_tipo_categoria",
-                "factor_names": "fator_nome",
-                "factor_aspects": "fator_aspecto",
-                "factor_areas": "fator_area"
-            }
-            
-            if category not in field_mapping:
+            if category not in FILTER_FIELDS:
                 app_logger.warning(f"Categoria não encontrada: {category}")
                 return []
             
-            field_name = field_mapping[category]
-            
-            # Define limites específicos para alguns campos
-            limits = {
-                "ocorrencia_cidade": 500,
-                "ocorrencia_aerodromo": 300,
-                "aeronave_modelo": 200,
-                "fator_nome": 200
-            }
-            
-            limit = limits.get(field_name, 1000)
+            precomputed = await DatasetSummaryService.get("filter_options")
+            if precomputed is not None and category in precomputed:
+                return precomputed[category]
             
+            field_name, limit = FILTER_FIELDS[category]
             return await FilterOptionsService.get_distinct_values(field_name, limit)
             
         except Exception as e:
@@ -0,0 +1,211 @@
+"""
+Compilação do RandomForestClassifier treinado em arrays NumPy planos.
+
+Todas as árvores são concatenadas num único conjunto de arrays (feature,
+threshold, filhos e distribuição de classes das folhas) e avaliadas por
+uma travessia vetorizada que anda todas as árvores de todas as linhas ao
+mesmo tempo, sem a validação de entrada e o despacho via joblib que o
+sklearn faz a cada chamada.
+
+A floresta compilada pode ser salva como um diretório de arquivos ``.npy``
+(um por array) mais um ``metadata.json``; carregados com ``mmap_mode='r'``
+os arrays ficam no page cache do sistema e são compartilhados por todos
+os workers do uvicorn que abrirem o mesmo artefato.
+
+A avaliação reproduz exatamente a aritmética do sklearn (entrada em
+float32 e soma árvore a árvore na mesma ordem), por isso o resultado é
+idêntico bit a bit ao de ``predict_proba``; ``verify_compiled_forest``
+confere isso e o AIService só usa a versão compilada se a verificação
+passar.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, fields
+from typing import Optional
+import numpy as np
+
+
+# Versão do formato em disco; muda se os arrays salvos mudarem
+ARTIFACT_FORMAT_VERSION = 2
+METADATA_FILE = "metadata.json"
+
+
+@dataclass
+class CompiledForest:
+    """Floresta compilada em arrays planos, com todas as árvores concatenadas"""
+    feature: np.ndarray
+    threshold: np.ndarray
+    children: np.ndarray
+    missing_left: np.ndarray
+    is_leaf: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    classes: np.ndarray
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, field.name).nbytes for field in fields(self))
+
+    def apply(self, X) -> np.ndarray:
+        """Retorna o índice global da folha atingida por cada linha em cada árvore"""
+        # O sklearn converte a entrada para float32 antes de comparar
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+
+        # Um "cursor" por (linha, árvore); a cada passo só os que ainda não
+        # chegaram a uma folha descem mais um nível
+        nodes = np.tile(self.roots, n_rows)
+        row_offsets = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            values = flat_X[row_offsets[active] + self.feature[current]]
+            go_right = values > self.threshold[current]
+            if has_missing:
+                # NaN segue o lado escolhido no treino (missing_go_to_left do sklearn)
+                go_right = np.where(np.isnan(values), ~self.missing_left[current], go_right)
+            current = self.children[2 * current + go_right]
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return nodes.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        # cumsum acumula árvore a árvore, na mesma ordem e com o mesmo
+        # arredondamento da soma sequencial do sklearn (np.sum usaria soma
+        # pareada e mudaria os últimos bits)
+        proba = np.cumsum(self.value[leaves], axis=1)[:, -1]
+        proba /= self.n_trees
+        return proba
+
+
+def compile_forest(model) -> CompiledForest:
+    """Converte um RandomForestClassifier treinado numa CompiledForest"""
+    n_classes = len(model.classes_)
+    features, thresholds, children, missing, leaves, values, roots = [], [], [], [], [], [], []
+    offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+
+        # Nas folhas feature/threshold/filhos nunca são lidos; zeros mantêm
+        # os índices válidos
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        # Filhos intercalados: children[2 * nó] é a esquerda e
+        # children[2 * nó + 1] a direita
+        pair = np.stack([tree.children_left, tree.children_right], axis=1)
+        children.append(np.where(is_leaf[:, np.newaxis], 0, pair + offset).ravel())
+        missing.append(tree.missing_go_to_left.astype(bool))
+        leaves.append(is_leaf)
+
+        # Desde o sklearn 1.4 tree_.value já guarda as proporções de classe
+        # que DecisionTreeClassifier.predict_proba devolve sem alteração
+        values.append(tree.value[:, 0, :n_classes])
+
+        roots.append(offset)
+        offset += tree.node_count
+
+    return CompiledForest(
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        children=np.concatenate(children).astype(np.intp),
+        missing_left=np.concatenate(missing),
+        is_leaf=np.concatenate(leaves),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        classes=np.asarray(model.classes_),
+    )
+
+
+def verify_compiled_forest(model, compiled: CompiledForest, X) -> bool:
+    """Confere, bit a bit, a floresta compilada contra o predict_proba do sklearn"""
+    return bool(np.array_equal(model.predict_proba(X), compiled.predict_proba(X)))
+
+
+def sample_verification_rows(compiled: CompiledForest, n_features: int, n_rows: int,
+                             seed: int = 0) -> np.ndarray:
+    """
+    Gera linhas de verificação a partir dos próprios thresholds da floresta.
+
+    Cada feature recebe valores exatamente sobre os pontos de corte e logo
+    acima deles, que são os casos em que um erro de arredondamento ou de
+    comparação mudaria o caminho na árvore, além de alguns NaN.
+    """
+    rng = np.random.default_rng(seed)
+    split = ~compiled.is_leaf
+    X = np.zeros((n_rows, n_features), dtype=np.float64)
+    for feature in range(n_features):
+        cuts = compiled.threshold[split & (compiled.feature == feature)]
+        # Cortes "só ausentes x presentes" têm threshold infinito
+        cuts = cuts[np.isfinite(cuts)]
+        if cuts.size == 0:
+            continue
+        candidates = np.concatenate([
+            cuts.astype(np.float32),
+            np.nextafter(cuts.astype(np.float32), np.float32(np.inf)),
+        ]).astype(np.float64)
+        X[:, feature] = rng.choice(candidates, size=n_rows)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def save_compiled_forest(forest: CompiledForest, directory: str, metadata: dict) -> str:
+    """
+    Salva a floresta em `directory`, um arquivo .npy por array.
+
+    Os arquivos são escritos num diretório temporário ao lado do destino e
+    renomeados de uma vez, então um worker nunca enxerga um artefato pela
+    metade; se outro processo publicar o mesmo artefato antes, o dele vale.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".compiling-", dir=parent)
+    try:
+        for field in fields(forest):
+            np.save(os.path.join(staging, f"{field.name}.npy"), getattr(forest, field.name))
+        with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump({**metadata, "format_version": ARTIFACT_FORMAT_VERSION}, f, indent=2, ensure_ascii=False)
+        # mkdtemp cria o diretório só com permissão para o dono
+        os.chmod(staging, 0o755)
+        os.rename(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isfile(os.path.join(directory, METADATA_FILE)):
+            raise
+    return directory
+
+
+def load_compiled_forest(directory: str, mmap_mode: Optional[str] = "r"):
+    """
+    Carrega um artefato salvo por `save_compiled_forest`.
+
+    Retorna `(forest, metadata)`, ou `(None, None)` se o diretório não tem
+    um artefato completo no formato atual.
+    """
+    metadata_path = os.path.join(directory, METADATA_FILE)
+    if not os.path.isfile(metadata_path):
+        return None, None
+    with open(metadata_path, encoding="utf-8") as f:
+        metadata = json.load(f)
+    if metadata.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        return None, None
+    arrays = {
+        field.name: np.load(os.path.join(directory, f"{field.name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        for field in fields(CompiledForest)
+    }
+    return CompiledForest(**arrays), metadata
@@ -0,0 +1,154 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from app.config.settings import settings
+from app.services.ai_service import AIService, ai_service
+from app.utils.logger import app_logger
+from app.utils.metrics import INFERENCE_QUEUE_DEPTH, INFERENCE_BATCH_SIZE
+
+
+class InferenceBatcher:
+    """
+    Executa as inferências fora do event loop, agrupando requisições
+    concorrentes em micro-lotes.
+
+    Cenários já em cache voltam direto, sem entrar na fila. As demais
+    predições entram numa asyncio.Queue; um worker espera até
+    INFERENCE_MAX_WAIT_MS (ou até INFERENCE_MAX_BATCH_SIZE itens) e avalia o
+    lote com uma única chamada vetorizada num executor dedicado de uma
+    thread, liberando o loop para as demais requisições.
+    """
+
+    def __init__(self, service: AIService, max_batch_size: int, max_wait_ms: float):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Inicia o worker de micro-lotes no event loop corrente"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+            app_logger.info(
+                f"Batcher de inferência iniciado (lote máx: {self.max_batch_size}, "
+                f"espera máx: {self.max_wait * 1000:.1f} ms)"
+            )
+
+    async def stop(self):
+        """Para o worker e falha as predições do lote em andamento e as ainda na fila"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+            INFERENCE_QUEUE_DEPTH.dec()
+        self._fail(pending, RuntimeError("Serviço de inferência encerrado"))
+
+    @staticmethod
+    def _fail(batch: list, error: BaseException):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def predict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Agenda uma predição e aguarda o resultado do seu micro-lote"""
+        loop = asyncio.get_running_loop()
+        if self.service.loaded:
+            key, cached = self.service.lookup(data)
+        else:
+            # O primeiro acesso carrega e compila o modelo: fora do event loop
+            key, cached = await loop.run_in_executor(self._executor, self.service.lookup, data)
+        if cached is not None:
+            return cached
+
+        if self._worker is None:
+            # Sem worker (ex: aplicação sem lifespan), roda direto no executor
+            result = await loop.run_in_executor(self._executor, self.service.predict, data, False)
+            self.service.prediction_cache.put(key, result)
+            return result
+        future = loop.create_future()
+        self._queue.put_nowait((data, key, future))
+        INFERENCE_QUEUE_DEPTH.inc()
+        return await future
+
+    async def predict_many(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Avalia um lote já montado no executor de inferência"""
+        loop = asyncio.get_running_loop()
+        INFERENCE_BATCH_SIZE.observe(len(rows))
+        return await loop.run_in_executor(self._executor, self.service.predict_batch, rows)
+
+    def _take(self, batch: list, item):
+        batch.append(item)
+        INFERENCE_QUEUE_DEPTH.dec()
+
+    async def _collect_batch(self, batch: list):
+        """
+        Preenche `batch` com o próximo micro-lote. Os itens entram na lista
+        assim que saem da fila, então um cancelamento no meio não os perde.
+        """
+        self._take(batch, await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                self._take(batch, self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._take(batch, await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = []
+                await self._collect_batch(batch)
+                INFERENCE_BATCH_SIZE.observe(len(batch))
+                rows = [data for data, _, _ in batch]
+                try:
+                    if len(rows) == 1:
+                        results = [await loop.run_in_executor(self._executor, self.service.predict, rows[0], False)]
+                    else:
+                        results = await loop.run_in_executor(self._executor, self.service.predict_batch, rows)
+                except Exception as e:
+                    self._fail(batch, e)
+                    continue
+
+                for (_, key, future), result in zip(batch, results):
+                    if result.get("error"):
+                        if not future.done():
+                            future.set_exception(ValueError(result["error"]))
+                        continue
+                    prediction = {
+                        "prediction": result["prediction"],
+                        "confidence": result["confidence"],
+                        "model_version": result["model_version"],
+                    }
+                    self.service.prediction_cache.put(key, prediction)
+                    if not future.done():
+                        future.set_result(prediction)
+        finally:
+            # Cancelado no stop() com um lote já fora da fila (montando ou no executor)
+            self._fail(batch, RuntimeError("Serviço de inferência encerrado"))
+
+
+# Instância global do batcher de inferência
+inference_batcher = InferenceBatcher(
+    ai_service,
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+)
@@ -1,6 +1,33 @@
 from typing import List, Optional
 from app.models.database import get_collection
+from app.services.dataset_summary_service import DatasetSummaryService
 from app.utils.logger import app_logger
+from app.utils.metrics import MONGO_DOCUMENTS_RETURNED, INVALID_DOCUMENTS_SKIPPED
+from app.utils.timing import timed
+
+# Contagens de /stats: nome -> filtro na collection mesclada
+MERGED_STATS_QUERIES = {
+    "total_ocorrencias": {},
+    "com_coordenadas": {
+        "ocorrencia_latitude": {"$exists": True, "$ne": None},
+        "ocorrencia_longitude": {"$exists": True, "$ne": None}
+    },
+    "com_dados_aeronave": {
+        "aeronave_matricula": {"$exists": True, "$ne": None, "$ne": ""}
+    },
+    "com_recomendacoes": {
+        "recomendacao_numero": {"$exists": True, "$ne": None, "$ne": ""}
+    },
+}
+
+
+def merged_stats_result(counts: dict) -> dict:
+    """Estatísticas de /stats a partir das contagens de MERGED_STATS_QUERIES"""
+    total_docs = counts["total_ocorrencias"]
+    return {
+        **counts,
+        "percentual_completo": round((counts["com_dados_aeronave"] / total_docs * 100), 2) if total_docs > 0 else 0
+    }
 
 
 class MergedOcurrenceService:
@@ -142,66 +169,75 @@ class MergedOcurrenceService:
                 "recomendacao_status": 1,
                 "recomendacao_destinatario": 1,
                 
+                # Predição gravada pelo score_history.py
+                "predicted_damage": 1,
+                "prediction_confidence": 1,
+                
                 "_id": 0
             }
             
             cursor = collection.find(query, projection).skip(skip).limit(limit)
-            documents = await cursor.to_list(length=limit)
+            with timed("db_find"):
+                documents = await cursor.to_list(length=limit)
             
             app_logger.info(f"Documentos mesclados encontrados: {len(documents)}")
+            MONGO_DOCUMENTS_RETURNED.labels("ocorrencia_completa").observe(len(documents))
             
             # Processamento dos dados
             ocurrences = []
             invalid_count = 0
             
-            for doc in documents:
-                try:
-                    # Processamento das coordenadas
-                    lat = doc.get("ocorrencia_latitude")
-                    lon = doc.get("ocorrencia_longitude")
-                    
-                    # Converte coordenadas para float se necessário
-                    if isinstance(lat, str):
-                        lat = float(lat.replace(",", "."))
-                    if isinstance(lon, str):
-                        lon = float(lon.replace(",", "."))
-                    
-                    doc["ocorrencia_latitude"] = float(lat)
-                    doc["ocorrencia_longitude"] = float(lon)
-                    
-                    # Converte campos numéricos se necessário
-                    numeric_fields = [
-                        "total_recomendacoes", "total_aeronaves_envolvidas",
-                        "aeronave_pmd", "aeronave_pmd_categoria", "aeronave_assentos",
-                        "aeronave_ano_fabricacao", "aeronave_fatalidades_total"
-                    ]
-                    
-                    for field in numeric_fields:
-                        if field in doc and doc[field] is not None:
-                            try:
-                                if isinstance(doc[field], str) and doc[field].strip():
-                                    doc[field] = int(float(doc[field].replace(",", ".")))
-                                elif isinstance(doc[field], (int, float)):
-                                    doc[field] = int(doc[field])
-                            except (ValueError, TypeError):
-                                doc[field] = None
-                    
-                    # Limpa campos de texto problemáticos
-                    for key, value in doc.items():
-                        if isinstance(value, str):
-                            if value.strip().lower() in ['nan', 'null', '', '***', 'none']:
-                                doc[key] = None
-                            else:
-                                doc[key] = value.strip()
-                    
-                    ocurrences.append(doc)
-                    
-                except Exception as e:
-                    invalid_count += 1
-                    if invalid_count <= 10:
-                        app_logger.warning(f"Erro ao processar ocorrência mesclada {doc.get('codigo_ocorrencia', 'unknown')}: {e}")
-                    continue
-            
+            with timed("transform"):
+                for doc in documents:
+                    try:
+                        # Processamento das coordenadas
+                        lat = doc.get("ocorrencia_latitude")
+                        lon = doc.get("ocorrencia_longitude")
+                        
+                        # Converte coordenadas para float se necessário
+                        if isinstance(lat, str):
+                            lat = float(lat.replace(",", "."))
+                        if isinstance(lon, str):
+                            lon = float(lon.replace(",", "."))
+                        
+                        doc["ocorrencia_latitude"] = float(lat)
+                        doc["ocorrencia_longitude"] = float(lon)
+                        
+                        # Converte campos numéricos se necessário
+                        numeric_fields = [
+                            "total_recomendacoes", "total_aeronaves_envolvidas",
+                            "aeronave_pmd", "aeronave_pmd_categoria", "aeronave_assentos",
+                            "aeronave_ano_fabricacao", "aeronave_fatalidades_total"
+                        ]
+                        
+                        for field in numeric_fields:
+                            if field in doc and doc[field] is not None:
+                                try:
+                                    if isinstance(doc[field], str) and doc[field].strip():
+                                        doc[field] = int(float(doc[field].replace(",", ".")))
+                                    elif isinstance(doc[field], (int, float)):
+                                        doc[field] = int(doc[field])
+                                except (ValueError, TypeError):
+                                    doc[field] = None
+                        
+                        # Limpa campos de texto problemáticos
+                        for key, value in doc.items():
+                            if isinstance(value, str):
+                                if value.strip().lower() in ['nan', 'null', '', '***', 'none']:
+                                    doc[key] = None
+                                else:
+                                    doc[key] = value.strip()
+                        
+                        ocurrences.append(doc)
+                        
+                    except Exception as e:
+                        invalid_count += 1
+                        if invalid_count <= 10:
+                            app_logger.warning(f"Erro ao processar ocorrência mesclada {doc.get('codigo_ocorrencia', 'unknown')}: {e}")
+                        continue
+                
+            if invalid_count:
+                INVALID_DOCUMENTS_SKIPPED.labels("ocorrencia_completa").inc(invalid_count)
             app_logger.info(f"Processamento mesclado concluído - Válidos: {len(ocurrences)}, Inválidos: {invalid_count}")
             return ocurrences
             
@@ -264,7 +300,8 @@ class MergedOcurrenceService:
             elif date_end:
                 query["ocorrencia_dia"] = {"$lte": date_end}
             
-            count = await collection.count_documents(query)
+            with timed("db_count"):
+                count = await collection.count_documents(query)
             return count
             
         except Exception as e:
@@ -280,30 +317,20 @@ class MergedOcurrenceService:
             Dicionário com estatísticas dos dados mesclados
         """
         try:
+            # Calculadas pelo pipeline de seeding para a versão publicada do dataset
+            precomputed = await DatasetSummaryService.get("stats")
+            if precomputed is not None:
+                return precomputed
+
             collection = await get_collection("ocorrencia_completa")
             
             # Contadores básicos
-            total_docs = await collection.count_documents({})
-            with_coords = await collection.count_documents({
-                "ocorrencia_latitude": {"$exists": True, "$ne": None},
-                "ocorrencia_longitude": {"$exists": True, "$ne": None}
-            })
-            with_aeronave = await collection.count_documents({
-                "aeronave_matricula": {"$exists": True, "$ne": None, "$ne": ""}
-            })
-            with_recomendacoes = await collection.count_documents({
-                "recomendacao_numero": {"$exists": True, "$ne": None, "$ne": ""}
-            })
-            
-            stats = {
-                "total_ocorrencias": total_docs,
-                "com_coordenadas": with_coords,
-                "com_dados_aeronave": with_aeronave,
-                "com_recomendacoes": with_recomendacoes,
-                "percentual_completo": round((with_aeronave / total_docs * 100), 2) if total_docs > 0 else 0
+            counts = {
+                name: await collection.count_documents(query)
+                for name, query in MERGED_STATS_QUERIES.items()
             }
             
-            return stats
+            return merged_stats_result(counts)
             
         except Exception as e:
             app_logger.error(f"Erro ao obter estatísticas mescladas: {e}")
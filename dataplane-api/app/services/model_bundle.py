@@ -0,0 +1,296 @@
+"""
+Uma versão carregada do modelo: encoders, floresta compilada e tabelas de
+codificação, imutável depois de montada.
+
+O AIService guarda uma referência ao bundle ativo; cada predição pega essa
+referência uma única vez e usa só ela, então trocar de versão é apenas
+reatribuir o atributo e as requisições em andamento terminam com o bundle
+com que começaram.
+"""
+
+import threading
+import time
+import joblib
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.services.forest_compiler import (
+    CompiledForest, compile_forest, load_compiled_forest, sample_verification_rows,
+    save_compiled_forest, verify_compiled_forest
+)
+from app.utils.logger import app_logger
+from app.utils.process import resident_memory_bytes
+
+FEATURES_TO_ENCODE = ['aeronave_tipo_operacao', 'fator_area', 'aeronave_tipo_veiculo', 'ocorrencia_uf']
+
+# Valores dos encoders que não devem aparecer como opção no formulário
+FORM_OPTIONS_EXCLUDED = ['<NA>', '***']
+
+
+class ModelBundle:
+    """Modelo e encoders de uma versão, prontos para inferência"""
+
+    def __init__(self, version: str, source: str, model_path: str, compiled_dir: str):
+        self.version = version
+        self.source = source
+        self.model_path = model_path
+        self.compiled_dir = compiled_dir
+        self.forest: Optional[CompiledForest] = None
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._thread_local = threading.local()
+        self.load_stats: Dict[str, Any] = {}
+
+    @classmethod
+    def load(cls, version: str, source: str, model_path: str, label_encoders_path: str,
+             target_encoder_path: str, compiled_dir: str) -> "ModelBundle":
+        """
+        Monta o bundle. Se `compiled_dir` já tem o artefato compilado ele é
+        aberto com mmap e o joblib do sklearn só é lido se um lote grande
+        precisar dele.
+        """
+        bundle = cls(version, source, model_path, compiled_dir)
+        start = time.perf_counter()
+        rss_before = resident_memory_bytes()
+
+        metadata = None
+        if settings.COMPILED_FOREST_ENABLED:
+            mmap_mode = "r" if settings.MODEL_MMAP else None
+            bundle.forest, metadata = load_compiled_forest(compiled_dir, mmap_mode=mmap_mode)
+        if metadata is not None:
+            # O artefato traz tudo o que a inferência precisa: nem o joblib
+            # nem o próprio sklearn são importados neste caminho
+            bundle.feature_names = metadata["feature_names"]
+            encoder_classes = metadata["encoder_classes"]
+            bundle.class_labels = metadata["class_labels"]
+            loaded_from = "artefato compilado" + (" (mmap)" if settings.MODEL_MMAP else "")
+        else:
+            label_encoders = joblib.load(label_encoders_path)
+            target_encoder = joblib.load(target_encoder_path)
+            bundle._load_sklearn_model()
+            encoder_classes = {
+                col: [str(cls) for cls in encoder.classes_] for col, encoder in label_encoders.items()
+            }
+            # Rótulo original de cada coluna de predict_proba
+            bundle.class_labels = [
+                str(label) for label in target_encoder.inverse_transform(bundle._model.classes_)
+            ]
+            loaded_from = "joblib"
+            if settings.COMPILED_FOREST_ENABLED:
+                bundle.forest = bundle._compile_forest(encoder_classes)
+
+        bundle._prepare_lookup_tables(encoder_classes)
+        rss_after = resident_memory_bytes()
+        bundle.load_stats = {
+            "loaded_from": loaded_from,
+            "load_time_ms": round((time.perf_counter() - start) * 1000, 3),
+            "rss_delta_bytes": rss_after - rss_before if rss_before and rss_after else None,
+        }
+        app_logger.info(
+            f"Modelo {version} carregado de {loaded_from} em {bundle.load_stats['load_time_ms']:.1f} ms"
+        )
+        return bundle
+
+    def _load_sklearn_model(self):
+        """
+        Lê o RandomForest do joblib.
+
+        O modelo foi treinado com um DataFrame; a ordem das colunas é guardada
+        e `feature_names_in_` é removido para que o sklearn aceite arrays
+        NumPy sem validar nomes (e sem exigir pandas) a cada chamada.
+        """
+        model = joblib.load(self.model_path)
+        self.feature_names = list(model.feature_names_in_)
+        del model.feature_names_in_
+        self._model = model
+
+    @property
+    def model(self):
+        """RandomForest do sklearn, lido sob demanda quando o artefato compilado é usado"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._load_sklearn_model()
+        return self._model
+
+    def _prepare_lookup_tables(self, encoder_classes: Dict[str, List[str]]):
+        """Pré-calcula, uma única vez, tudo o que as predições consultam"""
+        self.n_features = len(self.feature_names)
+        # Classes de cada LabelEncoder (ordenadas, como em `classes_`)
+        self.encoder_classes = {
+            col: np.array(classes, dtype=object) for col, classes in encoder_classes.items()
+        }
+
+        # Tabelas categoria -> código, no lugar do LabelEncoder.transform
+        self.lookup_tables = {
+            col: {cls: code for code, cls in enumerate(encoder_classes[col])}
+            for col in FEATURES_TO_ENCODE
+        }
+        self.categorical_positions = [
+            (col, self.feature_names.index(col)) for col in FEATURES_TO_ENCODE
+        ]
+        self.numeric_positions = [
+            (col, position) for position, col in enumerate(self.feature_names)
+            if col not in FEATURES_TO_ENCODE
+        ]
+        self.form_options = {
+            feature: [cls for cls in classes if cls not in FORM_OPTIONS_EXCLUDED]
+            for feature, classes in encoder_classes.items()
+        }
+
+    def _compile_forest(self, encoder_classes: Dict[str, List[str]]) -> Optional[CompiledForest]:
+        """
+        Compila o modelo em arrays planos e só o adota se a verificação
+        bit a bit contra o predict_proba do sklearn passar. O resultado é
+        salvo em `compiled_dir` e reaberto com mmap, para que os próximos
+        workers nem precisem ler o joblib.
+        """
+        try:
+            forest = compile_forest(self._model)
+            sample = sample_verification_rows(forest, len(self.feature_names), settings.COMPILED_FOREST_VERIFY_ROWS)
+            if not verify_compiled_forest(self._model, forest, sample):
+                app_logger.warning("Floresta compilada diverge do sklearn; usando predict_proba do modelo")
+                return None
+        except Exception as e:
+            app_logger.warning(f"Erro ao compilar o modelo; usando predict_proba do sklearn: {e}")
+            return None
+        app_logger.info(f"Floresta compilada: {forest.n_trees} árvores, {forest.n_nodes} nós")
+
+        try:
+            save_compiled_forest(forest, self.compiled_dir, {
+                "model_version": self.version,
+                "feature_names": self.feature_names,
+                "encoder_classes": encoder_classes,
+                "class_labels": self.class_labels,
+                "n_trees": forest.n_trees,
+                "n_nodes": forest.n_nodes,
+            })
+            if settings.MODEL_MMAP:
+                forest, _ = load_compiled_forest(self.compiled_dir, mmap_mode="r")
+        except OSError as e:
+            app_logger.warning(f"Não foi possível salvar o artefato compilado: {e}")
+        return forest
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Probabilidades por classe. Lotes pequenos usam a floresta compilada,
+        sem o custo fixo do sklearn por chamada; lotes grandes ficam com o
+        sklearn, que é mais rápido a partir de algumas centenas de linhas.
+        """
+        if self.forest is not None and len(features) <= settings.COMPILED_FOREST_MAX_ROWS:
+            return self.forest.predict_proba(features)
+        return self.model.predict_proba(features)
+
+    def _feature_row(self) -> np.ndarray:
+        """Linha de features pré-alocada, uma por thread"""
+        row = getattr(self._thread_local, "row", None)
+        if row is None:
+            row = np.empty((1, self.n_features), dtype=np.float64)
+            self._thread_local.row = row
+        return row
+
+    def encode(self, data: Dict[str, Any]) -> np.ndarray:
+        """Monta a linha de features de um cenário, sem pandas"""
+        row = self._feature_row()
+        for col, position in self.categorical_positions:
+            code = self.lookup_tables[col].get(str(data[col]))
+            if code is None:
+                raise ValueError(f"Valor desconhecido para '{col}': '{data[col]}'")
+            row[0, position] = code
+        for col, position in self.numeric_positions:
+            row[0, position] = data[col]
+        return row
+
+    def cache_key(self, row: np.ndarray) -> Tuple:
+        """Chave do cache: versão do modelo + features codificadas"""
+        return (self.version, *row[0].tolist())
+
+    def predict_row(self, row: np.ndarray) -> Dict[str, Any]:
+        probas = self.predict_proba(row)[0]
+        best = int(probas.argmax())
+        return {
+            "prediction": self.class_labels[best],
+            "confidence": float(probas[best]),
+            "model_version": self.version,
+        }
+
+    def predict_batch(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Avalia várias linhas com uma única chamada a predict_proba.
+
+        Cada feature é codificada como uma coluna NumPy inteira; linhas com
+        categorias desconhecidas pelos encoders recebem um erro próprio e
+        ficam fora da chamada ao modelo, sem derrubar o lote.
+        """
+        n_rows = len(rows)
+        errors: List[Any] = [None] * n_rows
+        valid = np.ones(n_rows, dtype=bool)
+        features = np.empty((n_rows, self.n_features), dtype=np.float64)
+
+        for col, position in self.categorical_positions:
+            classes = self.encoder_classes[col]
+            values = np.array([str(row[col]) for row in rows], dtype=object)
+            codes = np.minimum(np.searchsorted(classes, values), len(classes) - 1)
+            known = classes[codes] == values
+            for i in np.flatnonzero(~known & valid):
+                errors[i] = f"Valor desconhecido para '{col}': '{values[i]}'"
+            valid &= known
+            features[:, position] = codes
+
+        for col, position in self.numeric_positions:
+            features[:, position] = [row[col] for row in rows]
+
+        results = [
+            {"index": i, "prediction": None, "confidence": None, "error": errors[i],
+             "model_version": self.version}
+            for i in range(n_rows)
+        ]
+        valid_idx = np.flatnonzero(valid)
+        if valid_idx.size == 0:
+            return results
+
+        probas = self.predict_proba(features[valid_idx])
+        best = probas.argmax(axis=1)
+        confidences = probas[np.arange(len(best)), best]
+
+        for i, label_idx, confidence in zip(valid_idx, best, confidences):
+            results[i]["prediction"] = self.class_labels[label_idx]
+            results[i]["confidence"] = float(confidence)
+        return results
+
+    def warm_up(self) -> float:
+        """
+        Faz predições descartáveis para trazer as páginas do modelo e os
+        caminhos de código para a memória antes do primeiro request.
+        Retorna o tempo gasto em ms.
+        """
+        start = time.perf_counter()
+        scenario = {col: options[0] for col, options in self.form_options.items() if options}
+        scenario.update({col: 0 for col, _ in self.numeric_positions})
+        self.predict_row(self.encode(scenario))
+        self.predict_batch([scenario, scenario])
+        warmup_ms = round((time.perf_counter() - start) * 1000, 3)
+        self.load_stats["warmup_ms"] = warmup_ms
+        return warmup_ms
+
+    def info(self) -> Dict[str, Any]:
+        if self.forest is not None:
+            backend = "compiled-mmap" if isinstance(self.forest.value, np.memmap) else "compiled"
+        else:
+            backend = "sklearn"
+        info = {
+            "model_version": self.version,
+            "source": self.source,
+            "backend": backend,
+            "sklearn_model_loaded": self._model is not None,
+            "features": self.feature_names,
+            "classes": self.class_labels,
+            **self.load_stats,
+        }
+        if self.forest is not None:
+            info.update({
+                "n_trees": self.forest.n_trees,
+                "n_nodes": self.forest.n_nodes,
+                "forest_bytes": self.forest.nbytes,
+            })
+        return info
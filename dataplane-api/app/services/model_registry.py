@@ -0,0 +1,149 @@
+"""
+Registro de versões do modelo em disco.
+
+Cada versão é um diretório imutável em MODEL_REGISTRY_DIR com o modelo, os
+encoders e um manifest.json (arquivos com sha256, features, classes e
+métricas de treino). O arquivo ACTIVE guarda a versão em uso, para que um
+restart volte com o último modelo carregado pelo endpoint administrativo.
+
+    model/registry/
+    ├── ACTIVE
+    └── <versão>/
+        ├── manifest.json
+        ├── model.joblib
+        ├── label_encoders.joblib
+        ├── target_encoder.joblib
+        └── compiled/        # artefato .npy gerado na primeira carga
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config.settings import settings
+
+
+MANIFEST_FILE = "manifest.json"
+ACTIVE_FILE = "ACTIVE"
+MODEL_FILE = "model.joblib"
+LABEL_ENCODERS_FILE = "label_encoders.joblib"
+TARGET_ENCODER_FILE = "target_encoder.joblib"
+COMPILED_DIR = "compiled"
+
+# Nomes de versão aceitos: usados como nome de diretório
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Acesso ao diretório de versões do modelo"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def version_dir(self, version: str) -> str:
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"Nome de versão inválido: '{version}'")
+        return os.path.join(self.root, version)
+
+    def get_manifest(self, version: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.version_dir(version), MANIFEST_FILE)
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """Manifests de todas as versões, da mais recente para a mais antiga"""
+        if not os.path.isdir(self.root):
+            return []
+        manifests = []
+        for name in os.listdir(self.root):
+            if VERSION_PATTERN.match(name):
+                manifest = self.get_manifest(name)
+                if manifest is not None:
+                    manifests.append(manifest)
+        manifests.sort(key=lambda manifest: manifest.get("created_at", ""), reverse=True)
+        return manifests
+
+    def active_version(self) -> Optional[str]:
+        """Versão marcada em ACTIVE ou, na falta dela, a mais recente"""
+        path = os.path.join(self.root, ACTIVE_FILE)
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                version = f.read().strip()
+            if version and self.get_manifest(version) is not None:
+                return version
+        versions = self.list_versions()
+        return versions[0]["version"] if versions else None
+
+    def active_mtime(self) -> Optional[int]:
+        """mtime (ns) do arquivo ACTIVE; muda a cada set_active, feito por qualquer worker"""
+        try:
+            return os.stat(os.path.join(self.root, ACTIVE_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def set_active(self, version: str):
+        """Grava a versão ativa de forma atômica (arquivo temporário + rename)"""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".active-", dir=self.root)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+
+    def publish(self, version: str, model_path: str, label_encoders_path: str,
+                target_encoder_path: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Copia modelo e encoders para uma nova versão e escreve o manifest.
+
+        A versão é montada num diretório temporário e renomeada no fim, então
+        nunca existe uma versão incompleta no registro. Versões são imutáveis:
+        publicar um nome já existente é um erro.
+        """
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise FileExistsError(f"A versão '{version}' já existe no registro")
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".publishing-", dir=self.root)
+        try:
+            files = {}
+            for name, source in (
+                (MODEL_FILE, model_path),
+                (LABEL_ENCODERS_FILE, label_encoders_path),
+                (TARGET_ENCODER_FILE, target_encoder_path),
+            ):
+                destination = os.path.join(staging, name)
+                shutil.copyfile(source, destination)
+                files[name] = {"sha256": file_sha256(destination), "bytes": os.path.getsize(destination)}
+
+            manifest = {
+                **(metadata or {}),
+                "version": version,
+                "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "files": files,
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.chmod(staging, 0o755)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return manifest
+
+
+# Instância global do registro de modelos
+model_registry = ModelRegistry(settings.MODEL_REGISTRY_DIR)
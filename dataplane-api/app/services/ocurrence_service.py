@@ -2,6 +2,8 @@ from typing import List, Optional, Union
 from app.models.database import get_collection
 from app.models.schemas import OcurrenceCoordinates, OcurrenceWithAeronave, AeronaveData
 from app.utils.logger import app_logger
+from app.utils.metrics import MONGO_DOCUMENTS_RETURNED, INVALID_DOCUMENTS_SKIPPED
+from app.utils.timing import timed
 
 
 class OcurrenceService:
@@ -73,49 +75,54 @@ class OcurrenceService:
             }
             
             cursor = collection.find(query, projection).skip(skip).limit(limit)
-            documents = await cursor.to_list(length=limit)
+            with timed("db_find"):
+                documents = await cursor.to_list(length=limit)
             
             app_logger.info(f"Documentos encontrados: {len(documents)}")
+            MONGO_DOCUMENTS_RETURNED.labels("ocorrencia").observe(len(documents))
             
             ocurrences = []
             invalid_count = 0
             
-            for doc in documents:
-                try:
-                    # Processamento otimizado das coordenadas
-                    lat = doc.get("ocorrencia_latitude")
-                    lon = doc.get("ocorrencia_longitude")
-                    
-                    # Converte coordenadas para float se necessário
-                    if isinstance(lat, str):
-                        lat = float(lat.replace(",", "."))
-                    if isinstance(lon, str):
-                        lon = float(lon.replace(",", "."))
-                    
-                    doc["ocorrencia_latitude"] = float(lat)
-                    doc["ocorrencia_longitude"] = float(lon)
-                    
-                    # Converte codigo_ocorrencia para string se necessário
-                    if isinstance(doc.get("codigo_ocorrencia"), (int, float)):
-                        doc["codigo_ocorrencia"] = str(doc["codigo_ocorrencia"])
-                    
-                    # Converte campos numéricos se necessário
-                    for field in ["total_recomendacoes", "total_aeronaves_envolvidas"]:
-                        if field in doc and doc[field] is not None:
-                            try:
-                                doc[field] = int(doc[field])
-                            except (ValueError, TypeError):
-                                doc[field] = None
-                    
-                    ocorrencia = OcurrenceCoordinates(**doc)
-                    ocurrences.append(ocorrencia)
-                    
-                except Exception as e:
-                    invalid_count += 1
-                    if invalid_count <= 10:  # Log apenas os primeiros 10 erros
-                        app_logger.warning(f"Erro ao processar ocorrência {doc.get('codigo_ocorrencia', 'unknown')}: {e}")
-                    continue
-            
+            with timed("transform"):
+                for doc in documents:
+                    try:
+                        # Processamento otimizado das coordenadas
+                        lat = doc.get("ocorrencia_latitude")
+                        lon = doc.get("ocorrencia_longitude")
+                        
+                        # Converte coordenadas para float se necessário
+                        if isinstance(lat, str):
+                            lat = float(lat.replace(",", "."))
+                        if isinstance(lon, str):
+                            lon = float(lon.replace(",", "."))
+                        
+                        doc["ocorrencia_latitude"] = float(lat)
+                        doc["ocorrencia_longitude"] = float(lon)
+                        
+                        # Converte codigo_ocorrencia para string se necessário
+                        if isinstance(doc.get("codigo_ocorrencia"), (int, float)):
+                            doc["codigo_ocorrencia"] = str(doc["codigo_ocorrencia"])
+                        
+                        # Converte campos numéricos se necessário
+                        for field in ["total_recomendacoes", "total_aeronaves_envolvidas"]:
+                            if field in doc and doc[field] is not None:
+                                try:
+                                    doc[field] = int(doc[field])
+                                except (ValueError, TypeError):
+                                    doc[field] = None
+                        
+                        ocorrencia = OcurrenceCoordinates(**doc)
+                        ocurrences.append(ocorrencia)
+                        
+                    except Exception as e:
+                        invalid_count += 1
+                        if invalid_count <= 10:  # Log apenas os primeiros 10 erros
+                            app_logger.warning(f"Erro ao processar ocorrência {doc.get('codigo_ocorrencia', 'unknown')}: {e}")
+                        continue
+                
+            if invalid_count:
+                INVALID_DOCUMENTS_SKIPPED.labels("ocorrencia").inc(invalid_count)
             app_logger.info(f"Processamento concluído - Válidos: {len(ocurrences)}, Inválidos: {invalid_count}")
             return ocurrences
             
@@ -166,7 +173,8 @@ class OcurrenceService:
             elif date_end:
                 query["ocorrencia_dia"] = {"$lte": date_end}
             
-            count = await collection.count_documents(query)
+            with timed("db_count"):
+                count = await collection.count_documents(query)
             return count
             
         except Exception as e:
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from app.utils.metrics import CACHE_REQUESTS
+
+
+class PredictionCache:
+    """
+    Cache LRU de predições, indexado pela tupla de features codificadas.
+
+    O espaço de entrada do formulário é pequeno e repetitivo, então
+    cenários já avaliados voltam sem passar pelo modelo. A chave inclui a
+    versão do modelo, o que invalida as entradas quando ele é trocado.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        # Lido no event loop e escrito no executor de inferência
+        self._lock = threading.Lock()
+        self._hits = CACHE_REQUESTS.labels("prediction", "hit")
+        self._misses = CACHE_REQUESTS.labels("prediction", "miss")
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+        if result is None:
+            self._misses.inc()
+            return None
+        self._hits.inc()
+        return dict(result)
+
+    def put(self, key: Hashable, result: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self._hits.value()
+        misses = self._misses.value()
+        total = hits + misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
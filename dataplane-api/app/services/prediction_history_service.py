@@ -0,0 +1,202 @@
+import base64
+import binascii
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from app.models.database import get_collection, get_ai_requests_history, save_ai_requests
+from app.utils.logger import app_logger
+
+AI_REQUESTS_COLLECTION = "ai_requests"
+HOURLY_COLLECTION = "ai_requests_hourly"
+
+# Limites superiores (ms) das faixas de latência; a última faixa é aberta
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+CONFIDENCE_BINS = 10
+
+
+def encode_cursor(created_at: datetime, document_id: ObjectId) -> str:
+    """Cursor opaco com a posição (created_at, _id) do último item da página"""
+    raw = f"{created_at.isoformat()}|{document_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Inverso de encode_cursor; ValueError se o cursor não foi gerado pela API"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, document_id = raw.split("|")
+        return datetime.fromisoformat(created_at), ObjectId(document_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise ValueError("Cursor inválido")
+
+
+def _latency_bucket(latency_ms: float) -> int:
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _confidence_bin(confidence: float) -> int:
+    return min(int(confidence * CONFIDENCE_BINS), CONFIDENCE_BINS - 1)
+
+
+def hourly_bucket_updates(records: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """
+    Agrupa os registros por (hora, versão do modelo, endpoint) e gera um
+    upsert com $inc por grupo: contagens por predição, histogramas de
+    confiança e de latência e totais.
+    """
+    groups: Dict[Tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for record in records:
+        hour = record["created_at"].replace(minute=0, second=0, microsecond=0)
+        increments = groups[(hour, record.get("model_version"), record.get("endpoint"))]
+        increments["total"] += 1
+        increments["latency_sum_ms"] += record["latency_ms"]
+        increments[f"latency_hist.{_latency_bucket(record['latency_ms'])}"] += 1
+        if record.get("error") is not None or record.get("prediction") is None:
+            increments["errors"] += 1
+            continue
+        # "." e "$" não são aceitos em chaves de campos aninhados
+        label = str(record["prediction"]).replace(".", "_").replace("$", "_")
+        increments[f"predictions.{label}"] += 1
+        increments[f"confidence_hist.{_confidence_bin(record['confidence'])}"] += 1
+
+    return [
+        UpdateOne(
+            {"hour": hour, "model_version": model_version, "endpoint": endpoint},
+            {"$inc": dict(increments)},
+            upsert=True,
+        )
+        for (hour, model_version, endpoint), increments in groups.items()
+    ]
+
+
+def histogram_percentile(histogram: Dict[str, float], quantile: float) -> Optional[float]:
+    """
+    Percentil aproximado a partir do histograma de latência, interpolando
+    dentro da faixa como o histogram_quantile do Prometheus. Na faixa
+    aberta devolve o maior limite.
+    """
+    counts = [histogram.get(str(index), 0) for index in range(len(LATENCY_BUCKETS_MS) + 1)]
+    total = sum(counts)
+    if not total:
+        return None
+    rank = quantile * total
+    cumulative = 0.0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index == len(LATENCY_BUCKETS_MS):
+                return float(LATENCY_BUCKETS_MS[-1])
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0.0
+            upper = LATENCY_BUCKETS_MS[index]
+            return round(lower + (upper - lower) * (rank - cumulative) / count, 3)
+        cumulative += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def merge_buckets(buckets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Soma os buckets de hora de uma janela num único resumo"""
+    total = errors = latency_sum = 0.0
+    predictions: Dict[str, float] = defaultdict(float)
+    confidence: Dict[str, float] = defaultdict(float)
+    latency: Dict[str, float] = defaultdict(float)
+    hourly: Dict[datetime, Dict[str, float]] = defaultdict(lambda: {"total": 0, "errors": 0})
+
+    for bucket in buckets:
+        total += bucket.get("total", 0)
+        errors += bucket.get("errors", 0)
+        latency_sum += bucket.get("latency_sum_ms", 0)
+        for target, field in ((predictions, "predictions"), (confidence, "confidence_hist"), (latency, "latency_hist")):
+            for key, count in bucket.get(field, {}).items():
+                target[key] += count
+        hourly[bucket["hour"]]["total"] += bucket.get("total", 0)
+        hourly[bucket["hour"]]["errors"] += bucket.get("errors", 0)
+
+    return {
+        "total": int(total),
+        "errors": int(errors),
+        "predictions": {label: int(count) for label, count in sorted(predictions.items())},
+        "confidence_histogram": [
+            {
+                "min": index / CONFIDENCE_BINS,
+                "max": (index + 1) / CONFIDENCE_BINS,
+                "count": int(confidence.get(str(index), 0)),
+            }
+            for index in range(CONFIDENCE_BINS)
+        ],
+        "latency_ms": {
+            "mean": round(latency_sum / total, 3) if total else None,
+            "p50": histogram_percentile(latency, 0.50),
+            "p90": histogram_percentile(latency, 0.90),
+            "p99": histogram_percentile(latency, 0.99),
+        },
+        "hourly": [
+            {"hour": hour, "total": int(values["total"]), "errors": int(values["errors"])}
+            for hour, values in sorted(hourly.items())
+        ],
+    }
+
+
+class PredictionHistoryService:
+    """Histórico das predições (collection ai_requests) e estatísticas agregadas por hora"""
+
+    @staticmethod
+    async def record_batch(records: List[Dict[str, Any]]) -> int:
+        """
+        Grava um lote de registros de auditoria e atualiza os buckets de hora
+        usados pelas estatísticas. Retorna quantos registros foram gravados.
+        """
+        inserted = await save_ai_requests(await get_collection(AI_REQUESTS_COLLECTION), records)
+        try:
+            hourly = await get_collection(HOURLY_COLLECTION)
+            await hourly.bulk_write(hourly_bucket_updates(records), ordered=False)
+        except Exception as e:
+            # Os registros já estão gravados; só as estatísticas ficam defasadas
+            app_logger.error(f"Erro ao atualizar as estatísticas por hora das predições: {e}")
+        return inserted
+
+    @staticmethod
+    async def get_history(limit: int = 50, cursor: Optional[str] = None,
+                          model_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Página do histórico, da mais recente para a mais antiga.
+
+        Paginação por keyset: o cursor guarda (created_at, _id) do último
+        item entregue e a próxima página começa logo depois dele pelo
+        índice, sem percorrer as páginas anteriores como o skip faria.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        collection = await get_collection(AI_REQUESTS_COLLECTION)
+        query = {"model_version": model_version} if model_version else {}
+        documents = await get_ai_requests_history(collection, limit=limit + 1, before=before, query=query)
+
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        next_cursor = None
+        if has_more:
+            last = documents[-1]
+            next_cursor = encode_cursor(last["created_at"], last["_id"])
+        for document in documents:
+            document["id"] = str(document.pop("_id"))
+        return {"items": documents, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def get_stats(hours: int = 24, model_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Distribuição das predições, histograma de confiança e percentis de
+        latência das últimas `hours` horas, somando os buckets de hora em vez
+        de varrer os registros individuais.
+        """
+        end = datetime.utcnow()
+        start = (end - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+        query: Dict[str, Any] = {"hour": {"$gte": start}}
+        if model_version:
+            query["model_version"] = model_version
+
+        collection = await get_collection(HOURLY_COLLECTION)
+        buckets = await collection.find(query, {"_id": 0}).to_list(length=None)
+        return {"start": start, "end": end, "model_version": model_version, **merge_buckets(buckets)}
@@ -0,0 +1,122 @@
+"""
+Profiling de alocações com tracemalloc, controlado pelos endpoints admin.
+
+Fluxo típico: iniciar com N requisições, disparar a carga (ex: rajada de
+complete=true) e consultar o relatório, que compara o snapshot inicial
+com o tirado automaticamente após a N-ésima requisição e lista os pontos
+de alocação que mais cresceram.
+"""
+
+import tracemalloc
+from datetime import datetime
+from typing import Optional
+from app.utils.logger import app_logger
+
+
+# Ignora alocações do próprio tracemalloc e do mecanismo de import
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class AllocationTracker:
+    """Controla o tracemalloc e guarda o par de snapshots comparado"""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.current: Optional[tracemalloc.Snapshot] = None
+        self.started_at: Optional[datetime] = None
+        self.target_requests = 0
+        self.seen_requests = 0
+        # Lido a cada requisição pelo AllocationTrackingMiddleware; só é True enquanto há contagem pendente
+        self.counting = False
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, nframes: int = 10, requests: int = 0):
+        """Inicia o tracemalloc e tira o snapshot inicial"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+        self.baseline = self._take_snapshot()
+        self.current = None
+        self.started_at = datetime.utcnow()
+        self.target_requests = requests
+        self.seen_requests = 0
+        self.counting = requests > 0
+        app_logger.info(f"tracemalloc iniciado (nframes={nframes}, requisições={requests})")
+
+    def snapshot(self):
+        """Tira o snapshot comparado com o inicial"""
+        if self.baseline is None:
+            raise RuntimeError("tracemalloc não foi iniciado")
+        self.current = self._take_snapshot()
+        self.counting = False
+
+    def on_request_finished(self) -> bool:
+        """
+        Conta uma requisição. Retorna True uma única vez, ao atingir o alvo:
+        quem chamou tira o snapshot fora do event loop.
+        """
+        self.seen_requests += 1
+        if self.counting and self.seen_requests >= self.target_requests:
+            self.counting = False
+            return True
+        return False
+
+    def stop(self):
+        """Para o tracemalloc e descarta os snapshots"""
+        tracemalloc.stop()
+        self.baseline = None
+        self.current = None
+        self.counting = False
+
+    def status(self) -> dict:
+        traced_current, traced_peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        return {
+            "tracing": self.tracing,
+            "started_at": self.started_at,
+            "target_requests": self.target_requests,
+            "seen_requests": self.seen_requests,
+            "has_baseline": self.baseline is not None,
+            "has_snapshot": self.current is not None,
+            "traced_memory_kb": round(traced_current / 1024, 1),
+            "traced_peak_kb": round(traced_peak / 1024, 1),
+        }
+
+    def report(self, limit: int = 20, group_by: str = "lineno") -> dict:
+        """Compara os snapshots e retorna os maiores crescimentos de alocação"""
+        if self.baseline is None:
+            raise RuntimeError("tracemalloc não foi iniciado")
+        current = self.current or self._take_snapshot()
+        stats = current.compare_to(self.baseline, group_by)
+        top = []
+        for stat in stats[:limit]:
+            frames = stat.traceback.format() if group_by == "traceback" else None
+            frame = stat.traceback[0]
+            top.append({
+                "location": f"{frame.filename}:{frame.lineno}" if group_by != "filename" else frame.filename,
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+                **({"traceback": frames} if frames is not None else {}),
+            })
+        return {
+            **self.status(),
+            "group_by": group_by,
+            "total_size_diff_kb": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            "top_allocations": top,
+        }
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+# Instância global do rastreador de alocações
+allocation_tracker = AllocationTracker()
@@ -0,0 +1,211 @@
+"""
+Leitura compartilhada dos CSVs de mongo-seeders/datasets.
+
+Seeding, collection mesclada e treino liam os mesmos arquivos (latin1,
+separados por ";") a cada execução. Aqui cada arquivo é lido uma vez, com
+os nomes de colunas limpos, e o DataFrame resultante fica em cache no disco
+com a chave do hash do arquivo: enquanto o CSV não mudar, as próximas
+leituras só abrem o cache, já com os tipos das colunas.
+
+O cache é Parquet quando o pyarrow está instalado e pickle quando não está
+(ou quando o Parquet não aceita alguma coluna). Arquivos sem cache são
+lidos em paralelo, um por processo.
+"""
+
+import hashlib
+import importlib.util
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.config.settings import settings
+from app.utils.logger import app_logger
+
+CSV_OPTIONS = {"sep": ";", "encoding": "latin1"}
+
+# Incrementar quando a normalização mudar, para não reaproveitar caches antigos
+CACHE_FORMAT_VERSION = 1
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 do conteúdo do arquivo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_csv(path: Path, engine: str = "c") -> pd.DataFrame:
+    """Lê o CSV inteiro com as opções dos datasets e limpa os nomes das colunas"""
+    df = pd.read_csv(path, engine=engine, **CSV_OPTIONS)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def write_cache(df: pd.DataFrame, base: Path) -> Path:
+    """
+    Grava o DataFrame em `base`.parquet (ou `base`.pkl) e retorna o caminho.
+    A escrita vai para um arquivo temporário renomeado no final, então um
+    processo concorrente nunca lê um cache pela metade.
+    """
+    base.parent.mkdir(parents=True, exist_ok=True)
+    if HAS_PYARROW:
+        target = base.with_suffix(".parquet")
+        tmp = target.with_suffix(f".parquet.{os.getpid()}.tmp")
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, target)
+            return target
+        except Exception as e:
+            # Colunas com tipos misturados não viram Parquet; o pickle aceita qualquer coluna
+            tmp.unlink(missing_ok=True)
+            app_logger.warning(f"Cache Parquet indisponível para {base.name}, usando pickle: {e}")
+    target = base.with_suffix(".pkl")
+    tmp = target.with_suffix(f".pkl.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+    return target
+
+
+def _restore_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    O Parquet devolve os vazios das colunas de texto como None; o read_csv
+    (e o pickle) usa NaN, e os chamadores dependem disso (astype(str) dá
+    'nan', os seeders gravam NaN).
+    """
+    for column in df.columns[(df.dtypes == object).to_numpy()]:
+        values = df[column]
+        df[column] = values.where(values.notna(), np.nan)
+    return df
+
+
+def read_cache(base: Path) -> Optional[pd.DataFrame]:
+    """DataFrame em cache para `base`, se houver, com os mesmos valores do parse_csv"""
+    parquet = base.with_suffix(".parquet")
+    if HAS_PYARROW and parquet.exists():
+        return _restore_missing(pd.read_parquet(parquet))
+    pickled = base.with_suffix(".pkl")
+    if pickled.exists():
+        with open(pickled, "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+def _parse_to_cache(path: str, engine: str, base: Optional[str]) -> Optional[pd.DataFrame]:
+    """
+    Executado num processo separado: lê o CSV e grava o cache. Com cache,
+    o DataFrame não volta pelo pipe; o processo principal lê o arquivo
+    gravado, que é mais rápido que desserializar o retorno.
+    """
+    df = parse_csv(Path(path), engine)
+    if base is None:
+        return df
+    write_cache(df, Path(base))
+    return None
+
+
+@dataclass
+class CsvLoadReport:
+    """Arquivos servidos pelo cache, arquivos lidos do CSV e tempo total"""
+    cached: List[str] = field(default_factory=list)
+    parsed: List[str] = field(default_factory=list)
+    workers: int = 1
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.cached)} do cache, {len(self.parsed)} lidos do CSV"
+            f" ({self.workers} processo(s)) em {self.elapsed_s:.2f}s"
+        )
+
+
+class CsvLoader:
+    """
+    Carrega um conjunto de CSVs em DataFrames, usando o cache por hash do
+    arquivo e lendo os que faltam em até `workers` processos.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, workers: int = 0,
+                 engine: str = "c", use_cache: bool = True):
+        # Sem diretório configurado, o cache fica em .cache ao lado dos CSVs
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.use_cache = use_cache
+
+        if self.engine == "pyarrow" and not HAS_PYARROW:
+            app_logger.warning("CSV_ENGINE=pyarrow sem o pacote pyarrow instalado; usando o leitor 'c' do pandas")
+            self.engine = "c"
+
+    def cache_base(self, path: Path, digest: str) -> Path:
+        """Caminho do cache sem extensão: <dir>/<nome>-<hash>-v<versão>"""
+        directory = self.cache_dir or path.parent / ".cache"
+        return directory / f"{path.stem}-{digest[:16]}-v{CACHE_FORMAT_VERSION}"
+
+    def _remove_stale(self, path: Path, keep: Path):
+        """Apaga caches de versões anteriores do mesmo CSV"""
+        for old in keep.parent.glob(f"{path.stem}-*"):
+            if old.name.split(".")[0] != keep.name and not old.name.endswith(".tmp"):
+                old.unlink(missing_ok=True)
+
+    def load(self, paths: Iterable[Path]) -> Tuple[Dict[str, pd.DataFrame], CsvLoadReport]:
+        """DataFrames por nome do arquivo (sem extensão) e o relatório da leitura"""
+        start = time.perf_counter()
+        report = CsvLoadReport()
+        frames: Dict[str, pd.DataFrame] = {}
+        bases: Dict[str, Optional[Path]] = {}
+        missing: List[Path] = []
+
+        for path in map(Path, paths):
+            base = self.cache_base(path, file_digest(path)) if self.use_cache else None
+            bases[path.stem] = base
+            df = read_cache(base) if base is not None else None
+            if df is not None:
+                frames[path.stem] = df
+                report.cached.append(path.stem)
+            else:
+                missing.append(path)
+
+        report.workers = min(self.workers, len(missing)) or 1
+        if report.workers > 1:
+            with ProcessPoolExecutor(max_workers=report.workers) as executor:
+                results = list(executor.map(
+                    _parse_to_cache,
+                    [str(path) for path in missing],
+                    [self.engine] * len(missing),
+                    [str(bases[path.stem]) if bases[path.stem] else None for path in missing],
+                ))
+            for path, df in zip(missing, results):
+                frames[path.stem] = df if df is not None else read_cache(bases[path.stem])
+        else:
+            for path in missing:
+                df = parse_csv(path, self.engine)
+                if bases[path.stem] is not None:
+                    write_cache(df, bases[path.stem])
+                frames[path.stem] = df
+
+        for path in missing:
+            report.parsed.append(path.stem)
+            if bases[path.stem] is not None:
+                self._remove_stale(path, bases[path.stem])
+
+        report.elapsed_s = time.perf_counter() - start
+        return frames, report
+
+
+# Instância global do leitor de CSVs
+csv_loader = CsvLoader(
+    cache_dir=settings.CSV_CACHE_DIR or None,
+    workers=settings.CSV_PARSE_WORKERS,
+    engine=settings.CSV_ENGINE,
+    use_cache=settings.CSV_CACHE_ENABLED,
+)
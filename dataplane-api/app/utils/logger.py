@@ -18,17 +18,21 @@ def setup_logger():
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=settings.LOG_LEVEL,
-        colorize=True
+        colorize=True,
+        enqueue=settings.LOG_ENQUEUE
     )
     
     # Configura o logger para arquivo
+    # Com enqueue=True a escrita, a rotação e a compressão rodam numa thread
+    # de background, fora do event loop
     logger.add(
         settings.LOG_FILE,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
         level=settings.LOG_LEVEL,
         rotation="10 MB",
         retention="7 days",
-        compression="zip"
+        compression="zip",
+        enqueue=settings.LOG_ENQUEUE
     )
     
     return logger
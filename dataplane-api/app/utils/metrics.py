@@ -0,0 +1,266 @@
+"""
+Métricas no formato de exposição do Prometheus, sem dependências externas.
+
+Cada métrica guarda seus contadores em "shards" por thread: a thread que
+registra um valor só escreve no próprio shard, então não há locks nem
+perda de incrementos quando callbacks do pymongo rodam no executor do
+motor. A leitura (scrape do /metrics) soma os shards.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216
+)
+COUNT_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 20000)
+
+
+class _ShardedValues:
+    """Vetor de floats com um shard por thread, somado na leitura"""
+
+    __slots__ = ("_size", "_shards")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._shards: Dict[int, List[float]] = {}
+
+    def local(self) -> List[float]:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            # setdefault é atômico no CPython
+            shard = self._shards.setdefault(ident, [0.0] * self._size)
+        return shard
+
+    def snapshot(self) -> List[float]:
+        total = [0.0] * self._size
+        for shard in list(self._shards.values()):
+            for i, value in enumerate(shard):
+                total[i] += value
+        return total
+
+
+class _CounterChild:
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1.0):
+        self._values.local()[0] += amount
+
+    def value(self) -> float:
+        return self._values.snapshot()[0]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self._values.local()[0] -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_values")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # Um slot por bucket, mais +Inf, soma e contagem
+        self._values = _ShardedValues(len(buckets) + 3)
+
+    def observe(self, value: float):
+        shard = self._values.local()
+        shard[bisect_left(self._buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        values = self._values.snapshot()
+        cumulative = []
+        running = 0.0
+        for count in values[:-2]:
+            running += count
+            cumulative.append(running)
+        return cumulative, values[-2], values[-1]
+
+
+class _Metric:
+    """Base para métricas com labels"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _format_labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.metric_type}"
+        for values, child in list(self._children.items()):
+            yield from self._collect_child(values, child)
+
+    def _collect_child(self, values, child) -> Iterable[str]:
+        yield f"{self.name}{self._format_labels(values)} {_format_value(child.value())}"
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _collect_child(self, values, child) -> Iterable[str]:
+        cumulative, total, count = child.snapshot()
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for bound, bucket_count in zip(bounds, cumulative):
+            labels = self._format_labels(values, f'le="{bound}"')
+            yield f"{self.name}_bucket{labels} {_format_value(bucket_count)}"
+        yield f"{self.name}_sum{self._format_labels(values)} {_format_value(total)}"
+        yield f"{self.name}_count{self._format_labels(values)} {_format_value(count)}"
+
+
+class MetricsRegistry:
+    """Registro global das métricas expostas em /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    # Formas do Prometheus para valores que int() não aceita
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+
+# HTTP
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total", "Total de requisições HTTP", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP", ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento"
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Tamanho do corpo das respostas HTTP", ["method", "route"],
+    buckets=SIZE_BUCKETS
+)
+
+# MongoDB
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds", "Duração dos comandos no MongoDB", ["collection", "command", "outcome"]
+)
+MONGO_DOCUMENTS_RETURNED = Histogram(
+    "mongodb_query_documents_returned", "Documentos retornados por consulta", ["collection"],
+    buckets=COUNT_BUCKETS
+)
+INVALID_DOCUMENTS_SKIPPED = Counter(
+    "ocurrence_invalid_documents_total", "Documentos descartados nos loops de limpeza", ["collection"]
+)
+
+# Caches
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Consultas a caches internos", ["cache", "result"]
+)
+
+# IA
+PREDICTION_DURATION = Histogram(
+    "prediction_duration_seconds", "Latência das predições do modelo", ["endpoint"]
+)
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "inference_queue_depth", "Predições aguardando um micro-lote"
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "inference_batch_size", "Linhas avaliadas por chamada ao modelo",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 10000)
+)
+AUDIT_RECORDS = Counter(
+    "prediction_audit_records_total", "Registros de auditoria de predições", ["outcome"]
+)
+AUDIT_QUEUE_DEPTH = Gauge(
+    "prediction_audit_queue_depth", "Registros de auditoria aguardando gravação"
+)
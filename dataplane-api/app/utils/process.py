@@ -0,0 +1,32 @@
+"""
+Informações de memória do processo atual, sem dependências externas.
+"""
+
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Memória residente (RSS) atual do processo, lida de /proc no Linux"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_resident_memory_bytes() -> Optional[int]:
+    """Pico de memória residente do processo"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS em bytes
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,103 @@
+"""
+Profiler por amostragem para requisições individuais.
+
+Uma thread amostra periodicamente as pilhas das demais threads via
+``sys._current_frames()`` e acumula as pilhas no formato "folded"
+(``thread;modulo:funcao:linha;... contagem``), aceito diretamente por
+flamegraph.pl, speedscope e inferno. Amostras de threads ociosas
+(bloqueadas em select/wait/get) são descartadas.
+
+Como o event loop é compartilhado, as amostras incluem o trabalho de
+outras requisições concorrentes que rodaram durante o profiling.
+"""
+
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.config.settings import settings
+
+
+# Funções onde uma thread está apenas esperando trabalho
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "wait", "get", "accept", "_recv", "sleep", "_worker"}
+
+
+class StackSampler(threading.Thread):
+    """Thread que amostra as pilhas do processo até ser parada"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self._stop_event.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+                self.stacks[self._fold(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+            self._stop_event.wait(self.interval)
+
+    @staticmethod
+    def _fold(thread_name: str, frame) -> str:
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        parts.append(thread_name.replace(";", "_").replace(" ", "_"))
+        return ";".join(reversed(parts))
+
+    def stop(self) -> str:
+        """Para a amostragem e retorna as pilhas no formato folded"""
+        self._stop_event.set()
+        self.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class ProfileStore:
+    """Guarda os últimos profiles de requisições em memória"""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+
+    def add(self, method: str, path: str, status_code: int, duration: float,
+            samples: int, folded: str) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        self._profiles[profile_id] = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "status_code": status_code,
+            "created_at": datetime.utcnow(),
+            "duration_ms": round(duration * 1000, 3),
+            "samples": samples,
+            "folded": folded,
+        }
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        return [
+            {key: value for key, value in profile.items() if key != "folded"}
+            for profile in reversed(list(self._profiles.values()))
+        ]
+
+    def clear(self):
+        self._profiles.clear()
+
+
+# Instância global dos profiles armazenados
+profile_store = ProfileStore(max_profiles=settings.PROFILING_MAX_STORED)
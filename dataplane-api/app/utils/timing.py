@@ -0,0 +1,63 @@
+"""
+Cronometragem por fase das requisições, exposta no header Server-Timing.
+
+O ServerTimingMiddleware cria um ServerTiming por requisição e o guarda
+num ContextVar; serviços e controllers marcam fases com ``timed("nome")``.
+Fora de uma requisição (scripts, testes) ``timed`` não faz nada.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class ServerTiming:
+    """Acumula a duração de cada fase de uma requisição"""
+
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, duration: float):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def as_dict(self) -> Dict[str, float]:
+        """Retorna as fases em milissegundos"""
+        return {name: round(duration * 1000, 3) for name, duration in self.phases.items()}
+
+    def header_value(self, total: Optional[float] = None) -> str:
+        metrics = [f"{name};dur={duration * 1000:.3f}" for name, duration in self.phases.items()]
+        if total is not None:
+            metrics.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(metrics)
+
+
+_current_timing: ContextVar[Optional[ServerTiming]] = ContextVar("server_timing", default=None)
+
+
+def start_timing() -> ServerTiming:
+    """Inicia a cronometragem da requisição corrente"""
+    timing = ServerTiming()
+    _current_timing.set(timing)
+    return timing
+
+
+def get_timing() -> Optional[ServerTiming]:
+    """Retorna a cronometragem da requisição corrente, se houver"""
+    return _current_timing.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Registra a duração do bloco como uma fase da requisição corrente"""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Script para gerar o artefato compilado do modelo (model/compiled/<versão>)
+Rode uma vez após trocar o checkpoint, antes de subir os workers: todos
+passam a abrir os mesmos arquivos .npy com mmap, sem ler o joblib.
+
+Com --register <versão>, publica o checkpoint atual (model/checkpoint e
+encoders) como uma versão do registro de modelos e a compila.
+"""
+
+import argparse
+import sys
+from app.services.ai_service import (
+    ai_service, LABEL_ENCODERS_PATH, MODEL_PATH, TARGET_ENCODER_PATH
+)
+from app.services.model_registry import model_registry
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Compila o modelo em arrays .npy")
+    parser.add_argument("--register", metavar="VERSAO", help="Publica o checkpoint no registro com este nome")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧩 COMPILAÇÃO DO MODELO")
+    print("=" * 60)
+
+    if args.register:
+        try:
+            model_registry.publish(
+                args.register, MODEL_PATH, LABEL_ENCODERS_PATH, TARGET_ENCODER_PATH,
+                {"description": "Checkpoint publicado via compile_model.py"}
+            )
+        except (OSError, ValueError) as e:
+            print(f"❌ Erro ao publicar a versão: {e}")
+            sys.exit(1)
+        model_registry.set_active(args.register)
+        print(f"📦 Versão {args.register} publicada em {model_registry.version_dir(args.register)}")
+
+    try:
+        warmup_ms = ai_service.warm_up()
+    except Exception as e:
+        print(f"❌ Erro ao carregar o modelo: {e}")
+        sys.exit(1)
+
+    info = ai_service.get_model_info()
+    if info["backend"] == "sklearn":
+        print("❌ A floresta compilada não passou na verificação; veja os logs")
+        sys.exit(1)
+
+    print(f"✅ Versão do modelo: {info['model_version']}")
+    print(f"📂 Origem: {info['loaded_from']}")
+    print(f"🌲 Árvores: {info['n_trees']} - nós: {info['n_nodes']}")
+    print(f"💾 Tamanho dos arrays: {info['forest_bytes'] / 1024 / 1024:.1f} MB")
+    print(f"⏱️  Carga: {info['load_time_ms']:.1f} ms - warm-up: {warmup_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from app.routes.api_router import api_router
 from app.middleware.logging import LoggingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.server_timing import ServerTimingMiddleware
+from app.middleware.profiling import AllocationTrackingMiddleware, ProfilingMiddleware
+from app.controllers.metrics_controller import metrics_router
 from app.middleware.cors import setup_cors
 from app.utils.logger import logger
 from app.services.ai_service import ai_service
+from app.services.inference_batcher import inference_batcher
+from app.services.audit_writer import audit_writer
 from app.config.settings import settings
+from app.models.database import mongodb
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -16,18 +24,45 @@ app = FastAPI(
 # Configuração de CORS
 setup_cors(app)
 
+# Adiciona o profiling sob demanda; registrado antes dos demais para ficar
+# por dentro deles, de modo que log, métricas e Server-Timing continuam valendo
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Conta as requisições para o snapshot automático do tracemalloc (?requests=N)
+app.add_middleware(AllocationTrackingMiddleware)
+
 # Adiciona o middleware de logging
 app.add_middleware(LoggingMiddleware)
 
+# Adiciona o middleware de métricas
+app.add_middleware(MetricsMiddleware)
+
+# Adiciona o header Server-Timing com as fases de cada requisição
+app.add_middleware(ServerTimingMiddleware)
+
 # Adiciona as rotas da API
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Endpoint de métricas no formato do Prometheus (fora do prefixo da API)
+app.include_router(metrics_router)
+
 @app.on_event("startup")
 async def startup_event():
     """
     Funções a serem executadas na inicialização da aplicação.
     """
     logger.info("🚀 Iniciando a aplicação...")
+    if settings.MODEL_LOAD_ON_STARTUP:
+        # Carrega o modelo e faz o warm-up fora do event loop
+        try:
+            warmup_ms = await asyncio.get_running_loop().run_in_executor(None, ai_service.warm_up)
+            logger.info(f"🤖 Modelo pronto (warm-up: {warmup_ms:.1f} ms)")
+        except Exception as e:
+            logger.error(f"Modelo indisponível: {e}")
+    await inference_batcher.start()
+    if settings.AUDIT_ENABLED:
+        await audit_writer.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -35,6 +70,12 @@ async def shutdown_event():
     Funções a serem executadas no encerramento da aplicação.
     """
     logger.info("🔌 Encerrando a aplicação...")
+    await inference_batcher.stop()
+    # Grava os registros de auditoria pendentes antes de fechar a conexão
+    await audit_writer.stop()
+    await mongodb.disconnect()
+    # Aguarda a fila de logs ser escrita antes de encerrar
+    await logger.complete()
 
 if __name__ == "__main__":
     uvicorn.run(
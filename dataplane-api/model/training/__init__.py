@@ -0,0 +1 @@
+"""Pipeline de treino do modelo (ver train_model.py)"""
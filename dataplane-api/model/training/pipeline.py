@@ -0,0 +1,231 @@
+"""
+Pipeline de treino do modelo de nível de dano.
+
+Reproduz o notebook do Colab (model/notebook/projeto_ia_retificado.py) a
+partir dos CSVs locais em mongo-seeders/datasets:
+
+    ocorrencia ⟕ ocorrencia_tipo ⟕ fator_contribuinte ⟕ aeronave
+    → remove linhas sem fator_area → alvo ausente vira "NENHUM"
+
+Os CSVs vêm do csv_loader (cache por hash do arquivo) e só as colunas que
+o modelo usa seguem adiante; as limpezas são operações vetorizadas do
+pandas (sem cópias intermediárias), e o RandomForest e a validação cruzada
+usam todos os núcleos.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+from sklearn.preprocessing import LabelEncoder
+from app.utils.csv_loader import csv_loader
+
+
+DATASETS_PATH = Path(__file__).resolve().parents[2] / "mongo-seeders" / "datasets"
+
+FEATURES_TO_ENCODE = ['aeronave_tipo_operacao', 'fator_area', 'aeronave_tipo_veiculo', 'ocorrencia_uf']
+FEATURE_COLUMNS = [
+    'aeronave_tipo_operacao', 'fator_area', 'aeronave_tipo_veiculo',
+    'aeronave_ano_fabricacao', 'ocorrencia_uf', 'aeronave_fatalidades_total',
+]
+TARGET_COLUMN = 'aeronave_nivel_dano'
+
+# Colunas lidas de cada CSV (as de ocorrencia_tipo só servem para o dropna do notebook)
+CSV_COLUMNS = {
+    'ocorrencia': ['codigo_ocorrencia', 'ocorrencia_uf'],
+    'ocorrencia_tipo': ['codigo_ocorrencia1', 'ocorrencia_tipo', 'ocorrencia_tipo_categoria', 'taxonomia_tipo_icao'],
+    'fator_contribuinte': ['codigo_ocorrencia3', 'fator_area'],
+    'aeronave': [
+        'codigo_ocorrencia2', 'aeronave_tipo_veiculo', 'aeronave_ano_fabricacao',
+        'aeronave_tipo_operacao', 'aeronave_nivel_dano', 'aeronave_fatalidades_total',
+    ],
+}
+
+# Marcadores de valor ausente nas colunas texto de aeronave.csv
+AERONAVE_MISSING_MARKERS = ['***', '****', '*****', 'NULL']
+
+
+@dataclass
+class TrainingConfig:
+    """Hiperparâmetros e opções do treino"""
+    n_estimators: int = 100
+    max_depth: Optional[int] = 15
+    test_size: float = 0.2
+    cv_folds: int = 5
+    random_state: int = 42
+    n_jobs: int = -1
+
+
+@dataclass
+class TrainingResult:
+    """Modelo treinado, encoders e métricas"""
+    model: RandomForestClassifier
+    label_encoders: Dict[str, LabelEncoder]
+    target_encoder: LabelEncoder
+    metrics: Dict[str, float]
+    n_rows: int
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class StageTimer:
+    """Mede e imprime o tempo de parede de cada etapa do pipeline"""
+
+    def __init__(self, verbose: bool = True):
+        self.verbose = verbose
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.verbose:
+            print(f"▶️  {name}...")
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.timings[name] = round(elapsed, 3)
+        if self.verbose:
+            print(f"   ⏱️  {name}: {elapsed:.2f}s")
+
+
+def load_datasets(datasets_path: Path = DATASETS_PATH) -> Dict[str, pd.DataFrame]:
+    """CSVs pelo csv_loader (cache compartilhado com os seeders), só com as colunas usadas"""
+    frames, _ = csv_loader.load(datasets_path / f"{name}.csv" for name in CSV_COLUMNS)
+    return {name: frames[name][columns] for name, columns in CSV_COLUMNS.items()}
+
+
+def build_training_frame(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Junta as tabelas como o notebook, mas só com as colunas usadas.
+
+    Os joins são feitos só com as chaves e colunas necessárias: a
+    multiplicidade de linhas (uma ocorrência com vários tipos e fatores)
+    é a mesma do notebook, sem carregar as demais colunas em cada cópia.
+    """
+    tipos = data['ocorrencia_tipo'].dropna()[['codigo_ocorrencia1']]
+    tipos = tipos.rename(columns={'codigo_ocorrencia1': 'codigo_ocorrencia'})
+
+    fatores = data['fator_contribuinte'].rename(columns={'codigo_ocorrencia3': 'codigo_ocorrencia'})
+    fatores['fator_area'] = fatores['fator_area'].replace('***', 'FATOR NÃO INFORMADO')
+
+    aeronave = data['aeronave'].rename(columns={'codigo_ocorrencia2': 'codigo_ocorrencia'})
+    for col in aeronave.select_dtypes(include=['object']).columns:
+        aeronave[col] = aeronave[col].str.strip().replace(AERONAVE_MISSING_MARKERS, pd.NA)
+
+    df = (
+        data['ocorrencia']
+        .merge(tipos, on='codigo_ocorrencia', how='left')
+        .merge(fatores, on='codigo_ocorrencia', how='left')
+        .merge(aeronave, on='codigo_ocorrencia', how='left')
+    )
+    df = df.dropna(subset=['fator_area'])
+    df[TARGET_COLUMN] = df[TARGET_COLUMN].fillna("NENHUM")
+    return df[FEATURE_COLUMNS + [TARGET_COLUMN]].reset_index(drop=True)
+
+
+def encode_features(df: pd.DataFrame):
+    """Codifica as categorias com LabelEncoder (mesmo formato servido pela API)"""
+    X = df[FEATURE_COLUMNS].copy()
+    label_encoders = {}
+    for col in FEATURES_TO_ENCODE:
+        encoder = LabelEncoder()
+        X[col] = encoder.fit_transform(X[col].astype(str))
+        label_encoders[col] = encoder
+    target_encoder = LabelEncoder()
+    y = target_encoder.fit_transform(df[TARGET_COLUMN].astype(str))
+    return X, y, label_encoders, target_encoder
+
+
+def build_model(config: TrainingConfig, n_jobs: Optional[int] = None) -> RandomForestClassifier:
+    return RandomForestClassifier(
+        n_estimators=config.n_estimators,
+        max_depth=config.max_depth,
+        random_state=config.random_state,
+        n_jobs=n_jobs,
+    )
+
+
+def train(config: TrainingConfig, datasets_path: Path = DATASETS_PATH,
+          timer: Optional[StageTimer] = None) -> TrainingResult:
+    """Executa o pipeline completo e devolve o modelo treinado com as métricas"""
+    timer = timer or StageTimer()
+
+    with timer.stage("Leitura dos CSVs"):
+        data = load_datasets(datasets_path)
+    with timer.stage("Montagem das features"):
+        df = build_training_frame(data)
+        X, y, label_encoders, target_encoder = encode_features(df)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=config.test_size, random_state=config.random_state
+    )
+
+    with timer.stage("Treino"):
+        model = build_model(config, n_jobs=config.n_jobs).fit(X_train, y_train)
+    with timer.stage("Avaliação no conjunto de teste"):
+        y_pred = model.predict(X_test)
+        metrics = {
+            "accuracy": float(accuracy_score(y_test, y_pred)),
+            "f1_macro": float(f1_score(y_test, y_pred, average="macro")),
+        }
+
+    if config.cv_folds > 1:
+        with timer.stage(f"Validação cruzada ({config.cv_folds} folds)"):
+            # Mesmos folds do cross_val_score(cv=5) do notebook; paraleliza
+            # entre folds, com cada floresta em um núcleo
+            scores = cross_validate(
+                clone(build_model(config)), X, y, cv=StratifiedKFold(n_splits=config.cv_folds),
+                scoring=("accuracy", "f1_macro"), n_jobs=config.n_jobs
+            )
+            metrics.update({
+                "cv_accuracy_mean": float(np.mean(scores["test_accuracy"])),
+                "cv_accuracy_std": float(np.std(scores["test_accuracy"])),
+                "cv_f1_macro_mean": float(np.mean(scores["test_f1_macro"])),
+            })
+
+    # O modelo servido roda uma predição por vez; sem despacho para threads
+    model.n_jobs = None
+    return TrainingResult(
+        model=model, label_encoders=label_encoders, target_encoder=target_encoder,
+        metrics=metrics, n_rows=len(X), timings=timer.timings
+    )
+
+
+def publish(result: TrainingResult, config: TrainingConfig, version: str, registry) -> dict:
+    """Grava modelo e encoders como uma nova versão do registro de modelos"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "model": os.path.join(tmp, "model.joblib"),
+            "label_encoders": os.path.join(tmp, "label_encoders.joblib"),
+            "target_encoder": os.path.join(tmp, "target_encoder.joblib"),
+        }
+        joblib.dump(result.model, paths["model"])
+        joblib.dump(result.label_encoders, paths["label_encoders"])
+        joblib.dump(result.target_encoder, paths["target_encoder"])
+        return registry.publish(
+            version, paths["model"], paths["label_encoders"], paths["target_encoder"],
+            {
+                "description": "Treinado por train_model.py",
+                "algorithm": "RandomForestClassifier",
+                "sklearn_version": sklearn.__version__,
+                "params": {
+                    "n_estimators": config.n_estimators,
+                    "max_depth": config.max_depth,
+                    "random_state": config.random_state,
+                },
+                "features": FEATURE_COLUMNS,
+                "classes": [str(label) for label in result.target_encoder.classes_],
+                "training_rows": result.n_rows,
+                "metrics": result.metrics,
+                "timings_s": result.timings,
+            }
+        )
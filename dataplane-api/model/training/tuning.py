@@ -0,0 +1,184 @@
+"""
+Varredura de hiperparâmetros pesando acurácia contra custo de serviço.
+
+Para cada candidato treina no mesmo split do pipeline de treino e mede:
+acurácia e F1 no teste, tamanho do artefato (joblib e arrays compilados),
+tempo de carga, e latência p50/p99 de uma linha e de um lote, pelo mesmo
+caminho que a API usa (floresta compilada até COMPILED_FOREST_MAX_ROWS
+linhas, sklearn acima disso). A fronteira de Pareto marca os candidatos
+que nenhum outro supera ao mesmo tempo em F1, latência e tamanho.
+"""
+
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from app.config.settings import settings
+from app.services.forest_compiler import compile_forest, load_compiled_forest, save_compiled_forest
+from model.training.pipeline import (
+    FEATURES_TO_ENCODE, TrainingConfig, build_training_frame, encode_features, load_datasets
+)
+
+
+@dataclass
+class Candidate:
+    """Um modelo a avaliar"""
+    name: str
+    estimator: Any
+
+
+@dataclass
+class CandidateReport:
+    name: str
+    metrics: Dict[str, float] = field(default_factory=dict)
+    pareto: bool = False
+
+
+def random_forest_grid(n_estimators: Iterable[int], max_depths: Iterable[Optional[int]],
+                       random_state: int = 42) -> List[Candidate]:
+    return [
+        Candidate(
+            f"rf-{trees}x{depth or 'inf'}",
+            RandomForestClassifier(n_estimators=trees, max_depth=depth, random_state=random_state)
+        )
+        for trees in n_estimators
+        for depth in max_depths
+    ]
+
+
+def hist_gradient_boosting_candidates(feature_names: List[str], random_state: int = 42) -> List[Candidate]:
+    categorical = [name in FEATURES_TO_ENCODE for name in feature_names]
+    return [
+        Candidate(
+            f"hgb-{iterations}",
+            HistGradientBoostingClassifier(
+                max_iter=iterations, categorical_features=categorical, random_state=random_state
+            )
+        )
+        for iterations in (100, 300)
+    ]
+
+
+def _percentiles_ms(samples: List[float]) -> Dict[str, float]:
+    values = np.array(samples) * 1000
+    return {"p50": round(float(np.percentile(values, 50)), 4), "p99": round(float(np.percentile(values, 99)), 4)}
+
+
+def _time_calls(predict, X: np.ndarray, repeats: int) -> List[float]:
+    predict(X)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def forest_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def evaluate_candidate(candidate: Candidate, X_train, y_train, X_test, y_test,
+                       batch_size: int = 256, repeats: int = 200) -> CandidateReport:
+    report = CandidateReport(candidate.name)
+    m = report.metrics
+
+    start = time.perf_counter()
+    model = candidate.estimator.fit(X_train, y_train)
+    m["fit_s"] = round(time.perf_counter() - start, 3)
+
+    X_test_array = np.asarray(X_test, dtype=np.float64)
+    # Como no serviço: arrays NumPy, sem validação de nomes de colunas
+    if hasattr(model, "feature_names_in_"):
+        del model.feature_names_in_
+    y_pred = model.predict(X_test_array)
+    m["accuracy"] = round(float(accuracy_score(y_test, y_pred)), 4)
+    m["f1_macro"] = round(float(f1_score(y_test, y_pred, average="macro")), 4)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        joblib_path = os.path.join(tmp, "model.joblib")
+        joblib.dump(model, joblib_path)
+        m["joblib_mb"] = round(os.path.getsize(joblib_path) / 1024 / 1024, 2)
+        start = time.perf_counter()
+        joblib.load(joblib_path)
+        m["joblib_load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        forest = None
+        if isinstance(model, RandomForestClassifier):
+            compiled_dir = os.path.join(tmp, "compiled")
+            save_compiled_forest(compile_forest(model), compiled_dir, {})
+            m["compiled_mb"] = round(forest_size(compiled_dir) / 1024 / 1024, 2)
+            start = time.perf_counter()
+            forest, _ = load_compiled_forest(compiled_dir, mmap_mode="r")
+            m["compiled_load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        def serve(X):
+            # Mesmo despacho do ModelBundle.predict_proba
+            if forest is not None and len(X) <= settings.COMPILED_FOREST_MAX_ROWS:
+                return forest.predict_proba(X)
+            return model.predict_proba(X)
+
+        single = _time_calls(serve, X_test_array[:1], repeats)
+        batch = _time_calls(serve, X_test_array[:batch_size], max(repeats // 10, 5))
+        m.update({f"single_{k}_ms": v for k, v in _percentiles_ms(single).items()})
+        m.update({f"batch_{k}_ms": v for k, v in _percentiles_ms(batch).items()})
+        m["backend"] = "compiled" if forest is not None else "sklearn"
+    return report
+
+
+def mark_pareto(reports: List[CandidateReport]):
+    """
+    Marca os candidatos não dominados: nenhum outro tem F1 maior ou igual
+    com latência p99 de uma linha e tamanho do artefato menores ou iguais
+    (e ao menos um estritamente melhor).
+    """
+    def costs(report):
+        size = report.metrics.get("compiled_mb", report.metrics["joblib_mb"])
+        return (-report.metrics["f1_macro"], report.metrics["single_p99_ms"], size)
+
+    for report in reports:
+        mine = costs(report)
+        report.pareto = not any(
+            all(a <= b for a, b in zip(costs(other), mine)) and costs(other) != mine
+            for other in reports if other is not report
+        )
+
+
+def run_sweep(candidates: List[Candidate], config: TrainingConfig,
+              batch_size: int = 256, repeats: int = 200, verbose: bool = True) -> List[CandidateReport]:
+    X, y, _, _ = encode_features(build_training_frame(load_datasets()))
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=config.test_size, random_state=config.random_state
+    )
+    reports = []
+    for candidate in candidates:
+        if verbose:
+            print(f"   🔬 {candidate.name}...")
+        reports.append(evaluate_candidate(candidate, X_train, y_train, X_test, y_test, batch_size, repeats))
+    mark_pareto(reports)
+    return reports
+
+
+REPORT_COLUMNS = [
+    ("accuracy", "acc"), ("f1_macro", "f1"), ("joblib_mb", "joblib MB"), ("compiled_mb", "npy MB"),
+    ("joblib_load_ms", "load joblib ms"), ("compiled_load_ms", "load mmap ms"),
+    ("single_p50_ms", "1 linha p50"), ("single_p99_ms", "1 linha p99"),
+    ("batch_p50_ms", "lote p50"), ("batch_p99_ms", "lote p99"), ("backend", "backend"),
+]
+
+
+def format_table(reports: List[CandidateReport]) -> str:
+    """Tabela em Markdown, ordenada por F1"""
+    header = ["candidato", "pareto"] + [title for _, title in REPORT_COLUMNS]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for report in sorted(reports, key=lambda item: item.metrics["f1_macro"], reverse=True):
+        cells = [report.name, "★" if report.pareto else ""]
+        cells += [str(report.metrics.get(key, "-")) for key, _ in REPORT_COLUMNS]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
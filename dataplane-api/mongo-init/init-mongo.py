@@ -64,8 +64,16 @@ def main():
         print("🔍 Criando índices para 'ai_requests'...")
         dataplane_db.ai_requests.create_index([("created_at", -1)])
         dataplane_db.ai_requests.create_index([("model_name", 1)])
+        # Paginação por keyset do histórico: (created_at, _id), com e sem filtro de versão
+        dataplane_db.ai_requests.create_index([("created_at", -1), ("_id", -1)])
+        dataplane_db.ai_requests.create_index([("model_version", 1), ("created_at", -1), ("_id", -1)])
         print("🔍 Índices criados com sucesso.")
 
+        # Buckets por hora das estatísticas de predição
+        dataplane_db.ai_requests_hourly.create_index(
+            [("hour", 1), ("model_version", 1), ("endpoint", 1)], unique=True
+        )
+
         print(f"\n✅ MongoDB inicializado com sucesso para o banco '{app_db}'!")
 
     except ConnectionFailure as e:
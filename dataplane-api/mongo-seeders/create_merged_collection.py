@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """
 Script para criar uma collection mesclada com dados de todas as tabelas relacionadas a ocorrências
+
+Uso:
+    python create_merged_collection.py                 # reconstrói a collection inteira
+    python create_merged_collection.py --incremental   # recalcula só as ocorrências que mudaram
 """
 
+import argparse
+
 import pandas as pd
-from pymongo import MongoClient
+from pymongo import DeleteMany, MongoClient, ReplaceOne, ReturnDocument
 from pymongo.errors import ConnectionFailure, OperationFailure
 import os
 import sys
@@ -12,13 +18,78 @@ from pathlib import Path
 from dotenv import load_dotenv
 from tqdm import tqdm
 import json
+import time
+from datetime import datetime
 
 # Carrega o .env da API
 dotenv_path = Path(__file__).resolve().parents[1] / '.env'
 load_dotenv(dotenv_path=dotenv_path)
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parent))
 from app.config.settings import settings
+from app.services.dataset_summary_service import DATASET_VERSIONS_COLLECTION
+from app.utils.csv_loader import csv_loader
+from seed_utils import (
+    GroupHasher, HashStore, ParallelBulkWriter, StageTimings, combine_digests, diff_digests, frame_records,
+    time_saved_summary
+)
+
+# Coluna com o código da ocorrência em cada CSV
+SOURCE_KEYS = {
+    'ocorrencia': 'codigo_ocorrencia',
+    'ocorrencia_tipo': 'codigo_ocorrencia1',
+    'aeronave': 'codigo_ocorrencia2',
+    'fator_contribuinte': 'codigo_ocorrencia3',
+    'recomendacao': 'codigo_ocorrencia4',
+}
+
+
+# Tabelas 1:N unidas à ocorrência: (tabela, coluna do código, {coluna: separador}, mensagem)
+JOINED_TABLES = [
+    ('ocorrencia_tipo', 'codigo_ocorrencia1', {
+        'ocorrencia_tipo': '; ',
+        'ocorrencia_tipo_categoria': '; ',
+        'taxonomia_tipo_icao': '; ',
+    }, '📋 Mesclando tipos de ocorrência'),
+    ('fator_contribuinte', 'codigo_ocorrencia3', {
+        'fator_nome': '; ',
+        'fator_aspecto': '; ',
+        'fator_condicionante': '; ',
+        'fator_area': '; ',
+    }, '⚠️  Mesclando fatores contribuintes'),
+    ('recomendacao', 'codigo_ocorrencia4', {
+        'recomendacao_numero': '; ',
+        'recomendacao_conteudo': ' | ',
+        'recomendacao_status': '; ',
+        'recomendacao_destinatario': '; ',
+    }, '📝 Mesclando recomendações'),
+]
+
+
+def join_unique(df: pd.DataFrame, key: str, columns: dict) -> pd.DataFrame:
+    """
+    Um registro por código com os valores distintos de cada coluna, na ordem
+    em que aparecem, unidos pelo separador. Mesmo resultado de
+    groupby(key).agg(lambda x: sep.join(x.astype(str).unique())), sem uma
+    chamada Python por grupo.
+
+    Códigos e textos viram códigos inteiros (pd.factorize, como um
+    categorical), então a deduplicação compara inteiros. Só os grupos com
+    mais de um valor distinto passam pelo join de strings.
+    """
+    group_codes, keys = pd.factorize(df[key], sort=True)
+    valid = group_codes >= 0
+    result = pd.DataFrame({key: keys})
+    for column, separator in columns.items():
+        value_codes, values = pd.factorize(df[column].astype(str))
+        pairs = pd.DataFrame({'group': group_codes[valid], 'value': value_codes[valid]}).drop_duplicates()
+        pairs['value'] = values.take(pairs['value'].to_numpy())
+        repeated = pairs['group'].duplicated(keep=False).to_numpy()
+        single = pairs.loc[~repeated].set_index('group')['value']
+        joined = pairs.loc[repeated].groupby('group', sort=False)['value'].agg(separator.join)
+        result[column] = pd.concat([single, joined]).astype(object)
+    return result
 
 
 class MergedCollectionCreator:
@@ -66,8 +137,12 @@ class MergedCollectionCreator:
             self.client.close()
             print("🔌 Conexão fechada.")
     
-    def load_csv_data(self) -> dict:
-        """Carrega todos os CSVs em DataFrames"""
+    def load_csv_data(self, frames: dict = None) -> dict:
+        """
+        Carrega todos os CSVs em DataFrames. `frames` são os CSVs já lidos
+        pelo csv_loader; eles não são alterados, então podem ser usados ao
+        mesmo tempo por outra etapa.
+        """
         print("📂 Carregando arquivos CSV...")
         data = {}
         
@@ -79,16 +154,20 @@ class MergedCollectionCreator:
             'recomendacao': self.datasets_path / 'recomendacao.csv'
         }
         
+        # Arquivos inalterados vêm do cache; os demais são lidos em paralelo
+        if frames is None:
+            frames, report = csv_loader.load(path for path in csv_files.values() if path.exists())
+            print(f"   ⚡ {report.summary()}")
+
         for name, file_path in csv_files.items():
-            if file_path.exists():
+            if name in frames:
                 print(f"   📄 Carregando {name}...")
-                df = pd.read_csv(file_path, sep=';', encoding='latin1')
-                df.columns = df.columns.str.strip()
+                df = frames[name]
                 
                 # Converte todos os códigos de ocorrência para string para evitar problemas de tipo no merge
                 codigo_columns = [col for col in df.columns if col.startswith('codigo_ocorrencia')]
+                df = df.astype({col: str for col in codigo_columns})
                 for col in codigo_columns:
-                    df[col] = df[col].astype(str)
                     print(f"      🔧 {col} convertido para string")
                 
                 data[name] = df
@@ -121,68 +200,26 @@ class MergedCollectionCreator:
             )
             print(f"      ✅ {len(aeronave_first)} aeronaves mescladas")
         
-        # JOIN com ocorrencia_tipo (1:N - uma ocorrência pode ter múltiplos tipos)
-        if not data['ocorrencia_tipo'].empty:
-            print("   📋 Mesclando tipos de ocorrência...")
-            # Agrupa tipos numa lista para cada ocorrência
-            tipos_grouped = data['ocorrencia_tipo'].groupby('codigo_ocorrencia1').agg({
-                'ocorrencia_tipo': lambda x: '; '.join(x.astype(str).unique()),
-                'ocorrencia_tipo_categoria': lambda x: '; '.join(x.astype(str).unique()),
-                'taxonomia_tipo_icao': lambda x: '; '.join(x.astype(str).unique())
-            }).reset_index()
-            
-            merged_df = merged_df.merge(
-                tipos_grouped,
-                left_on='codigo_ocorrencia1',
-                right_on='codigo_ocorrencia1',
-                how='left',
-                suffixes=('', '_tipo')
-            )
-            print(f"      ✅ {len(tipos_grouped)} tipos de ocorrência mesclados")
-        
-        # JOIN com fator_contribuinte (1:N - uma ocorrência pode ter múltiplos fatores)
-        if not data['fator_contribuinte'].empty:
-            print("   ⚠️  Mesclando fatores contribuintes...")
-            fatores_grouped = data['fator_contribuinte'].groupby('codigo_ocorrencia3').agg({
-                'fator_nome': lambda x: '; '.join(x.astype(str).unique()),
-                'fator_aspecto': lambda x: '; '.join(x.astype(str).unique()),
-                'fator_condicionante': lambda x: '; '.join(x.astype(str).unique()),
-                'fator_area': lambda x: '; '.join(x.astype(str).unique())
-            }).reset_index()
-            
-            merged_df = merged_df.merge(
-                fatores_grouped,
-                left_on='codigo_ocorrencia3',
-                right_on='codigo_ocorrencia3',
-                how='left',
-                suffixes=('', '_fator')
-            )
-            print(f"      ✅ {len(fatores_grouped)} fatores contribuintes mesclados")
-        
-        # JOIN com recomendacao (1:N - uma ocorrência pode ter múltiplas recomendações)
-        if not data['recomendacao'].empty:
-            print("   📝 Mesclando recomendações...")
-            recomendacoes_grouped = data['recomendacao'].groupby('codigo_ocorrencia4').agg({
-                'recomendacao_numero': lambda x: '; '.join(x.astype(str).unique()),
-                'recomendacao_conteudo': lambda x: ' | '.join(x.astype(str).unique()),
-                'recomendacao_status': lambda x: '; '.join(x.astype(str).unique()),
-                'recomendacao_destinatario': lambda x: '; '.join(x.astype(str).unique())
-            }).reset_index()
-            
-            merged_df = merged_df.merge(
-                recomendacoes_grouped,
-                left_on='codigo_ocorrencia4',
-                right_on='codigo_ocorrencia4',
-                how='left',
-                suffixes=('', '_rec')
-            )
-            print(f"      ✅ {len(recomendacoes_grouped)} recomendações mescladas")
+        # Tabelas 1:N cujos valores viram texto unido por separador
+        for name, key, columns, label in JOINED_TABLES:
+            if data[name].empty:
+                continue
+            print(f"   {label}...")
+            grouped = join_unique(data[name], key, columns)
+            merged_df = merged_df.merge(grouped, on=key, how='left')
+            print(f"      ✅ {len(grouped)} grupos mesclados")
         
         print(f"🎯 Dados mesclados: {len(merged_df)} registros finais")
         return merged_df
     
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Limpa e padroniza os dados"""
+        """
+        Limpa e padroniza os dados.
+
+        Colunas de texto: valores ausentes viram a string "None" e textos
+        "nan" (grupos só com valores vazios) viram None. Numéricas ficam como
+        estão, com NaN.
+        """
         print("🧹 Limpando dados...")
         
         # Remove colunas duplicadas geradas pelos joins
@@ -193,75 +230,204 @@ class MergedCollectionCreator:
             df = df.drop(columns=columns_to_drop)
             print(f"   🗑️  Removidas {len(columns_to_drop)} colunas duplicadas")
         
-        # Substitui valores NaN por None para o MongoDB
-        df = df.where(pd.notnull(df), None)
-        
-        # Converte tipos de dados problemáticos
+        # Uma passada por coluna de texto, sem copiar o DataFrame inteiro com where()
+        cleaned = {}
         for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].astype(str).replace('nan', None)
+            values = df[col]
+            if values.dtype == 'object':
+                missing = values.isna().to_numpy()
+                text = values.astype(str).to_numpy()
+                text[missing] = 'None'
+                text[~missing & (text == 'nan')] = None
+                values = pd.Series(text, index=df.index, name=col, dtype=object)
+            cleaned[col] = values
+        df = pd.DataFrame(cleaned, index=df.index)
         
         print(f"   ✅ Dados limpos: {len(df)} registros")
         return df
     
-    def save_to_mongodb(self, df: pd.DataFrame, collection_name: str = 'ocorrencia_completa'):
-        """Salva o DataFrame mesclado no MongoDB"""
-        print(f"💾 Salvando na collection '{collection_name}'...")
-        
-        # Conecta ao MongoDB
-        self.connect()
-        
-        # Limpa a collection existente
-        collection = self.db[collection_name]
-        print(f"🗑️  Limpando collection existente...")
-        collection.delete_many({})
-        
-        # Converte DataFrame para dicionários
-        records = df.to_dict(orient='records')
-        
-        # Insere em lotes para melhor performance
-        batch_size = 1000
-        total_batches = len(records) // batch_size + (1 if len(records) % batch_size else 0)
-        
-        print(f"📝 Inserindo {len(records)} registros em {total_batches} lotes...")
-        
-        with tqdm(total=len(records), desc="Inserindo dados") as pbar:
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i + batch_size]
-                collection.insert_many(batch)
-                pbar.update(len(batch))
-        
-        print(f"✅ Collection '{collection_name}' criada com sucesso!")
-        
-        # Cria índices importantes
-        print("🔍 Criando índices...")
+    def create_indexes(self, collection):
+        """Cria os índices usados pela API"""
         collection.create_index("codigo_ocorrencia")
         collection.create_index([("ocorrencia_latitude", 1), ("ocorrencia_longitude", 1)])
         collection.create_index("ocorrencia_classificacao")
         collection.create_index("aeronave_fabricante")
+
+    def save_to_mongodb(self, df: pd.DataFrame, collection_name: str = 'ocorrencia_completa'):
+        """
+        Publica o DataFrame mesclado sem que a API veja dados parciais.
+
+        Os documentos são gravados numa collection de staging, que recebe os
+        índices e tem a contagem conferida; só então ela substitui a collection
+        servida com um renameCollection(dropTarget=True), que é atômico. Se
+        algo falhar antes disso, a collection atual continua intacta.
+        """
+        staging_name = f"{collection_name}__staging"
+        print(f"💾 Salvando na collection '{collection_name}' (via '{staging_name}')...")
+
+        # Conecta ao MongoDB
+        self.connect()
+
+        # Sobra de um rebuild interrompido
+        self.db.drop_collection(staging_name)
+        staging = self.db[staging_name]
+
+        batch_size = settings.SEED_CHUNK_SIZE
+        print(f"📝 Inserindo {len(df)} registros em lotes de {batch_size}...")
+        with tqdm(total=len(df), desc="Inserindo dados") as pbar:
+            with ParallelBulkWriter(staging, settings.SEED_WRITERS) as writer:
+                for start in range(0, len(df), batch_size):
+                    batch = df.iloc[start:start + batch_size]
+                    writer.submit(frame_records(batch))
+                    pbar.update(len(batch))
+        stats = writer.stats
+
+        # Cria índices importantes antes da troca, para a API nunca ler sem eles
+        print("🔍 Criando índices...")
+        self.create_indexes(staging)
         print("   ✅ Índices criados")
-        
+
+        count = staging.count_documents({})
+        if stats.errors or count != len(df):
+            self.db.drop_collection(staging_name)
+            self.disconnect()
+            raise RuntimeError(
+                f"Validação falhou: {count} documentos na staging, {len(df)} esperados "
+                f"({stats.errors} erros de escrita); '{collection_name}' não foi alterada"
+            )
+        print(f"   ✅ Contagem conferida: {count} documentos")
+
+        staging.rename(collection_name, dropTarget=True)
+        version = self.bump_dataset_version(collection_name)
+        print(f"✅ Collection '{collection_name}' publicada (versão {version} do dataset)")
+
         self.disconnect()
-    
-    def create_merged_collection(self):
+
+    def bump_dataset_version(self, collection_name: str) -> int:
+        """Incrementa a versão do dataset publicado e invalida o que dependia dos documentos antigos"""
+        version = self.db[DATASET_VERSIONS_COLLECTION].find_one_and_update(
+            {'_id': collection_name},
+            {
+                '$inc': {'version': 1},
+                '$set': {
+                    'documents': self.db[collection_name].estimated_document_count(),
+                    'published_at': datetime.utcnow(),
+                },
+            },
+            upsert=True, return_document=ReturnDocument.AFTER
+        )['version']
+        # Documentos novos ou substituídos: o checkpoint do score_history.py não vale mais
+        self.db['scoring_checkpoints'].delete_one({'_id': collection_name})
+        return version
+
+    def source_digests(self, data: dict) -> dict:
+        """Hash por ocorrência das linhas de todas as tabelas que entram no documento mesclado"""
+        tables = {}
+        for name, key in SOURCE_KEYS.items():
+            df = data.get(name)
+            if df is None or df.empty:
+                continue
+            hasher = GroupHasher(key)
+            hasher.add(frame_records(df))
+            tables[name] = hasher.digests()
+        combined = combine_digests(tables)
+        # Só as ocorrências de ocorrencia.csv geram documento
+        return {code: combined[code] for code in tables.get('ocorrencia', {})}
+
+    def update_incremental(self, data: dict, collection_name: str = 'ocorrencia_completa') -> bool:
+        """
+        Recalcula só os documentos das ocorrências cujas linhas mudaram em
+        alguma das tabelas e os grava com ReplaceOne (upsert) por
+        codigo_ocorrencia; ocorrências que sumiram são removidas.
+
+        Retorna False se não há carga completa anterior para comparar.
+        """
+        start = time.perf_counter()
+        self.connect()
+        store = HashStore(self.db, collection_name)
+        full_load_s = store.last_full_load_s()
+        if full_load_s is None:
+            print("ℹ️  Sem carga completa anterior: reconstruindo a collection inteira")
+            self.disconnect()
+            return False
+
+        new = self.source_digests(data)
+        diff = diff_digests(store.load(), new)
+        print(f"🔍 Diferença por codigo_ocorrencia: {diff.summary()}")
+        if not diff.size:
+            print(f"✅ Nada a atualizar ({time_saved_summary(time.perf_counter() - start, full_load_s)})")
+            self.disconnect()
+            return True
+
+        affected = diff.added | diff.changed
+        # Os joins partem de ocorrencia: filtrar só ela já limita o merge às ocorrências afetadas
+        subset = dict(data)
+        subset['ocorrencia'] = data['ocorrencia'][data['ocorrencia']['codigo_ocorrencia'].isin(affected)]
+        merged_df = self.clean_data(self.merge_data(subset))
+
+        operations = [
+            ReplaceOne({'codigo_ocorrencia': record['codigo_ocorrencia']}, record, upsert=True)
+            for record in frame_records(merged_df)
+        ]
+        if diff.removed:
+            operations.append(DeleteMany({'codigo_ocorrencia': {'$in': list(diff.removed)}}))
+
+        collection = self.db[collection_name]
+        batch_size = settings.SEED_CHUNK_SIZE
+        with ParallelBulkWriter(collection, settings.SEED_WRITERS) as writer:
+            for index in range(0, len(operations), batch_size):
+                writer.submit_operations(operations[index:index + batch_size])
+        if writer.stats.errors:
+            print(f"⚠️  {writer.stats.errors} operações rejeitadas pelo MongoDB")
+
+        store.apply({code: new[code] for code in affected}, diff.removed)
+        version = self.bump_dataset_version(collection_name)
+        elapsed = time.perf_counter() - start
+        print(f"✅ {len(merged_df)} documentos recalculados, {len(diff.removed)} removidos (versão {version} do dataset)")
+        print(f"⏱️  {time_saved_summary(elapsed, full_load_s)}")
+        self.disconnect()
+        return True
+
+    def save_source_digests(self, data: dict, elapsed_s: float, rows: int,
+                            collection_name: str = 'ocorrencia_completa'):
+        """Guarda os hashes da carga completa, base do próximo --incremental"""
+        self.connect()
+        store = HashStore(self.db, collection_name)
+        store.replace_all(self.source_digests(data))
+        store.record_full_load(elapsed_s, rows)
+        self.disconnect()
+
+    def create_merged_collection(self, incremental: bool = False):
         """Método principal para criar a collection mesclada"""
         print("🚀 Iniciando criação da collection mesclada...")
         
         try:
+            start = time.perf_counter()
+            timings = StageTimings()
+
             # 1. Carrega dados dos CSVs
-            data = self.load_csv_data()
+            with timings.stage("leitura dos CSVs"):
+                data = self.load_csv_data()
+
+            if incremental and self.update_incremental(data):
+                return
             
             # 2. Mescla os dados
-            merged_df = self.merge_data(data)
+            with timings.stage("mesclagem"):
+                merged_df = self.merge_data(data)
             
             # 3. Limpa os dados
-            cleaned_df = self.clean_data(merged_df)
+            with timings.stage("limpeza"):
+                cleaned_df = self.clean_data(merged_df)
             
             # 4. Salva no MongoDB
-            self.save_to_mongodb(cleaned_df)
+            with timings.stage("gravação"):
+                self.save_to_mongodb(cleaned_df)
+                self.save_source_digests(data, time.perf_counter() - start, len(cleaned_df))
             
             print("🎉 Collection mesclada criada com sucesso!")
             print(f"📊 Total de registros: {len(cleaned_df)}")
+            print(f"⏱️  {timings.summary()}")
             
         except Exception as e:
             print(f"❌ Erro durante o processo: {e}")
@@ -269,5 +435,9 @@ class MergedCollectionCreator:
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cria a collection mesclada ocorrencia_completa")
+    parser.add_argument("--incremental", action="store_true", help="Recalcula só as ocorrências que mudaram")
+    args = parser.parse_args()
+
     creator = MergedCollectionCreator()
-    creator.create_merged_collection() 
\ No newline at end of file
+    creator.create_merged_collection(incremental=args.incremental) 
\ No newline at end of file
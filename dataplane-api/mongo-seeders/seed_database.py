@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 """
 Script para popular o banco de dados MongoDB com dados dos arquivos CSV
+
+Uso:
+    python seed_database.py                 # recarrega todas as collections
+    python seed_database.py --incremental   # aplica só as ocorrências novas, alteradas ou removidas
 """
 
-import pandas as pd
+import argparse
+
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 import os
@@ -18,7 +23,11 @@ dotenv_path = Path(__file__).resolve().parents[1] / '.env'
 load_dotenv(dotenv_path=dotenv_path)
 
 # Agora podemos importar as settings, que serão preenchidas pelo .env
+sys.path.append(str(Path(__file__).resolve().parents[1]))
 from app.config.settings import settings
+from app.utils.csv_loader import csv_loader
+from app.utils.process import peak_resident_memory_bytes
+from seed_utils import GroupHasher, HashStore, key_column, load_csv, sync_csv_incremental, time_saved_summary
 
 class SeedDatabase:
     """
@@ -82,51 +91,113 @@ class SeedDatabase:
         print(f"📁 Encontrados {len(csv_files)} arquivos CSV para importação.")
         return csv_files
 
-    def seed_data(self):
-        """Lê os arquivos CSV e insere os dados no MongoDB."""
+    def seed_file(self, file_path: Path, collection_name: str, frame=None):
+        """Recarrega a collection inteira e guarda os hashes por ocorrência"""
+        collection = self.db[collection_name]
+
+        # Remover a coleção inteira é bem mais rápido que apagar documento a documento
+        print(f"🗑️  Limpando a coleção '{collection_name}'...")
+        collection.drop()
+
+        # Lê e insere em blocos: a memória não cresce com o tamanho do arquivo
+        print(f"➕ Inserindo documentos na coleção '{collection_name}'...")
+        key = key_column(file_path)
+        hasher = GroupHasher(key) if key else None
+        stats = load_csv(
+            file_path, collection,
+            chunk_size=settings.SEED_CHUNK_SIZE, writers=settings.SEED_WRITERS, hasher=hasher, frame=frame
+        )
+
+        if not stats.rows:
+            print(f"📄 Arquivo {file_path.name} está vazio. Pulando.")
+            return
+        if stats.errors:
+            print(f"⚠️  {stats.errors} documentos rejeitados pelo MongoDB")
+        print(f"✅ {stats.inserted} documentos inseridos: {stats.summary()}")
+
+        if hasher is not None:
+            store = HashStore(self.db, collection_name)
+            store.replace_all(hasher.digests())
+            store.record_full_load(stats.elapsed_s, stats.rows)
+
+    def seed_file_incremental(self, file_path: Path, collection_name: str, frame=None):
+        """Aplica só as ocorrências que mudaram desde a última carga"""
+        key = key_column(file_path)
+        store = HashStore(self.db, collection_name)
+        if key is None or store.last_full_load_s() is None:
+            print("ℹ️  Sem código de ocorrência ou sem carga completa anterior: recarregando a coleção")
+            self.seed_file(file_path, collection_name, frame)
+            return
+
+        diff, stats = sync_csv_incremental(
+            file_path, self.db[collection_name], store, key,
+            chunk_size=settings.SEED_CHUNK_SIZE, writers=settings.SEED_WRITERS, frame=frame
+        )
+        print(f"🔍 Diferença por {key}: {diff.summary()}")
+        if stats.errors:
+            print(f"⚠️  {stats.errors} operações rejeitadas pelo MongoDB")
+        print(f"✅ {stats.inserted} documentos gravados em {time_saved_summary(stats.elapsed_s, store.last_full_load_s())}")
+
+    def load_frame(self, file_path: Path):
+        """
+        CSV inteiro pelo cache do csv_loader, um arquivo por vez: só o
+        DataFrame do arquivo em carga fica em memória. Com o cache
+        desligado retorna None, e a carga lê o arquivo em blocos.
+        """
+        if not csv_loader.use_cache:
+            return None
+        frames, report = csv_loader.load([file_path])
+        print(f"📂 {report.summary()}")
+        return frames[file_path.stem]
+
+    def seed_data(self, incremental: bool = False, frames: dict = None) -> list:
+        """
+        Lê os arquivos CSV e insere os dados no MongoDB.
+
+        `frames` são os CSVs já lidos pelo csv_loader (ex: pelo pipeline de
+        seeding); sem eles, cada arquivo é carregado na sua vez (ver
+        load_frame). Retorna os nomes dos arquivos que falharam.
+        """
         self.connect()
         csv_files = self.get_csv_files()
 
         if not csv_files:
             print("Nenhum dado para popular. Encerrando.")
             self.disconnect()
-            return
+            return []
 
+        mode = "incremental" if incremental else "completo"
+        print(f"⚙️  Modo {mode}: blocos de {settings.SEED_CHUNK_SIZE} linhas, {settings.SEED_WRITERS} escritores em paralelo")
+
+        failed = []
         for file_path in csv_files:
+            frame = None
             try:
                 collection_name = file_path.stem
                 print(f"\n🔄 Processando arquivo: {file_path.name} -> Coleção: '{collection_name}'")
-                
-                df = pd.read_csv(file_path, sep=';', encoding='latin1')
-                
-                # Limpa os nomes das colunas
-                df.columns = df.columns.str.strip()
-                
-                # Converte o dataframe para uma lista de dicionários
-                data = df.to_dict(orient='records')
-                
-                if not data:
-                    print(f"📄 Arquivo {file_path.name} está vazio. Pulando.")
-                    continue
-
-                collection = self.db[collection_name]
-                
-                # Limpa a coleção antes de inserir novos dados
-                print(f"🗑️  Limpando a coleção '{collection_name}'...")
-                collection.delete_many({})
-                
-                # Insere os novos dados
-                print(f"➕ Inserindo {len(data)} documentos na coleção '{collection_name}'...")
-                collection.insert_many(data)
-                print(f"✅ Dados do arquivo {file_path.name} inseridos com sucesso.")
+                frame = frames.get(file_path.stem) if frames is not None else self.load_frame(file_path)
+                if incremental:
+                    self.seed_file_incremental(file_path, collection_name, frame)
+                else:
+                    self.seed_file(file_path, collection_name, frame)
 
             except FileNotFoundError:
                 print(f"❌ Erro: Arquivo {file_path} não encontrado.")
+                failed.append(file_path.name)
             except Exception as e:
                 print(f"❌ Ocorreu um erro ao processar o arquivo {file_path.name}: {e}")
+                failed.append(file_path.name)
 
+        peak = peak_resident_memory_bytes()
+        if peak:
+            print(f"\n📈 Pico de memória do processo: {peak / 1024 / 1024:.0f} MB")
         self.disconnect()
+        return failed
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Popula o MongoDB com os CSVs de mongo-seeders/datasets")
+    parser.add_argument("--incremental", action="store_true", help="Aplica só as ocorrências novas, alteradas ou removidas")
+    args = parser.parse_args()
+
     seeder = SeedDatabase()
-    seeder.seed_data() 
\ No newline at end of file
+    seeder.seed_data(incremental=args.incremental) 
\ No newline at end of file
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Pipeline de seeding num único processo, montado como um grafo de etapas
+
+    parse ─┬─ normalize ── merge ─┬─ publish_merged ─┬─ stats
+           │                      └──────────────────┴─ snapshot
+           └─ load_base ── indexes
+
+Os DataFrames passam de uma etapa para a outra em memória; etapas
+independentes (ex: load_base e o ramo da collection mesclada) rodam ao
+mesmo tempo. Cada etapa que grava no MongoDB ou em disco tem checkpoint:
+se o seeding falhar, rodar de novo com os mesmos CSVs retoma da etapa que
+falhou. As etapas só de memória (parse, normalize, merge) rodam de novo
+quando alguma etapa pendente precisa do resultado delas, o que é rápido
+com o cache do csv_loader.
+
+Com --incremental não há a etapa merge: o update_incremental mescla só as
+ocorrências afetadas e o snapshot lê a collection publicada.
+
+Uso:
+    python seed_pipeline.py                 # executa (ou retoma) o seeding completo
+    python seed_pipeline.py --incremental   # aplica só as ocorrências que mudaram
+    python seed_pipeline.py --restart       # ignora o checkpoint e refaz todas as etapas
+"""
+
+import argparse
+import hashlib
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parent))
+from app.config.settings import settings
+from app.services.dataset_summary_service import DATASET_VERSIONS_COLLECTION, SUMMARIES_COLLECTION
+from app.services.filter_options_service import FILTER_FIELDS, clean_distinct_values, distinct_values_pipeline
+from app.services.merged_ocurrence_service import MERGED_STATS_QUERIES, merged_stats_result
+from app.utils.csv_loader import csv_loader, file_digest, write_cache
+from create_merged_collection import MergedCollectionCreator
+from seed_database import SeedDatabase
+from seed_utils import StageTimings, key_column
+
+PIPELINE_COLLECTION = 'seed_pipeline_runs'
+MERGED_COLLECTION = 'ocorrencia_completa'
+
+# Índices das collections básicas, recriados depois da carga (o drop os remove)
+BASE_INDEXES = {
+    'ocorrencia': [
+        [('ocorrencia_latitude', 1), ('ocorrencia_longitude', 1)],
+        [('ocorrencia_classificacao', 1)],
+    ],
+}
+
+
+@dataclass
+class Stage:
+    """
+    Etapa do pipeline. `run` recebe o resultado das dependências por nome.
+    Etapas `persistent` deixam o resultado no MongoDB ou em disco e recebem
+    checkpoint; as demais só produzem dados em memória para as seguintes.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+    persistent: bool = True
+
+
+class StageFailed(Exception):
+    """Uma etapa falhou; as concluídas antes dela ficam no checkpoint"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Etapa '{stage}' falhou: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class MongoCheckpoint:
+    """
+    Etapas concluídas de uma execução, na collection `seed_pipeline_runs`.
+    A execução é identificada pelo hash dos CSVs e pelo modo: com outros
+    arquivos, o checkpoint anterior não vale e tudo roda de novo.
+    """
+
+    def __init__(self, db, fingerprint: str, restart: bool = False, run_id: str = 'seed_pipeline'):
+        self.collection = db[PIPELINE_COLLECTION]
+        self.run_id = run_id
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        run = self.collection.find_one({'_id': run_id})
+        if restart or not run or run.get('fingerprint') != fingerprint:
+            self.collection.replace_one(
+                {'_id': run_id},
+                {'fingerprint': fingerprint, 'started_at': datetime.utcnow(), 'completed': {}, 'finished': False},
+                upsert=True,
+            )
+            run = None
+        self._completed = set((run or {}).get('completed', {}))
+        self.resumed = bool(self._completed)
+
+    def completed(self) -> Set[str]:
+        return set(self._completed)
+
+    def mark_done(self, stage: str, elapsed_s: float):
+        with self._lock:
+            self._completed.add(stage)
+            self.collection.update_one(
+                {'_id': self.run_id},
+                {'$set': {f'completed.{stage}': {'elapsed_s': round(elapsed_s, 3), 'finished_at': datetime.utcnow()}}},
+            )
+
+    def mark_finished(self):
+        self.collection.update_one({'_id': self.run_id}, {'$set': {'finished': True, 'finished_at': datetime.utcnow()}})
+
+
+class StageGraph:
+    """Executa as etapas na ordem das dependências, em paralelo quando possível"""
+
+    def __init__(self, stages: List[Stage], max_workers: int = 3):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max(max_workers, 1)
+        for stage in stages:
+            unknown = [dep for dep in stage.depends_on if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"Etapa '{stage.name}' depende de etapas inexistentes: {unknown}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo de dependências envolvendo a etapa '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def plan(self, completed: Set[str]) -> Set[str]:
+        """
+        Etapas a executar: as persistentes sem checkpoint e, para elas, as
+        dependências só de memória (cujo resultado não sobrevive entre
+        execuções).
+        """
+        to_run = {name for name, stage in self.stages.items() if stage.persistent and name not in completed}
+        for name in reversed(self.order):
+            if name in to_run:
+                for dep in self.stages[name].depends_on:
+                    if not self.stages[dep].persistent or dep not in completed:
+                        to_run.add(dep)
+        return to_run
+
+    def run(self, checkpoint, timings: Optional[StageTimings] = None) -> Dict[str, Any]:
+        """Executa o plano; StageFailed na primeira falha, depois de esperar as etapas em andamento"""
+        timings = timings or StageTimings()
+        completed = checkpoint.completed()
+        to_run = self.plan(completed)
+        for name in self.order:
+            if name not in to_run:
+                print(f"⏭️  {name}: concluída numa execução anterior")
+
+        results: Dict[str, Any] = {}
+        finished: Set[str] = set()
+        running = {}
+        failure: Optional[StageFailed] = None
+
+        def ready(name):
+            return all(dep in finished or dep not in to_run for dep in self.stages[name].depends_on)
+
+        def execute(stage: Stage):
+            inputs = {dep: results.get(dep) for dep in stage.depends_on}
+            print(f"▶️  {stage.name}...")
+            start = time.perf_counter()
+            with timings.stage(stage.name):
+                value = stage.run(inputs)
+            return value, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="seed-stage") as executor:
+            pending = [name for name in self.order if name in to_run]
+            while pending or running:
+                if failure is None:
+                    for name in [name for name in pending if ready(name)]:
+                        if len(running) >= self.max_workers:
+                            break
+                        pending.remove(name)
+                        running[executor.submit(execute, self.stages[name])] = name
+                elif not running:
+                    break
+                if not running:
+                    # Nada pronto e nada rodando: só acontece com dependência não satisfeita
+                    raise RuntimeError(f"Etapas sem como executar: {pending}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        value, elapsed = future.result()
+                    except BaseException as e:  # inclui o sys.exit dos seeders ao perder a conexão
+                        print(f"❌ {name}: {e}")
+                        failure = failure or StageFailed(name, e)
+                        continue
+                    results[name] = value
+                    finished.add(name)
+                    if self.stages[name].persistent:
+                        checkpoint.mark_done(name, elapsed)
+
+        if failure is not None:
+            raise failure
+        checkpoint.mark_finished()
+        return results
+
+
+def inputs_fingerprint(csv_files: List[Path], incremental: bool) -> str:
+    """Hash dos CSVs e do modo: identifica a execução para o checkpoint"""
+    digest = hashlib.sha256(f"incremental={incremental}".encode())
+    for path in sorted(csv_files):
+        digest.update(f"{path.name}:{file_digest(path)}".encode())
+    return digest.hexdigest()
+
+
+class SeedPipeline:
+    """Etapas do seeding completo sobre as classes dos seeders"""
+
+    def __init__(self, db, incremental: bool = False):
+        self.db = db
+        self.incremental = incremental
+        self.seeder = SeedDatabase()
+        self.creator = MergedCollectionCreator()
+        self.csv_files = sorted(self.seeder.datasets_path.glob('*.csv'))
+        self.snapshot_dir = Path(settings.SEED_SNAPSHOT_DIR) if settings.SEED_SNAPSHOT_DIR else \
+            Path(__file__).resolve().parent / 'snapshots'
+        self.started = time.perf_counter()
+
+    def stages(self) -> List[Stage]:
+        # No modo incremental o merge completo seria descartado pelo update_incremental
+        merged = () if self.incremental else ('merge',)
+        stages = [
+            Stage('parse', self.parse, persistent=False),
+            Stage('normalize', self.normalize, ('parse',), persistent=False),
+            Stage('load_base', self.load_base, ('parse',)),
+            Stage('indexes', self.indexes, ('load_base',)),
+            Stage('publish_merged', self.publish_merged, merged + ('normalize',)),
+            Stage('stats', self.stats, ('publish_merged',)),
+            Stage('snapshot', self.snapshot, merged + ('publish_merged',)),
+        ]
+        if not self.incremental:
+            stages.insert(4, Stage('merge', self.merge, ('normalize',), persistent=False))
+        return stages
+
+    def parse(self, inputs) -> Dict[str, Any]:
+        frames, report = csv_loader.load(self.csv_files)
+        print(f"   📂 CSVs carregados: {report.summary()}")
+        return frames
+
+    def normalize(self, inputs) -> Dict[str, Any]:
+        return self.creator.load_csv_data(inputs['parse'])
+
+    def load_base(self, inputs):
+        failed = self.seeder.seed_data(incremental=self.incremental, frames=inputs['parse'])
+        if failed:
+            raise RuntimeError(f"Falha ao popular: {', '.join(failed)}")
+
+    def indexes(self, inputs):
+        """Índices pelo código de ocorrência (usados pelo modo incremental e pelo $lookup) e os da API"""
+        for path in self.csv_files:
+            key = key_column(path)
+            if key:
+                self.db[path.stem].create_index(key)
+        for collection, indexes in BASE_INDEXES.items():
+            for keys in indexes:
+                self.db[collection].create_index(keys)
+        print(f"   🔍 Índices criados em {len(self.csv_files)} collections")
+
+    def merge(self, inputs):
+        return self.creator.clean_data(self.creator.merge_data(inputs['normalize']))
+
+    def publish_merged(self, inputs):
+        """Publica a collection mesclada; retorna o DataFrame quando houve reconstrução completa"""
+        data = inputs['normalize']
+        if self.incremental and self.creator.update_incremental(data):
+            return None
+        merged_df = inputs.get('merge')
+        if merged_df is None:
+            # --incremental sem carga completa anterior: reconstrói tudo
+            merged_df = self.merge(inputs)
+        self.creator.save_to_mongodb(merged_df)
+        self.creator.save_source_digests(data, time.perf_counter() - self.started, len(merged_df))
+        return merged_df
+
+    def stats(self, inputs):
+        """Estatísticas e opções de filtro da versão publicada, lidas pela API sem consultar a collection"""
+        collection = self.db[MERGED_COLLECTION]
+        version = (self.db[DATASET_VERSIONS_COLLECTION].find_one({'_id': MERGED_COLLECTION}) or {}).get('version')
+        stats = merged_stats_result({
+            name: collection.count_documents(query) for name, query in MERGED_STATS_QUERIES.items()
+        })
+        filter_options = {
+            category: clean_distinct_values(field, list(collection.aggregate(distinct_values_pipeline(field, limit))))
+            for category, (field, limit) in FILTER_FIELDS.items()
+        }
+        self.db[SUMMARIES_COLLECTION].replace_one(
+            {'_id': MERGED_COLLECTION},
+            {'dataset_version': version, 'stats': stats, 'filter_options': filter_options,
+             'computed_at': datetime.utcnow()},
+            upsert=True,
+        )
+        print(f"   📊 Resumo da versão {version}: {stats['total_ocorrencias']} ocorrências, "
+              f"{sum(len(values) for values in filter_options.values())} opções de filtro")
+
+    def snapshot(self, inputs):
+        """Cópia em disco do DataFrame publicado, por versão do dataset; guarda as últimas SEED_SNAPSHOTS_TO_KEEP"""
+        version = (self.db[DATASET_VERSIONS_COLLECTION].find_one({'_id': MERGED_COLLECTION}) or {}).get('version', 0)
+        merged_df = inputs.get('merge')
+        if merged_df is None:
+            merged_df = inputs.get('publish_merged')
+        if merged_df is None:
+            # Atualização incremental (ou publicação numa execução anterior): lê a versão publicada
+            merged_df = pd.DataFrame(list(self.db[MERGED_COLLECTION].find({}, {'_id': 0})))
+        path = write_cache(merged_df, self.snapshot_dir / f"{MERGED_COLLECTION}-v{version:05d}")
+        print(f"   📸 Snapshot salvo em {path}")
+
+        snapshots = sorted(
+            (p for p in self.snapshot_dir.glob(f"{MERGED_COLLECTION}-v*") if not p.name.endswith('.tmp')),
+            key=lambda p: p.stem,
+        )
+        for old in snapshots[:-max(settings.SEED_SNAPSHOTS_TO_KEEP, 1)]:
+            old.unlink(missing_ok=True)
+
+
+def run_pipeline(incremental: bool = False, restart: bool = False) -> Dict[str, Any]:
+    """Executa (ou retoma) o seeding; StageFailed se alguma etapa falhar"""
+    client = MongoClient(settings.mongodb_connection_string, authSource=settings.MONGODB_AUTH_SOURCE)
+    try:
+        client.admin.command('ping')
+        db = client[settings.MONGODB_DB]
+        pipeline = SeedPipeline(db, incremental)
+        checkpoint = MongoCheckpoint(db, inputs_fingerprint(pipeline.csv_files, incremental), restart)
+        if checkpoint.resumed:
+            print(f"↩️  Retomando: {len(checkpoint.completed())} etapa(s) já concluída(s) com estes CSVs")
+
+        timings = StageTimings()
+        graph = StageGraph(pipeline.stages(), max_workers=settings.SEED_PIPELINE_WORKERS)
+        try:
+            return graph.run(checkpoint, timings)
+        finally:
+            if timings.stages:
+                print(f"⏱️  {timings.summary()}")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seeding completo do MongoDB num único processo")
+    parser.add_argument("--incremental", action="store_true", help="Aplica só as ocorrências que mudaram")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e refaz todas as etapas")
+    args = parser.parse_args()
+
+    try:
+        run_pipeline(incremental=args.incremental, restart=args.restart)
+    except (ConnectionFailure, OperationFailure) as e:
+        print(f"❌ Erro no MongoDB: {e}")
+        sys.exit(1)
+    except StageFailed as e:
+        print(f"❌ {e}")
+        print("   Execute de novo para retomar a partir desta etapa")
+        sys.exit(1)
+    print("🎉 Seeding concluído!")
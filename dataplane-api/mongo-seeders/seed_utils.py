@@ -0,0 +1,430 @@
+"""
+Utilitários de carga em lote compartilhados pelos seeders.
+
+Os CSVs vêm do csv_loader (lidos em paralelo e guardados em cache por hash
+do arquivo) ou, sem ele, do pd.read_csv com chunksize; em ambos os casos
+cada bloco vira documentos direto das tuplas, sem o to_dict de um DataFrame
+inteiro. As escritas vão para um pequeno pool de threads com
+insert_many(ordered=False) e um limite de lotes em voo, então os
+documentos montados em memória ficam limitados a alguns blocos.
+
+Para o modo incremental, cada ocorrência recebe um hash das suas linhas
+normalizadas (GroupHasher); os hashes ficam na collection `seed_row_hashes`
+e a comparação com os da carga anterior diz o que inserir, atualizar ou
+remover.
+"""
+
+import hashlib
+import json
+import math
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import pandas as pd
+from pymongo import DeleteMany, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.utils.csv_loader import CSV_OPTIONS
+from app.utils.process import peak_resident_memory_bytes, resident_memory_bytes
+
+HASHES_COLLECTION = "seed_row_hashes"
+RUNS_COLLECTION = "seed_runs"
+
+
+def iter_csv_chunks(file_path: Path, chunk_size: int, **options) -> Iterator[pd.DataFrame]:
+    """Lê o CSV em blocos de `chunk_size` linhas, com os nomes de colunas limpos"""
+    with pd.read_csv(file_path, chunksize=chunk_size, **{**CSV_OPTIONS, **options}) as reader:
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Blocos de `chunk_size` linhas de um DataFrame já lido (ex: pelo csv_loader)"""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def _chunks(file_path: Path, chunk_size: int, frame: Optional[pd.DataFrame], **options) -> Iterator[pd.DataFrame]:
+    if frame is not None:
+        return iter_frame_chunks(frame, chunk_size)
+    return iter_csv_chunks(file_path, chunk_size, **options)
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Documentos de um bloco, com os mesmos valores do to_dict('records')
+    (escalares nativos do Python, NaN como float) sem a cópia intermediária
+    por coluna.
+    """
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in df.itertuples(index=False, name=None)]
+
+
+def _megabytes(value: Optional[int]) -> str:
+    return f"{value / 1024 / 1024:.0f} MB" if value else "n/d"
+
+
+@dataclass
+class LoadStats:
+    """Linhas, tempo e memória de uma carga"""
+    rows: int = 0
+    inserted: int = 0
+    errors: int = 0
+    elapsed_s: float = 0.0
+    peak_rss_bytes: Optional[int] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_s if self.elapsed_s else 0.0
+
+    def sample_memory(self):
+        rss = resident_memory_bytes()
+        if rss is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, rss)
+
+    def summary(self) -> str:
+        peak = self.peak_rss_bytes or peak_resident_memory_bytes()
+        return (
+            f"{self.rows} linhas em {self.elapsed_s:.2f}s - {self.rows_per_second:,.0f} linhas/s"
+            f" - pico de RSS: {_megabytes(peak)}"
+        )
+
+
+class StageTimings:
+    """
+    Tempo e memória de cada etapa de um processo. A cada etapa registra a
+    RSS ao final e o pico do processo até ali (o pico só cresce, então um
+    salto nele aponta a etapa responsável).
+    """
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float, Optional[int], Optional[int]]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            rss, peak = resident_memory_bytes(), peak_resident_memory_bytes()
+            self.stages.append((name, elapsed, rss, peak))
+            print(f"   ⏱️  {name}: {elapsed:.2f}s - RSS: {_megabytes(rss)} - pico: {_megabytes(peak)}")
+
+    @property
+    def total_s(self) -> float:
+        return sum(elapsed for _, elapsed, _, _ in self.stages)
+
+    def summary(self) -> str:
+        return " | ".join(f"{name}: {elapsed:.2f}s" for name, elapsed, _, _ in self.stages) + \
+            f" | total: {self.total_s:.2f}s"
+
+
+class ParallelBulkWriter:
+    """
+    Envia lotes de documentos para uma collection com insert_many não
+    ordenado em `writers` threads. No máximo 2 × writers lotes ficam em voo:
+    quem chama `submit` espera um deles terminar antes de enfileirar outro.
+    """
+
+    def __init__(self, collection, writers: int = 4, stats: Optional[LoadStats] = None):
+        self.collection = collection
+        self.max_in_flight = max(writers, 1) * 2
+        self.stats = stats or LoadStats()
+        self._executor = ThreadPoolExecutor(max_workers=max(writers, 1), thread_name_prefix="seed-writer")
+        self._pending = set()
+
+    def _insert(self, documents: List[Dict[str, Any]]) -> int:
+        try:
+            return len(self.collection.insert_many(documents, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Com ordered=False os demais documentos do lote são gravados
+            self.stats.errors += len(e.details.get("writeErrors", []))
+            return e.details.get("nInserted", 0)
+
+    def _bulk_write(self, operations: list) -> int:
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            self.stats.errors += len(e.details.get("writeErrors", []))
+            details = e.details
+        return details.get("nInserted", 0) + details.get("nUpserted", 0) + details.get("nModified", 0)
+
+    def _collect(self, done):
+        for future in done:
+            self._pending.discard(future)
+            self.stats.inserted += future.result()
+
+    def _schedule(self, function, payload):
+        while len(self._pending) >= self.max_in_flight:
+            done, _ = wait(self._pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        self._pending.add(self._executor.submit(function, payload))
+
+    def submit(self, documents: List[Dict[str, Any]]):
+        """Enfileira um insert_many"""
+        if documents:
+            self._schedule(self._insert, documents)
+
+    def submit_operations(self, operations: list):
+        """Enfileira um bulk_write (upserts, remoções) não ordenado"""
+        if operations:
+            self._schedule(self._bulk_write, operations)
+
+    def close(self):
+        """Aguarda todos os lotes em voo"""
+        try:
+            if self._pending:
+                done, _ = wait(self._pending)
+                self._collect(done)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_csv(file_path: Path, collection, chunk_size: int = 5000, writers: int = 4,
+             hasher: Optional["GroupHasher"] = None, frame: Optional[pd.DataFrame] = None,
+             **options) -> LoadStats:
+    """
+    Carrega um CSV inteiro numa collection, em blocos e com escritas
+    paralelas. Com `hasher`, calcula no mesmo passe os hashes por ocorrência
+    usados pelo modo incremental. Com `frame` (o CSV já lido), os blocos
+    saem dele em vez de ler o arquivo.
+    """
+    stats = LoadStats()
+    start = time.perf_counter()
+    with ParallelBulkWriter(collection, writers, stats) as writer:
+        for chunk in _chunks(file_path, chunk_size, frame, **options):
+            records = frame_records(chunk)
+            if hasher is not None:
+                hasher.add(records)
+            writer.submit(records)
+            stats.rows += len(chunk)
+            stats.sample_memory()
+    stats.elapsed_s = time.perf_counter() - start
+    return stats
+
+
+def key_column(file_path: Path) -> Optional[str]:
+    """Coluna com o código da ocorrência (codigo_ocorrencia, codigo_ocorrencia1, ...)"""
+    columns = pd.read_csv(file_path, nrows=0, **CSV_OPTIONS).columns.str.strip()
+    return next((col for col in columns if col.startswith("codigo_ocorrencia")), None)
+
+
+def sync_csv_incremental(file_path: Path, collection, store: "HashStore", key: str,
+                         chunk_size: int = 5000, writers: int = 4,
+                         frame: Optional[pd.DataFrame] = None) -> Tuple["HashDiff", LoadStats]:
+    """
+    Aplica na collection só a diferença entre o CSV e a última carga.
+
+    1º passe: hash de cada ocorrência do CSV e comparação com os guardados.
+    Ocorrências removidas, e as alteradas que tinham ou passam a ter mais de
+    uma linha, são apagadas com um DeleteMany por lote de códigos.
+    2º passe: só as linhas das ocorrências novas ou alteradas são lidas de
+    novo; ocorrências de uma linha viram ReplaceOne com upsert pelo código,
+    as demais são reinseridas. Com `frame`, os dois passes percorrem o CSV
+    já lido. Linhas sem código formam o grupo None (ver code_filter).
+    """
+    stats = LoadStats()
+    start = time.perf_counter()
+
+    hasher = GroupHasher(key)
+    for chunk in _chunks(file_path, chunk_size, frame):
+        hasher.add(frame_records(chunk))
+        stats.rows += len(chunk)
+        stats.sample_memory()
+    new = hasher.digests()
+    old = store.load()
+    diff = diff_digests(old, new)
+    if not diff.size:
+        stats.elapsed_s = time.perf_counter() - start
+        return diff, stats
+
+    def single_row(code):
+        return new[code][1] == 1 and old.get(code, (None, 1))[1] == 1
+
+    to_delete = list(diff.removed) + [code for code in diff.changed if not single_row(code)]
+    to_write = diff.added | diff.changed
+    with ParallelBulkWriter(collection, writers, stats) as writer:
+        for start_index in range(0, len(to_delete), chunk_size):
+            codes = to_delete[start_index:start_index + chunk_size]
+            writer.submit_operations([DeleteMany(code_filter(key, codes))])
+    if to_write:
+        with ParallelBulkWriter(collection, writers, stats) as writer:
+            for chunk in _chunks(file_path, chunk_size, frame):
+                operations = []
+                for record in frame_records(chunk):
+                    code = normalize_value(record[key])
+                    if code not in to_write:
+                        continue
+                    if single_row(code):
+                        operations.append(ReplaceOne(code_filter(key, [code]), record, upsert=True))
+                    else:
+                        operations.append(InsertOne(record))
+                writer.submit_operations(operations)
+                stats.sample_memory()
+
+    store.apply({code: new[code] for code in to_write}, diff.removed)
+    stats.elapsed_s = time.perf_counter() - start
+    return diff, stats
+
+
+def code_filter(key: str, codes: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Filtro pelos códigos normalizados. Linhas sem código entram no hash
+    como None, mas ficam gravadas com NaN (o vazio do CSV), e no MongoDB
+    null não casa com NaN: para None, o filtro cobre os dois.
+    """
+    codes = list(codes)
+    if None in codes:
+        codes.append(float("nan"))
+    if len(codes) == 1:
+        return {key: codes[0]}
+    return {key: {"$in": codes}}
+
+
+def normalize_value(value: Any) -> Any:
+    """
+    Valor canônico para o hash: NaN vira None e floats inteiros viram int,
+    já que o mesmo número pode ser lido como 2024 ou 2024.0 dependendo do bloco
+    """
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            return int(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def row_digest(record: Dict[str, Any]) -> str:
+    normalized = {key: normalize_value(value) for key, value in record.items()}
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class GroupHasher:
+    """
+    Hash por ocorrência das linhas de uma tabela. A ordem das linhas não
+    importa (os hashes são ordenados antes de combinar), então o resultado
+    não muda com o tamanho dos blocos.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._rows: Dict[Any, List[str]] = {}
+
+    def add(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self._rows.setdefault(normalize_value(record[self.key]), []).append(row_digest(record))
+
+    def digests(self) -> Dict[Any, Tuple[str, int]]:
+        """Código da ocorrência -> (hash, número de linhas)"""
+        return {
+            code: (hashlib.sha1("".join(sorted(rows)).encode()).hexdigest(), len(rows))
+            for code, rows in self._rows.items()
+        }
+
+
+def combine_digests(tables: Dict[str, Dict[Any, Tuple[str, int]]]) -> Dict[Any, Tuple[str, int]]:
+    """Um hash por ocorrência a partir dos hashes de cada tabela em que ela aparece"""
+    combined: Dict[Any, List[str]] = {}
+    rows: Dict[Any, int] = {}
+    for name in sorted(tables):
+        for code, (digest, count) in tables[name].items():
+            combined.setdefault(code, []).append(f"{name}:{digest}")
+            rows[code] = rows.get(code, 0) + count
+    return {
+        code: (hashlib.sha1("|".join(parts).encode()).hexdigest(), rows[code])
+        for code, parts in combined.items()
+    }
+
+
+@dataclass
+class HashDiff:
+    added: Set[Any]
+    changed: Set[Any]
+    removed: Set[Any]
+    unchanged: int
+
+    @property
+    def size(self) -> int:
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} novas, {len(self.changed)} alteradas, "
+            f"{len(self.removed)} removidas, {self.unchanged} iguais"
+        )
+
+
+def diff_digests(old: Dict[Any, Tuple[str, int]], new: Dict[Any, Tuple[str, int]]) -> HashDiff:
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    changed = {code for code in new.keys() & old.keys() if new[code][0] != old[code][0]}
+    unchanged = len(new) - len(added) - len(changed)
+    return HashDiff(set(added), changed, set(removed), unchanged)
+
+
+class HashStore:
+    """Hashes por ocorrência da última carga de cada collection"""
+
+    def __init__(self, db, namespace: str):
+        self.collection = db[HASHES_COLLECTION]
+        self.runs = db[RUNS_COLLECTION]
+        self.namespace = namespace
+
+    def load(self) -> Dict[Any, Tuple[str, int]]:
+        return {
+            doc["code"]: (doc["hash"], doc["rows"])
+            for doc in self.collection.find({"namespace": self.namespace}, {"code": 1, "hash": 1, "rows": 1})
+        }
+
+    def replace_all(self, digests: Dict[Any, Tuple[str, int]]):
+        self.collection.delete_many({"namespace": self.namespace})
+        self.apply(digests, set())
+
+    def apply(self, digests: Dict[Any, Tuple[str, int]], removed: Set[Any], batch_size: int = 5000):
+        operations = [
+            UpdateOne(
+                {"namespace": self.namespace, "code": code},
+                {"$set": {"hash": digest, "rows": rows}},
+                upsert=True,
+            )
+            for code, (digest, rows) in digests.items()
+        ]
+        if removed:
+            operations.append(DeleteMany({"namespace": self.namespace, "code": {"$in": list(removed)}}))
+        for start in range(0, len(operations), batch_size):
+            self.collection.bulk_write(operations[start:start + batch_size], ordered=False)
+
+    def record_full_load(self, elapsed_s: float, rows: int):
+        """Guarda a duração da última carga completa, base do tempo economizado"""
+        self.runs.update_one(
+            {"_id": self.namespace},
+            {"$set": {"full_load_s": elapsed_s, "rows": rows, "loaded_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    def last_full_load_s(self) -> Optional[float]:
+        run = self.runs.find_one({"_id": self.namespace})
+        return run["full_load_s"] if run else None
+
+
+def time_saved_summary(elapsed_s: float, full_load_s: Optional[float]) -> str:
+    if full_load_s is None:
+        return f"{elapsed_s:.2f}s (sem carga completa anterior para comparar)"
+    return f"{elapsed_s:.2f}s contra {full_load_s:.2f}s da carga completa - {full_load_s - elapsed_s:.2f}s economizados"
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Script para criar a collection mesclada dentro do MongoDB, a partir das
+collections já populadas por seed_database.py
+
+Em vez de ler os CSVs e mesclar com pandas, uma agregação sobre `ocorrencia`
+faz o $lookup em aeronave, ocorrencia_tipo, fator_contribuinte e
+recomendacao, junta os valores de cada ocorrência no próprio pipeline e
+grava o resultado com $out. Nenhum documento passa pelo cliente.
+
+Uso:
+    python server_side_merge.py             # reconstrói ocorrencia_completa no servidor
+    python server_side_merge.py --compare   # mede este caminho e o do pandas, sem publicar
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from create_merged_collection import JOINED_TABLES, MergedCollectionCreator
+from app.config.settings import settings
+from app.utils.process import peak_resident_memory_bytes
+from seed_utils import ParallelBulkWriter, frame_records
+
+BASE_COLLECTION = 'ocorrencia'
+BASE_COLLECTION_KEY = 'codigo_ocorrencia'
+AERONAVE_COLLECTION = 'aeronave'
+AERONAVE_KEY = 'codigo_ocorrencia2'
+
+NAN = float('nan')
+
+
+def _is_present(value: str) -> dict:
+    """Valor nem nulo nem NaN (o seeder grava os vazios do CSV como NaN)"""
+    return {'$and': [{'$ne': [value, None]}, {'$ne': [value, NAN]}]}
+
+
+def _is_missing(value) -> dict:
+    """Valor ausente, nulo ou NaN"""
+    return {'$eq': [{'$ifNull': [value, NAN]}, NAN]}
+
+
+def lookup_keys(field: str) -> list:
+    """
+    Valores aceitos no $lookup para o código: o próprio valor e o texto.
+    O seeder grava os códigos como vieram do CSV, então a mesma ocorrência
+    é 84857 em `ocorrencia` e "84857" em `recomendacao`; o MongoDB compara
+    com o tipo, e um localField com array casa com qualquer elemento, sem
+    perder o índice do foreignField. O pandas compara os dois como texto.
+    """
+    return [f'${field}', {'$toString': f'${field}'}]
+
+
+def text_value(value) -> dict:
+    """
+    Valor de coluna de texto como o clean_data do pandas: ausente vira a
+    string "None", o texto "nan" (grupo só com valores vazios) vira null e
+    o resto vira texto.
+    """
+    return {'$let': {
+        'vars': {'value': value},
+        'in': {'$cond': [
+            _is_missing('$$value'),
+            'None',
+            {'$cond': [{'$eq': ['$$value', 'nan']}, None, {'$toString': '$$value'}]},
+        ]},
+    }}
+
+
+def first_present(array_field: str, field: str) -> dict:
+    """Primeiro valor não nulo do campo entre as linhas do $lookup (ou NaN), como o groupby().first() do pandas"""
+    return {'$ifNull': [
+        {'$first': {'$filter': {'input': f'${array_field}.{field}', 'cond': _is_present('$$this')}}},
+        NAN,
+    ]}
+
+
+def joined_unique(array_field: str, field: str, separator: str) -> dict:
+    """
+    Valores distintos do campo, na ordem em que aparecem, unidos por
+    `separator`, como '; '.join(x.astype(str).unique()): vazios entram como
+    "nan". Sem linhas no $lookup, null.
+    """
+    return {'$let': {
+        'vars': {'unique': {'$reduce': {
+            'input': f'${array_field}.{field}',
+            'initialValue': [],
+            'in': {'$let': {
+                'vars': {'text': {'$cond': [_is_missing('$$this'), 'nan', {'$toString': '$$this'}]}},
+                'in': {'$cond': [
+                    {'$in': ['$$text', '$$value']},
+                    '$$value',
+                    {'$concatArrays': ['$$value', ['$$text']]},
+                ]},
+            }},
+        }}},
+        'in': {'$cond': [
+            {'$eq': [{'$size': '$$unique'}, 0]},
+            None,
+            {'$reduce': {
+                'input': '$$unique',
+                'initialValue': None,
+                'in': {'$cond': [
+                    {'$eq': ['$$value', None]},
+                    '$$this',
+                    {'$concat': ['$$value', separator, '$$this']},
+                ]},
+            }},
+        ]},
+    }}
+
+
+def merged_pipeline(base_fields: list, aeronave_fields: list, text_fields: set, output: str) -> list:
+    """
+    Pipeline que monta um documento por ocorrência e grava em `output`.
+
+    Aeronave: a primeira com valor de cada campo. Tipos, fatores e
+    recomendações: valores distintos unidos por separador. `text_fields`
+    são os campos de `ocorrencia` e `aeronave` que o pandas lê como texto
+    (os códigos sempre são); eles passam pelo mesmo tratamento do
+    clean_data, e os numéricos ficam como estão, com NaN. Os valores são os
+    do caminho do pandas; só a ordem dos valores unidos segue a ordem em
+    que o MongoDB devolve as linhas, que é a de inserção.
+    """
+    def is_text(field):
+        return field in text_fields or field.startswith('codigo_ocorrencia')
+
+    local_keys = [BASE_COLLECTION_KEY] + [key for _, key, _, _ in JOINED_TABLES]
+    pipeline = [
+        {'$set': {f'_keys_{key}': lookup_keys(key) for key in local_keys}},
+        {'$lookup': {
+            'from': AERONAVE_COLLECTION,
+            'localField': f'_keys_{BASE_COLLECTION_KEY}',
+            'foreignField': AERONAVE_KEY,
+            'as': '_aeronave',
+        }},
+    ]
+    fields = {field: text_value(f'${field}') for field in base_fields if is_text(field)}
+    # Campos que já existem em ocorrencia ganham o sufixo _aeronave no merge do pandas e são descartados
+    for field in (field for field in aeronave_fields if field not in base_fields):
+        value = first_present('_aeronave', field)
+        fields[field] = text_value(value) if is_text(field) else value
+
+    # Mesmos joins de MergedCollectionCreator.merge_data: o código tem o mesmo nome nas duas collections
+    for collection, key, joined, _ in JOINED_TABLES:
+        array_field = f'_{collection}'
+        pipeline.append({'$lookup': {
+            'from': collection,
+            'localField': f'_keys_{key}',
+            'foreignField': key,
+            'as': array_field,
+        }})
+        fields.update({field: text_value(joined_unique(array_field, field, sep)) for field, sep in joined.items()})
+
+    pipeline += [
+        {'$set': fields},
+        {'$unset': ['_aeronave'] + [f'_{collection}' for collection, *_ in JOINED_TABLES]
+                   + [f'_keys_{key}' for key in local_keys]},
+        {'$out': output},
+    ]
+    return pipeline
+
+
+class ServerSideMergedBuilder(MergedCollectionCreator):
+    """
+    Cria a collection mesclada com uma agregação no MongoDB, publicando
+    da mesma forma que o caminho do pandas (staging, índices, contagem e
+    rename atômico).
+    """
+
+    def ensure_source_indexes(self):
+        """Índices nos códigos das collections do $lookup; sem eles cada ocorrência varre a collection inteira"""
+        self.db[AERONAVE_COLLECTION].create_index(AERONAVE_KEY)
+        for collection, key, _, _ in JOINED_TABLES:
+            self.db[collection].create_index(key)
+
+    def fields(self, collection: str) -> list:
+        """Campos da collection, lidos de um documento"""
+        sample = self.db[collection].find_one({}, {'_id': 0}) or {}
+        return list(sample)
+
+    def text_fields(self, collection: str, fields: list) -> set:
+        """
+        Campos com algum valor string. São as colunas que o pandas lê como
+        object, e só elas passam pelo tratamento de texto do clean_data.
+        """
+        if not fields:
+            return set()
+        group = {'_id': None}
+        for index, field in enumerate(fields):
+            group[f'f{index}'] = {'$max': {'$eq': [{'$type': f'${field}'}, 'string']}}
+        result = next(self.db[collection].aggregate([{'$group': group}], allowDiskUse=True), {})
+        return {field for index, field in enumerate(fields) if result.get(f'f{index}')}
+
+    def run_pipeline(self, output: str) -> float:
+        """Executa a agregação gravando em `output`; retorna o tempo em segundos"""
+        start = time.perf_counter()
+        self.ensure_source_indexes()
+        base_fields = self.fields(BASE_COLLECTION)
+        aeronave_fields = self.fields(AERONAVE_COLLECTION)
+        text_fields = (self.text_fields(BASE_COLLECTION, base_fields)
+                       | self.text_fields(AERONAVE_COLLECTION, aeronave_fields))
+        pipeline = merged_pipeline(base_fields, aeronave_fields, text_fields, output)
+        # O $out não devolve documentos: o cursor só é consumido para executar o pipeline
+        list(self.db[BASE_COLLECTION].aggregate(pipeline, allowDiskUse=True))
+        return time.perf_counter() - start
+
+    def build(self, collection_name: str = 'ocorrencia_completa'):
+        """Reconstrói e publica a collection mesclada sem tirar dados do servidor"""
+        staging_name = f"{collection_name}__staging"
+        self.connect()
+        try:
+            expected = self.db[BASE_COLLECTION].count_documents({})
+            if not expected:
+                raise RuntimeError(f"Collection '{BASE_COLLECTION}' vazia: execute primeiro seed_database.py")
+
+            print(f"⚙️  Executando a agregação em '{BASE_COLLECTION}' (via '{staging_name}')...")
+            self.db.drop_collection(staging_name)
+            elapsed = self.run_pipeline(staging_name)
+            print(f"   ✅ Agregação concluída em {elapsed:.2f}s")
+
+            staging = self.db[staging_name]
+            print("🔍 Criando índices...")
+            self.create_indexes(staging)
+            print("   ✅ Índices criados")
+
+            count = staging.count_documents({})
+            if count != expected:
+                self.db.drop_collection(staging_name)
+                raise RuntimeError(
+                    f"Validação falhou: {count} documentos na staging, {expected} esperados; "
+                    f"'{collection_name}' não foi alterada"
+                )
+            print(f"   ✅ Contagem conferida: {count} documentos")
+
+            staging.rename(collection_name, dropTarget=True)
+            version = self.bump_dataset_version(collection_name)
+            print(f"✅ Collection '{collection_name}' publicada (versão {version} do dataset)")
+        finally:
+            self.disconnect()
+
+    def compare(self, collection_name: str = 'ocorrencia_completa'):
+        """
+        Mede os dois caminhos gravando em collections temporárias, que são
+        removidas ao final; a collection publicada não é alterada.
+
+        O caminho do servidor roda primeiro: o pico de RSS do processo só
+        cresce, então o pico medido depois do pandas inclui a mesclagem.
+        """
+        server_name = f"{collection_name}__benchmark_server"
+        pandas_name = f"{collection_name}__benchmark_pandas"
+        self.connect()
+        try:
+            self.db.drop_collection(server_name)
+            server_s = self.run_pipeline(server_name)
+            server_peak = peak_resident_memory_bytes()
+            server_count = self.db[server_name].count_documents({})
+
+            self.db.drop_collection(pandas_name)
+            start = time.perf_counter()
+            df = self.clean_data(self.merge_data(self.load_csv_data()))
+            with ParallelBulkWriter(self.db[pandas_name], settings.SEED_WRITERS) as writer:
+                for index in range(0, len(df), settings.SEED_CHUNK_SIZE):
+                    writer.submit(frame_records(df.iloc[index:index + settings.SEED_CHUNK_SIZE]))
+            pandas_s = time.perf_counter() - start
+            pandas_peak = peak_resident_memory_bytes()
+            pandas_count = writer.stats.inserted
+        finally:
+            self.db.drop_collection(server_name)
+            self.db.drop_collection(pandas_name)
+            self.disconnect()
+
+        def megabytes(value):
+            return f"{value / 1024 / 1024:.0f} MB" if value else "n/d"
+
+        print()
+        print("⏱️  Comparação dos caminhos de mesclagem")
+        print(f"   {'caminho':<10} {'documentos':>10} {'tempo':>10} {'pico de RSS':>12}")
+        print(f"   {'servidor':<10} {server_count:>10} {server_s:>9.2f}s {megabytes(server_peak):>12}")
+        print(f"   {'pandas':<10} {pandas_count:>10} {pandas_s:>9.2f}s {megabytes(pandas_peak):>12}")
+        if pandas_s:
+            print(f"   O caminho do servidor levou {server_s / pandas_s:.0%} do tempo do pandas")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cria a collection mesclada com uma agregação no MongoDB")
+    parser.add_argument("--compare", action="store_true",
+                        help="Mede o caminho do servidor e o do pandas em collections temporárias")
+    args = parser.parse_args()
+
+    builder = ServerSideMergedBuilder()
+    if args.compare:
+        builder.compare()
+    else:
+        print("🚀 Iniciando criação da collection mesclada no servidor...")
+        builder.build()
+        print("🎉 Collection mesclada criada com sucesso!")
@@ -2,6 +2,9 @@
 """
 Script para regenerar apenas a collection mesclada (ocorrencia_completa)
 Use este script quando os dados já estão no MongoDB mas você quer atualizar apenas a collection mesclada
+
+A mesclagem roda dentro do MongoDB (mongo-seeders/server_side_merge.py), a
+partir das collections básicas, sem reler os CSVs.
 """
 
 import sys
@@ -37,7 +40,7 @@ def main():
     
     try:
         # Define o caminho do script de criação da collection mesclada
-        script_path = Path(__file__).parent / "mongo-seeders" / "create_merged_collection.py"
+        script_path = Path(__file__).parent / "mongo-seeders" / "server_side_merge.py"
         
         if not script_path.exists():
             print(f"❌ Script não encontrado: {script_path}")
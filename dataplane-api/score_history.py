@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script para pontuar o histórico da collection ocorrencia_completa com o modelo
+Grava predicted_damage e prediction_confidence em cada ocorrência, para o
+dashboard comparar o nível de dano previsto com o real.
+
+A execução é retomável: rodar de novo continua do último bloco gravado com
+a mesma versão do modelo (use --restart para refazer tudo).
+"""
+
+import argparse
+import sys
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, OperationFailure
+from app.config.settings import settings
+from app.services.ai_service import ai_service
+from app.services.bulk_scoring import BulkScoringJob, SOURCE_COLLECTION
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Pontua a collection mesclada com o modelo de nível de dano")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Documentos por bloco")
+    parser.add_argument("--limit", type=int, help="Pontua no máximo este número de documentos")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e recomeça do início")
+    parser.add_argument("--collection", default=SOURCE_COLLECTION, help="Collection a pontuar")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🎯 PONTUAÇÃO DO HISTÓRICO DE OCORRÊNCIAS")
+    print("=" * 60)
+
+    try:
+        ai_service.warm_up()
+    except Exception as e:
+        print(f"❌ Erro ao carregar o modelo: {e}")
+        sys.exit(1)
+    bundle = ai_service.bundle
+    print(f"🤖 Modelo: versão {bundle.version} ({bundle.info()['backend']})")
+
+    client = MongoClient(settings.mongodb_connection_string, authSource=settings.MONGODB_AUTH_SOURCE)
+    try:
+        client.admin.command('ping')
+        print("✅ Conexão com o MongoDB estabelecida com sucesso!")
+
+        job = BulkScoringJob(client[settings.MONGODB_DB], bundle, args.chunk_size, args.collection)
+        report = job.run(restart=args.restart, max_documents=args.limit)
+    except (ConnectionFailure, OperationFailure) as e:
+        print(f"❌ Erro no MongoDB: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+    if report.resumed_from is not None:
+        print(f"↩️  Retomado após _id {report.resumed_from}")
+    print(f"📊 Documentos: {report.documents} - com predição: {report.scored} - sem predição: {report.unscored}")
+    print(f"⏱️  Total: {report.elapsed_s:.2f}s - {report.rows_per_second:,.0f} linhas/s")
+    print(f"   leitura: {report.timings.get('read', 0):.2f}s - modelo: {report.timings.get('score', 0):.2f}s"
+          f" - escrita: {report.timings.get('write', 0):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
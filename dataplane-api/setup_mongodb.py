@@ -114,6 +114,9 @@ def create_mongodb_user():
         db.createCollection('ai_requests');
         db.ai_requests.createIndex({ "created_at": -1 });
         db.ai_requests.createIndex({ "model_name": 1 });
+        db.ai_requests.createIndex({ "created_at": -1, "_id": -1 });
+        db.ai_requests.createIndex({ "model_version": 1, "created_at": -1, "_id": -1 });
+        db.ai_requests_hourly.createIndex({ "hour": 1, "model_version": 1, "endpoint": 1 }, { unique: true });
         
         print("✅ Usuário criado com sucesso!");
         """
@@ -0,0 +1,170 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.services.ai_service import ai_service
+
+client = TestClient(app)
+
+BASE_ROW = {
+    "aeronave_tipo_operacao": "PRIVADA",
+    "fator_area": "FATOR HUMANO",
+    "aeronave_tipo_veiculo": "AVIÃO",
+    "aeronave_ano_fabricacao": 1980,
+    "ocorrencia_uf": "SP",
+    "aeronave_fatalidades_total": 0,
+}
+
+
+def _scenarios():
+    rows = []
+    for uf in ["SP", "RJ", "MG", "AC"]:
+        for year in [1970, 1995, 2015]:
+            for fatalities in [0, 2]:
+                rows.append({**BASE_ROW, "ocorrencia_uf": uf, "aeronave_ano_fabricacao": year,
+                             "aeronave_fatalidades_total": fatalities})
+    return rows
+
+
+def test_batch_matches_single_predictions():
+    """Testa que o lote produz o mesmo resultado das predições individuais"""
+    rows = _scenarios()
+    results = ai_service.predict_batch(rows)
+    for row, result in zip(rows, results):
+        single = ai_service.predict(row)
+        assert result["error"] is None
+        assert result["prediction"] == single["prediction"]
+        assert result["confidence"] == pytest.approx(single["confidence"])
+
+
+def test_batch_reports_unknown_categories_per_row():
+    """Testa que categorias desconhecidas geram erro apenas na própria linha"""
+    rows = [BASE_ROW, {**BASE_ROW, "ocorrencia_uf": "XX"}, BASE_ROW]
+    response = client.post("/api/v1/predict/batch", json={"rows": rows})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["failed"] == 1
+    assert data["results"][1]["prediction"] is None
+    assert "ocorrencia_uf" in data["results"][1]["error"]
+    assert data["results"][0]["prediction"] == data["results"][2]["prediction"]
+
+
+def test_batcher_groups_concurrent_predictions(monkeypatch):
+    """Testa que predições concorrentes são avaliadas em micro-lotes"""
+    import asyncio
+    from app.services.inference_batcher import InferenceBatcher
+
+    batcher = InferenceBatcher(ai_service, max_batch_size=8, max_wait_ms=20)
+    rows = _scenarios()
+    # Sem o cache dos testes anteriores, todas as linhas passam pelo worker
+    ai_service.prediction_cache.clear()
+    batch_sizes = []
+    predict_batch = ai_service.predict_batch
+
+    def spy(batch):
+        batch_sizes.append(len(batch))
+        return predict_batch(batch)
+
+    monkeypatch.setattr(ai_service, "predict_batch", spy)
+
+    async def run():
+        await batcher.start()
+        try:
+            results = await asyncio.gather(
+                *(batcher.predict(row) for row in rows),
+                batcher.predict({**BASE_ROW, "ocorrencia_uf": "XX"}),
+                return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert batch_sizes and max(batch_sizes) > 1
+    assert sum(batch_sizes) <= len(rows)
+    assert isinstance(results[-1], ValueError)
+    for row, result in zip(rows, results[:-1]):
+        single = ai_service.predict(row, use_cache=False)
+        assert result["prediction"] == single["prediction"]
+        assert result["confidence"] == pytest.approx(single["confidence"])
+
+
+def test_prediction_cache_returns_same_result():
+    """Testa que cenários repetidos são servidos pelo cache"""
+    row = {**BASE_ROW, "aeronave_ano_fabricacao": 1961}
+    ai_service.prediction_cache.clear()
+    before = ai_service.prediction_cache.stats()
+
+    first = ai_service.predict(row)
+    second = ai_service.predict(row)
+
+    after = ai_service.prediction_cache.stats()
+    assert first == second
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+
+def test_batcher_stop_fails_batch_in_flight():
+    """Testa que o stop() falha as predições do lote que já está no executor"""
+    import asyncio
+    import threading
+    from app.services.inference_batcher import InferenceBatcher
+
+    release = threading.Event()
+
+    class SlowService:
+        loaded = True
+
+        def lookup(self, data):
+            return (data["id"],), None
+
+        def predict_batch(self, rows):
+            release.wait(5)
+            return [{"error": None, "prediction": "x", "confidence": 1.0, "model_version": "v"} for _ in rows]
+
+    batcher = InferenceBatcher(SlowService(), max_batch_size=8, max_wait_ms=5)
+
+    async def run():
+        await batcher.start()
+        tasks = [asyncio.create_task(batcher.predict({"id": i})) for i in range(3)]
+        await asyncio.sleep(0.1)
+        try:
+            await batcher.stop()
+        finally:
+            release.set()
+        return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_predict_matches_label_encoder_path():
+    """Testa que predict dá o mesmo resultado do LabelEncoder.transform + predict/predict_proba originais"""
+    import joblib
+    import numpy as np
+    import pandas as pd
+
+    model = joblib.load("model/checkpoint/random_forest_model.joblib")
+    label_encoders = joblib.load("model/label_encoders/label_encoders.joblib")
+    target_encoder = joblib.load("model/target_encoders/target_encoder.joblib")
+    categorical = ["aeronave_tipo_operacao", "fator_area", "aeronave_tipo_veiculo", "ocorrencia_uf"]
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for _ in range(300):
+        row = {column: str(rng.choice(label_encoders[column].classes_)) for column in categorical}
+        row["aeronave_ano_fabricacao"] = int(rng.integers(1940, 2024))
+        row["aeronave_fatalidades_total"] = int(rng.integers(0, 10))
+        rows.append(row)
+
+    for row in rows:
+        df = pd.DataFrame([row])
+        for column in categorical:
+            df[column] = label_encoders[column].transform(df[column].astype(str))
+        df = df[list(model.feature_names_in_)]
+        encoded = model.predict(df)
+        confidence = model.predict_proba(df)[0][encoded[0]]
+
+        result = ai_service.predict(row, use_cache=False)
+        assert result["prediction"] == target_encoder.inverse_transform(encoded)[0], row
+        assert result["confidence"] == pytest.approx(float(confidence)), row
@@ -0,0 +1,65 @@
+import asyncio
+from app.services.audit_writer import AuditWriter, prediction_record
+
+
+class FakeSink:
+    """Destino em memória que registra cada lote gravado"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def write(self, documents):
+        self.batches.append(list(documents))
+        return len(documents)
+
+
+def _writer(sink, **overrides):
+    options = {"batch_size": 10, "flush_interval_ms": 20, "max_queue_size": 100, "enqueue_timeout_ms": 5}
+    options.update(overrides)
+    return AuditWriter(sink.write, **options)
+
+
+def _record(i):
+    result = {"prediction": "NENHUM", "confidence": 0.9, "model_version": "v1"}
+    return prediction_record("predict", {"i": i}, result, 0.0012)
+
+
+def test_writer_flushes_by_size_and_on_shutdown():
+    """Testa que os registros são gravados em lotes de até batch_size e que o encerramento grava o restante"""
+    sink = FakeSink()
+    writer = _writer(sink, flush_interval_ms=10_000)
+
+    async def run():
+        await writer.start()
+        await writer.record_many([_record(i) for i in range(25)])
+        await writer.stop()
+
+    asyncio.run(run())
+    assert [len(batch) for batch in sink.batches] == [10, 10, 5]
+    assert [doc["inputs"]["i"] for batch in sink.batches for doc in batch] == list(range(25))
+    assert sink.batches[0][0]["latency_ms"] == 1.2
+
+
+def test_writer_drops_records_when_queue_stays_full():
+    """Testa que a fila cheia descarta registros em vez de segurar a requisição"""
+    class SlowSink(FakeSink):
+        async def write(self, documents):
+            await asyncio.sleep(0.2)
+            return await super().write(documents)
+
+    sink = SlowSink()
+    writer = _writer(sink, batch_size=5, max_queue_size=5)
+
+    async def run():
+        await writer.start()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await writer.record_many([_record(i) for i in range(30)])
+        elapsed = loop.time() - start
+        await writer.stop()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    written = sum(len(batch) for batch in sink.batches)
+    assert elapsed < 0.1
+    assert 5 <= written < 30
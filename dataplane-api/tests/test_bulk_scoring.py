@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from app.services.ai_service import ai_service
+from app.services.bulk_scoring import build_feature_frame, score_documents
+
+# Documentos como gravados por create_merged_collection.py
+DOCUMENTS = [
+    {"_id": 1, "aeronave_tipo_operacao": "PRIVADA", "aeronave_tipo_veiculo": "AVIÃO",
+     "aeronave_ano_fabricacao": 1980.0, "aeronave_fatalidades_total": 0.0,
+     "fator_area": "FATOR HUMANO", "ocorrencia_uf": "SP"},
+    {"_id": 2, "aeronave_tipo_operacao": "None", "aeronave_tipo_veiculo": "***",
+     "aeronave_ano_fabricacao": float("nan"), "aeronave_fatalidades_total": 1.0,
+     "fator_area": "FATOR HUMANO; FATOR OPERACIONAL", "ocorrencia_uf": "RJ"},
+    {"_id": 3, "aeronave_tipo_operacao": "PRIVADA", "aeronave_tipo_veiculo": "AVIÃO",
+     "aeronave_ano_fabricacao": 2001.0, "aeronave_fatalidades_total": 0.0,
+     "fator_area": "None", "ocorrencia_uf": "MG"},
+    {"_id": 4, "aeronave_tipo_operacao": "PRIVADA", "aeronave_tipo_veiculo": "AVIÃO",
+     "aeronave_ano_fabricacao": 2001.0, "aeronave_fatalidades_total": 0.0,
+     "fator_area": "FATOR HUMANO", "ocorrencia_uf": "XX"},
+]
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    ai_service.load()
+    return ai_service.bundle
+
+
+def test_feature_frame_explodes_factors_and_normalizes_missing():
+    """Testa uma linha por fator, ausentes como no treino e documentos sem fator fora"""
+    df = build_feature_frame(DOCUMENTS)
+    assert df["doc"].tolist() == [0, 1, 1, 3]
+    assert df["fator_area"].tolist()[1:3] == ["FATOR HUMANO", "FATOR OPERACIONAL"]
+    assert df.loc[1, "aeronave_tipo_operacao"] == "<NA>"
+    assert df.loc[1, "aeronave_tipo_veiculo"] == "<NA>"
+    assert np.isnan(df.loc[1, "aeronave_ano_fabricacao"])
+
+
+def test_scores_average_factor_probabilities(bundle):
+    """Testa que a predição é a média das linhas de cada fator e que sem fator ou UF desconhecida não há predição"""
+    scores = score_documents(bundle, DOCUMENTS)
+    assert scores.ids == [1, 2, 3, 4]
+    assert scores.labels[2] is None and scores.labels[3] is None
+    assert scores.unscored == 2
+
+    single = bundle.predict_row(bundle.encode({**DOCUMENTS[0]}))
+    assert scores.labels[0] == single["prediction"]
+    assert scores.confidences[0] == pytest.approx(single["confidence"])
+
+    rows = [
+        {**DOCUMENTS[1], "aeronave_tipo_operacao": "<NA>", "aeronave_tipo_veiculo": "<NA>", "fator_area": fator}
+        for fator in ("FATOR HUMANO", "FATOR OPERACIONAL")
+    ]
+    features = np.vstack([bundle.encode(row).copy() for row in rows])
+    mean = bundle.predict_proba(features).mean(axis=0)
+    assert scores.labels[1] == bundle.class_labels[int(mean.argmax())]
+    assert scores.confidences[1] == pytest.approx(float(mean.max()))
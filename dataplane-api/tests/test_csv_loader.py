@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from app.utils.csv_loader import CsvLoader, _restore_missing, parse_csv, read_cache, write_cache
+
+CONTENT = "codigo_ocorrencia; uf ;ano\n1;SP;1990\n2;RJ;\n"
+
+
+def test_cache_is_reused_until_the_file_changes(tmp_path):
+    """Testa leitura em paralelo, reaproveitamento do cache e invalidação quando o CSV muda"""
+    first, second = tmp_path / "ocorrencia.csv", tmp_path / "aeronave.csv"
+    first.write_text(CONTENT, encoding="latin1")
+    second.write_text("codigo_ocorrencia2;modelo\n1;AB-115\n", encoding="latin1")
+    loader = CsvLoader(cache_dir=str(tmp_path / "cache"), workers=2)
+
+    frames, report = loader.load([first, second])
+    assert sorted(report.parsed) == ["aeronave", "ocorrencia"] and report.workers == 2
+    assert list(frames["ocorrencia"].columns) == ["codigo_ocorrencia", "uf", "ano"]
+    assert frames["ocorrencia"]["ano"].isna().tolist() == [False, True]
+
+    cached, report = loader.load([first, second])
+    assert sorted(report.cached) == ["aeronave", "ocorrencia"] and not report.parsed
+    pd.testing.assert_frame_equal(cached["ocorrencia"], frames["ocorrencia"])
+
+    first.write_text(CONTENT + "3;MG;2001\n", encoding="latin1")
+    frames, report = loader.load([first, second])
+    assert report.parsed == ["ocorrencia"] and report.cached == ["aeronave"]
+    assert len(frames["ocorrencia"]) == 3
+    assert len(list((tmp_path / "cache").glob("ocorrencia-*"))) == 1
+
+
+def _assert_same_frame(cached, parsed):
+    pd.testing.assert_frame_equal(cached, parsed)
+    # assert_frame_equal aceita None no lugar de NaN; os chamadores não
+    for column in parsed.columns[(parsed.dtypes == object).to_numpy()]:
+        assert cached[column].map(type).tolist() == parsed[column].map(type).tolist(), column
+
+
+def test_parquet_cache_round_trip_keeps_nan(tmp_path):
+    """Testa que o cache Parquet devolve o mesmo DataFrame do CSV, com NaN nas colunas de texto"""
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "ocorrencia.csv"
+    path.write_text(CONTENT + "3;;2001\n", encoding="latin1")
+    parsed = parse_csv(path)
+
+    target = write_cache(parsed, tmp_path / "cache" / "ocorrencia")
+    assert target.suffix == ".parquet"
+    _assert_same_frame(read_cache(tmp_path / "cache" / "ocorrencia"), parsed)
+
+
+def test_restore_missing_turns_none_into_nan():
+    """Testa a correção aplicada na leitura do Parquet, que devolve None nas colunas de texto"""
+    parsed = pd.DataFrame({"uf": ["SP", float("nan")], "ano": [1990.0, float("nan")]})
+    _assert_same_frame(_restore_missing(pd.DataFrame({"uf": ["SP", None], "ano": [1990.0, None]})), parsed)
@@ -0,0 +1,54 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from app.services.forest_compiler import (
+    compile_forest, load_compiled_forest, sample_verification_rows, save_compiled_forest, verify_compiled_forest
+)
+
+
+def _fitted_forest():
+    rng = np.random.default_rng(42)
+    X = np.column_stack([
+        rng.integers(0, 10, 3000),
+        rng.integers(0, 4, 3000),
+        rng.normal(2000, 15, 3000),
+        rng.integers(0, 27, 3000),
+        rng.poisson(1.5, 3000),
+    ]).astype(np.float64)
+    y = (X[:, 0] + X[:, 3] + rng.integers(0, 5, 3000)) % 4
+    # Ano de fabricação ausente, como no dataset real
+    X[rng.random(3000) < 0.05, 2] = np.nan
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.3, random_state=0)
+    model = RandomForestClassifier(n_estimators=25, max_depth=12, random_state=0).fit(X_train, y_train)
+    return model, X_test
+
+
+def test_compiled_forest_matches_sklearn_bit_for_bit():
+    """Testa que a floresta compilada reproduz exatamente o predict_proba do sklearn"""
+    model, X_test = _fitted_forest()
+    compiled = compile_forest(model)
+    assert compiled.n_trees == 25
+    assert np.array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+    assert np.array_equal(compiled.predict_proba(X_test[:1]), model.predict_proba(X_test[:1]))
+
+
+def test_compiled_forest_matches_on_threshold_boundaries():
+    """Testa a verificação com valores exatamente sobre os pontos de corte"""
+    model, X_test = _fitted_forest()
+    compiled = compile_forest(model)
+    sample = sample_verification_rows(compiled, X_test.shape[1], 2000)
+    assert verify_compiled_forest(model, compiled, sample)
+
+
+def test_saved_artifact_is_memory_mapped(tmp_path):
+    """Testa que o artefato salvo é reaberto com mmap e prediz igual ao sklearn"""
+    model, X_test = _fitted_forest()
+    compiled = compile_forest(model)
+    directory = str(tmp_path / "forest")
+    save_compiled_forest(compiled, directory, {"feature_names": ["a", "b", "c", "d", "e"]})
+
+    loaded, metadata = load_compiled_forest(directory, mmap_mode="r")
+    assert metadata["feature_names"] == ["a", "b", "c", "d", "e"]
+    assert isinstance(loaded.value, np.memmap)
+    assert np.array_equal(loaded.predict_proba(X_test), model.predict_proba(X_test))
+    assert load_compiled_forest(str(tmp_path / "inexistente")) == (None, None)
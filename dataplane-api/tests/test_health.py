@@ -34,4 +34,16 @@ def test_docs_endpoint():
 def test_redoc_endpoint():
     """Testa se a documentação ReDoc está disponível"""
     response = client.get("/redoc")
-    assert response.status_code == 200 
\ No newline at end of file
+    assert response.status_code == 200 
+
+def test_ai_health_reports_load_time_and_memory():
+    """Testa que o health check da IA informa tempo de carga e memória residente"""
+    from app.services.ai_service import ai_service
+    ai_service.load()
+    response = client.get("/api/v1/health/ai")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["model_info"]["loaded"] is True
+    assert data["model_info"]["load_time_ms"] >= 0
+    assert "resident_memory_bytes" in data["model_info"]
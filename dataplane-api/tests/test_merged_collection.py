@@ -0,0 +1,80 @@
+import math
+import sys
+import warnings
+from pathlib import Path
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "mongo-seeders"))
+from create_merged_collection import MergedCollectionCreator, join_unique  # noqa: E402
+from seed_utils import frame_records  # noqa: E402
+
+
+def legacy_merge(data):
+    """merge_data original, com uma lambda por grupo"""
+    merged = data['ocorrencia'].copy()
+    aeronave_first = data['aeronave'].groupby('codigo_ocorrencia2').first().reset_index()
+    merged = merged.merge(aeronave_first, left_on='codigo_ocorrencia', right_on='codigo_ocorrencia2',
+                          how='left', suffixes=('', '_aeronave'))
+    tables = [
+        ('ocorrencia_tipo', 'codigo_ocorrencia1', ['ocorrencia_tipo', 'ocorrencia_tipo_categoria', 'taxonomia_tipo_icao'], {}),
+        ('fator_contribuinte', 'codigo_ocorrencia3', ['fator_nome', 'fator_aspecto', 'fator_condicionante', 'fator_area'], {}),
+        ('recomendacao', 'codigo_ocorrencia4',
+         ['recomendacao_numero', 'recomendacao_conteudo', 'recomendacao_status', 'recomendacao_destinatario'],
+         {'recomendacao_conteudo': ' | '}),
+    ]
+    for name, key, columns, separators in tables:
+        grouped = data[name].groupby(key).agg({
+            col: (lambda sep: lambda x: sep.join(x.astype(str).unique()))(separators.get(col, '; '))
+            for col in columns
+        }).reset_index()
+        merged = merged.merge(grouped, left_on=key, right_on=key, how='left')
+    return merged
+
+
+def legacy_clean(df):
+    """clean_data original"""
+    df = df.drop(columns=['codigo_ocorrencia2_aeronave'])
+    df = df.where(pd.notnull(df), None)
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].astype(str).replace('nan', None)
+    return df
+
+
+def same_value(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+
+@pytest.fixture(scope="module")
+def data():
+    return MergedCollectionCreator().load_csv_data()
+
+
+def test_join_unique_keeps_first_seen_order_and_nan_text():
+    """Testa valores distintos na ordem de aparição, NaN como 'nan' e um registro por código"""
+    df = pd.DataFrame({
+        'codigo': ['2', '1', '2', '2', '3'],
+        'valor': ['B', 'X', 'A', 'B', float('nan')],
+    })
+    result = join_unique(df, 'codigo', {'valor': '; '}).set_index('codigo')['valor'].to_dict()
+    assert result == {'1': 'X', '2': 'B; A', '3': 'nan'}
+
+
+def test_merged_documents_identical_to_legacy(data):
+    """Testa que os documentos gravados são os mesmos da implementação anterior, inclusive as strings 'None'"""
+    creator = MergedCollectionCreator()
+    new = creator.clean_data(creator.merge_data(data))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        old = legacy_clean(legacy_merge(data))
+
+    assert list(new.columns) == list(old.columns)
+    assert (new.dtypes == old.dtypes).all()
+    new_records, old_records = frame_records(new), frame_records(old)
+    assert len(new_records) == len(old_records)
+    for new_doc, old_doc in zip(new_records, old_records):
+        assert new_doc.keys() == old_doc.keys()
+        assert all(same_value(new_doc[key], old_doc[key]) for key in new_doc), new_doc['codigo_ocorrencia']
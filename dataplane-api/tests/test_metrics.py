@@ -0,0 +1,60 @@
+import threading
+from fastapi.testclient import TestClient
+from main import app
+from app.utils.metrics import Counter, Gauge, Histogram, REGISTRY
+
+client = TestClient(app)
+
+TEST_COUNTER = Counter("test_events_total", "Contador de teste", ["kind"])
+TEST_HISTOGRAM = Histogram("test_duration_seconds", "Histograma de teste", buckets=(0.1, 1.0))
+TEST_GAUGE = Gauge("test_level", "Gauge de teste", ["kind"])
+
+
+def test_counter_aggregates_across_threads():
+    """Testa que incrementos feitos em threads diferentes são somados"""
+    def work():
+        for _ in range(1000):
+            TEST_COUNTER.labels(kind="thread").inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert TEST_COUNTER.labels(kind="thread").value() == 4000
+    assert 'test_events_total{kind="thread"} 4000' in REGISTRY.expose()
+
+
+def test_histogram_buckets_are_cumulative():
+    """Testa a exposição cumulativa dos buckets do histograma"""
+    for value in (0.05, 0.5, 5.0):
+        TEST_HISTOGRAM.observe(value)
+
+    output = REGISTRY.expose()
+    assert 'test_duration_seconds_bucket{le="0.1"} 1' in output
+    assert 'test_duration_seconds_bucket{le="1"} 2' in output
+    assert 'test_duration_seconds_bucket{le="+Inf"} 3' in output
+    assert "test_duration_seconds_count 3" in output
+
+
+def test_metrics_endpoint_reports_route_templates():
+    """Testa que o /metrics expõe as requisições pelo template da rota"""
+    client.get("/api/v1/health/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/api/v1/health/",status="200"}' in response.text
+
+
+def test_non_finite_values_use_prometheus_format():
+    """Testa que infinitos e NaN são expostos como +Inf, -Inf e NaN"""
+    TEST_GAUGE.labels(kind="up").inc(float("inf"))
+    TEST_GAUGE.labels(kind="down").dec(float("inf"))
+    TEST_GAUGE.labels(kind="nan").inc(float("nan"))
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'test_level{kind="up"} +Inf' in response.text
+    assert 'test_level{kind="down"} -Inf' in response.text
+    assert 'test_level{kind="nan"} NaN' in response.text
@@ -0,0 +1,89 @@
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from app.config.settings import settings
+from app.services.ai_service import ai_service, LABEL_ENCODERS_PATH, MODEL_PATH, TARGET_ENCODER_PATH
+from app.services.model_registry import ModelRegistry
+
+client = TestClient(app)
+AUTH_HEADERS = {"Authorization": f"Bearer {settings.API_TOKEN}"}
+
+SCENARIO = {
+    "aeronave_tipo_operacao": "PRIVADA",
+    "fator_area": "FATOR HUMANO",
+    "aeronave_tipo_veiculo": "AVIÃO",
+    "aeronave_ano_fabricacao": 1980,
+    "ocorrencia_uf": "SP",
+    "aeronave_fatalidades_total": 0,
+}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.publish("v1", MODEL_PATH, LABEL_ENCODERS_PATH, TARGET_ENCODER_PATH, {"description": "primeira"})
+    registry.publish("v2", MODEL_PATH, LABEL_ENCODERS_PATH, TARGET_ENCODER_PATH, {"description": "segunda"})
+    ai_service.load()
+    previous_bundle = ai_service.bundle
+    monkeypatch.setattr(ai_service, "registry", registry)
+    monkeypatch.setattr(ai_service, "_active_mtime", registry.active_mtime())
+    yield registry
+    ai_service.bundle = previous_bundle
+    ai_service.reload_status = {"state": "idle"}
+    ai_service.prediction_cache.clear()
+
+
+def test_publish_writes_manifest_and_rejects_existing_version(registry):
+    """Testa que a versão publicada tem manifest com hashes e é imutável"""
+    manifest = registry.get_manifest("v1")
+    assert manifest["description"] == "primeira"
+    assert set(manifest["files"]) == {"model.joblib", "label_encoders.joblib", "target_encoder.joblib"}
+    with pytest.raises(FileExistsError):
+        registry.publish("v1", MODEL_PATH, LABEL_ENCODERS_PATH, TARGET_ENCODER_PATH)
+    with pytest.raises(ValueError):
+        registry.version_dir("../fora")
+
+
+def test_admin_load_swaps_model_version(registry):
+    """Testa a troca de versão pelo endpoint administrativo"""
+    response = client.post("/api/v1/admin/models/v2/load", headers=AUTH_HEADERS)
+    assert response.status_code == 202
+
+    # O TestClient executa a tarefa em background antes de devolver a resposta
+    models = client.get("/api/v1/admin/models", headers=AUTH_HEADERS).json()
+    assert models["reload"]["state"] == "ready"
+    assert models["current_version"] == "v2"
+    assert registry.active_version() == "v2"
+
+    prediction = client.post("/api/v1/predict", json=SCENARIO)
+    assert prediction.status_code == 200
+    assert prediction.json()["model_version"] == "v2"
+
+
+def test_admin_load_unknown_version(registry):
+    """Testa que uma versão inexistente não interrompe o modelo atual"""
+    current = ai_service.model_version
+    response = client.post("/api/v1/admin/models/v9/load", headers=AUTH_HEADERS)
+    assert response.status_code == 404
+    assert ai_service.model_version == current
+
+
+def test_worker_follows_version_activated_elsewhere(registry, monkeypatch):
+    """Testa que um worker que não recebeu a troca carrega a versão gravada no ACTIVE por outro"""
+    import time
+    monkeypatch.setattr(settings, "MODEL_ACTIVE_CHECK_INTERVAL_S", 0.01)
+    monkeypatch.setattr(ai_service, "_next_active_check", 0.0)
+
+    # Outro worker trocou a versão: só o ACTIVE mudou neste processo
+    ModelRegistry(registry.root).set_active("v2")
+    mtime = registry.active_mtime()
+    ai_service.predict(SCENARIO)
+
+    deadline = time.monotonic() + 30
+    while ai_service.reload_status.get("state") == "loading" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert ai_service.reload_status["state"] == "ready"
+    assert ai_service.model_version == "v2"
+    assert ai_service.predict(SCENARIO, use_cache=False)["model_version"] == "v2"
+    # Quem segue a troca não regrava o ACTIVE (o que dispararia os demais de novo)
+    assert registry.active_mtime() == mtime
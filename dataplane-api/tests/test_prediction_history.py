@@ -0,0 +1,61 @@
+from datetime import datetime
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from main import app
+from app.services.prediction_history_service import (
+    decode_cursor, encode_cursor, histogram_percentile, hourly_bucket_updates, merge_buckets
+)
+
+client = TestClient(app)
+
+
+def _record(minute, prediction="NENHUM", confidence=0.85, latency_ms=3.0, error=None):
+    return {
+        "endpoint": "predict", "model_version": "v1", "prediction": prediction, "confidence": confidence,
+        "error": error, "latency_ms": latency_ms, "created_at": datetime(2024, 5, 1, 10, minute),
+    }
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+    """Testa que o cursor devolve a mesma posição e que cursores inválidos geram 400"""
+    position = (datetime(2024, 5, 1, 10, 30, 15, 123000), ObjectId())
+    assert decode_cursor(encode_cursor(*position)) == position
+
+    response = client.get("/api/v1/predict/history", params={"cursor": "nao-e-um-cursor"})
+    assert response.status_code == 400
+
+
+def test_hourly_buckets_group_and_merge():
+    """Testa que os registros viram um upsert por hora e que a soma dos buckets gera as estatísticas"""
+    records = [
+        _record(1), _record(2, "SUBSTANCIAL", 0.42, 12.0), _record(3, latency_ms=0.4),
+        _record(4, prediction=None, confidence=None, error="Valor desconhecido"),
+    ]
+    updates = hourly_bucket_updates(records)
+    assert len(updates) == 1
+    increments = updates[0]._doc["$inc"]
+    assert increments["total"] == 4
+    assert increments["errors"] == 1
+    assert increments["predictions.NENHUM"] == 2
+    assert increments["confidence_hist.8"] == 2 and increments["confidence_hist.4"] == 1
+
+    bucket = {"hour": datetime(2024, 5, 1, 10), "predictions": {}, "confidence_hist": {}, "latency_hist": {}}
+    for key, value in increments.items():
+        field, _, sub = key.partition(".")
+        if sub:
+            bucket[field][sub] = value
+        else:
+            bucket[field] = value
+    stats = merge_buckets([bucket, {**bucket, "hour": datetime(2024, 5, 1, 11)}])
+    assert stats["total"] == 8
+    assert stats["predictions"] == {"NENHUM": 4, "SUBSTANCIAL": 2}
+    assert sum(item["count"] for item in stats["confidence_histogram"]) == 6
+    assert [item["hour"].hour for item in stats["hourly"]] == [10, 11]
+    assert stats["latency_ms"]["p50"] <= stats["latency_ms"]["p99"] <= 20
+
+
+def test_histogram_percentile_interpolates_within_bucket():
+    """Testa a interpolação do percentil dentro da faixa de latência"""
+    # 100 amostras na faixa (2, 5] ms
+    assert histogram_percentile({"3": 100}, 0.5) == 3.5
+    assert histogram_percentile({}, 0.5) is None
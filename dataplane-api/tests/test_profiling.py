@@ -0,0 +1,84 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.config.settings import settings
+
+client = TestClient(app)
+AUTH_HEADERS = {"Authorization": f"Bearer {settings.API_TOKEN}"}
+
+
+def test_profiling_requires_token():
+    """Testa que o profiling sob demanda exige o API token"""
+    response = client.get("/api/v1/health/?__profile=1")
+    assert response.status_code == 401
+
+
+def test_requests_without_marker_are_not_profiled():
+    """Testa que requisições comuns não geram profile"""
+    response = client.get("/api/v1/health/", headers=AUTH_HEADERS)
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_profiled_request_is_stored_in_folded_format():
+    """Testa que o profile da requisição fica disponível no endpoint administrativo"""
+    response = client.get("/api/v1/health/", headers={**AUTH_HEADERS, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    profiles = client.get("/api/v1/admin/profiles", headers=AUTH_HEADERS).json()["profiles"]
+    assert any(profile["id"] == profile_id for profile in profiles)
+
+    folded = client.get(f"/api/v1/admin/profiles/{profile_id}", headers=AUTH_HEADERS)
+    assert folded.status_code == 200
+    for line in folded.text.strip().splitlines():
+        stack, _, count = line.rpartition(" ")
+        assert stack and int(count) > 0
+
+
+def test_tracemalloc_snapshot_after_n_requests():
+    """Testa o snapshot automático de alocações após N requisições"""
+    response = client.post("/api/v1/admin/tracemalloc/start?requests=2", headers=AUTH_HEADERS)
+    assert response.status_code == 200
+    try:
+        client.get("/api/v1/health/")
+        assert client.post("/api/v1/admin/tracemalloc/snapshot", headers={}).status_code == 403
+        client.get("/api/v1/health/")
+
+        report = client.get("/api/v1/admin/tracemalloc/report?limit=5", headers=AUTH_HEADERS).json()
+        assert report["seen_requests"] == 2
+        assert report["has_snapshot"] is True
+        assert len(report["top_allocations"]) <= 5
+    finally:
+        client.post("/api/v1/admin/tracemalloc/stop", headers=AUTH_HEADERS)
+
+
+def test_allocation_snapshot_runs_off_the_event_loop(monkeypatch):
+    """Testa que a contagem não depende do ProfilingMiddleware e que o snapshot roda no threadpool"""
+    import threading
+    from fastapi import FastAPI
+    from app.middleware.profiling import AllocationTrackingMiddleware
+    from app.utils.allocation_profiler import allocation_tracker
+
+    threads = {}
+    bare_app = FastAPI()
+    bare_app.add_middleware(AllocationTrackingMiddleware)
+
+    @bare_app.get("/ping")
+    async def ping():
+        threads["loop"] = threading.current_thread()
+        return {}
+
+    snapshot = allocation_tracker.snapshot
+
+    def spy():
+        threads["snapshot"] = threading.current_thread()
+        snapshot()
+
+    monkeypatch.setattr(allocation_tracker, "snapshot", spy)
+    allocation_tracker.start(requests=1)
+    try:
+        TestClient(bare_app).get("/ping")
+        assert allocation_tracker.status()["has_snapshot"] is True
+        assert threads["snapshot"] is not threads["loop"]
+    finally:
+        allocation_tracker.stop()
@@ -0,0 +1,90 @@
+import sys
+import threading
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "mongo-seeders"))
+from seed_pipeline import SeedPipeline, Stage, StageFailed, StageGraph  # noqa: E402
+
+
+class FakeCheckpoint:
+    """Checkpoint em memória, como o MongoCheckpoint"""
+
+    def __init__(self, completed=()):
+        self.done = set(completed)
+        self.finished = False
+
+    def completed(self):
+        return set(self.done)
+
+    def mark_done(self, stage, elapsed_s):
+        self.done.add(stage)
+
+    def mark_finished(self):
+        self.finished = True
+
+
+def build_graph(calls, fail=None, concurrent=True):
+    """parse → (load, merge) → publish; com `concurrent`, load e merge só terminam se rodarem ao mesmo tempo"""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def stage(name, value=None, wait=False):
+        def run(inputs):
+            calls.append((name, inputs))
+            if wait and concurrent:
+                barrier.wait()
+            if name == fail:
+                raise RuntimeError("falhou")
+            return value
+        return run
+
+    return StageGraph([
+        Stage("parse", stage("parse", "frames"), persistent=False),
+        Stage("load", stage("load", wait=True), ("parse",)),
+        Stage("merge", stage("merge", "merged", wait=True), ("parse",), persistent=False),
+        Stage("publish", stage("publish"), ("merge",)),
+    ], max_workers=2)
+
+
+def test_independent_stages_run_concurrently_and_pass_results():
+    """Testa que etapas independentes rodam juntas e recebem o resultado das dependências"""
+    calls = []
+    checkpoint = FakeCheckpoint()
+    results = build_graph(calls).run(checkpoint)
+
+    assert calls[0] == ("parse", {})
+    assert dict(calls)["merge"] == {"parse": "frames"}
+    assert dict(calls)["publish"] == {"merge": "merged"}
+    assert results["merge"] == "merged"
+    assert checkpoint.done == {"load", "publish"} and checkpoint.finished
+
+
+def test_rerun_resumes_after_failed_stage():
+    """Testa que a nova execução pula as etapas com checkpoint e refaz só o necessário"""
+    calls = []
+    checkpoint = FakeCheckpoint()
+    with pytest.raises(StageFailed) as error:
+        build_graph(calls, fail="publish").run(checkpoint)
+    assert error.value.stage == "publish"
+    assert checkpoint.done == {"load"} and not checkpoint.finished
+
+    calls = []
+    build_graph(calls, concurrent=False).run(checkpoint)
+    # merge é só de memória: roda de novo porque publish precisa dela
+    assert [name for name, _ in calls] == ["parse", "merge", "publish"]
+    assert checkpoint.done == {"load", "publish"} and checkpoint.finished
+
+
+def test_cycles_are_rejected():
+    """Testa que um ciclo de dependências é recusado ao montar o grafo"""
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda _: None, ("b",)), Stage("b", lambda _: None, ("a",))])
+
+
+def test_incremental_pipeline_skips_full_merge():
+    """Testa que o modo incremental não tem a etapa merge, cujo resultado seria descartado"""
+    full = StageGraph(SeedPipeline(db=None).stages())
+    incremental = StageGraph(SeedPipeline(db=None, incremental=True).stages())
+    assert "merge" in full.stages and "merge" in full.stages["publish_merged"].depends_on
+    assert "merge" not in incremental.stages
+    assert incremental.plan(set()) == set(incremental.stages)
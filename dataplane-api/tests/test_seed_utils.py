@@ -0,0 +1,367 @@
+import math
+import sys
+import threading
+from pathlib import Path
+import pandas as pd
+import pytest
+from pymongo import DeleteMany, InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "mongo-seeders"))
+import create_merged_collection  # noqa: E402
+from seed_utils import (  # noqa: E402
+    CSV_OPTIONS, GroupHasher, diff_digests, frame_records, load_csv, sync_csv_incremental
+)
+
+DATASETS = Path(__file__).resolve().parents[1] / "mongo-seeders" / "datasets"
+
+
+class MemoryCollection:
+    """
+    Collection em memória, segura entre threads. `rejected` documentos de
+    cada insert_many são descartados, em silêncio ou (com `write_errors`)
+    com BulkWriteError, como num insert_many(ordered=False) com erros.
+    """
+
+    def __init__(self, database=None, name=None, rejected=0, write_errors=False):
+        self.database = database
+        self.name = name
+        self.documents = []
+        self.calls = []
+        self.indexes = []
+        self.renamed = []
+        self.rejected = rejected
+        self.write_errors = write_errors
+        self._lock = threading.Lock()
+
+    def insert_many(self, documents, ordered=True):
+        accepted = documents[:len(documents) - self.rejected] if self.rejected else documents
+        with self._lock:
+            self.calls.append((len(documents), ordered))
+            self.documents.extend(accepted)
+        if self.write_errors and len(accepted) < len(documents):
+            raise BulkWriteError({
+                "writeErrors": [{"index": i, "code": 11000} for i in range(len(accepted), len(documents))],
+                "nInserted": len(accepted),
+            })
+
+        class Result:
+            inserted_ids = list(range(len(accepted)))
+        return Result()
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+
+    def count_documents(self, query):
+        return sum(1 for doc in self.documents if _matches(doc, query))
+
+    def estimated_document_count(self):
+        return len(self.documents)
+
+    def find_one(self, query=None, projection=None):
+        return next((doc for doc in self.documents if _matches(doc, query or {})), None)
+
+    def delete_one(self, query):
+        index = next((i for i, doc in enumerate(self.documents) if _matches(doc, query)), None)
+        if index is not None:
+            del self.documents[index]
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        """$inc e $set, retornando o documento depois da atualização"""
+        document = self.find_one(query)
+        if document is None:
+            if not upsert:
+                return None
+            document = dict(query)
+            self.documents.append(document)
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+        document.update(update.get("$set", {}))
+        return dict(document)
+
+    def rename(self, new_name, dropTarget=False):
+        collections = self.database.collections
+        if new_name in collections and not dropTarget:
+            raise RuntimeError(f"target namespace exists: {new_name}")
+        self.renamed.append((new_name, dropTarget))
+        del collections[self.name]
+        collections[new_name] = self
+        self.name = new_name
+
+
+    def bulk_write(self, operations, ordered=True):
+        """InsertOne, ReplaceOne (com upsert) e DeleteMany por igualdade ou $in"""
+        counts = {"nInserted": 0, "nUpserted": 0, "nModified": 0, "nRemoved": 0}
+        with self._lock:
+            self.calls.append((len(operations), ordered))
+            for operation in operations:
+                if isinstance(operation, InsertOne):
+                    self.documents.append(operation._doc)
+                    counts["nInserted"] += 1
+                elif isinstance(operation, ReplaceOne):
+                    index = next((i for i, doc in enumerate(self.documents)
+                                  if _matches(doc, operation._filter)), None)
+                    if index is not None:
+                        self.documents[index] = operation._doc
+                        counts["nModified"] += 1
+                    elif operation._upsert:
+                        self.documents.append(operation._doc)
+                        counts["nUpserted"] += 1
+                elif isinstance(operation, DeleteMany):
+                    kept = [doc for doc in self.documents if not _matches(doc, operation._filter)]
+                    counts["nRemoved"] += len(self.documents) - len(kept)
+                    self.documents = kept
+
+        class Result:
+            bulk_api_result = counts
+        return Result()
+
+
+class MemoryDatabase:
+    """Database em memória; collections `*__staging` são criadas com as falhas de `staging_options`"""
+
+    def __init__(self, **staging_options):
+        self.collections = {}
+        self.staging_options = staging_options
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            options = self.staging_options if name.endswith("__staging") else {}
+            self.collections[name] = MemoryCollection(self, name, **options)
+        return self.collections[name]
+
+    def drop_collection(self, name):
+        self.collections.pop(name, None)
+
+
+class MemoryStore:
+    """HashStore em memória"""
+
+    def __init__(self, digests=None, full_load_s=None):
+        self.digests = dict(digests or {})
+        self.full_load_s = full_load_s
+
+    def load(self):
+        return dict(self.digests)
+
+    def apply(self, digests, removed):
+        self.digests.update(digests)
+        for code in removed:
+            self.digests.pop(code, None)
+
+    def last_full_load_s(self):
+        return self.full_load_s
+
+
+def _matches(document, query):
+    """Igualdade e $in como no MongoDB: NaN casa com NaN, null não casa com NaN"""
+    for field, condition in query.items():
+        candidates = condition["$in"] if isinstance(condition, dict) else [condition]
+        if not any(_same(document.get(field), candidate) for candidate in candidates):
+            return False
+    return True
+
+
+def _same(a, b):
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+
+def test_frame_records_matches_to_dict():
+    """Testa que os documentos do bloco são iguais aos do to_dict('records'), inclusive NaN e tipos nativos"""
+    df = pd.read_csv(DATASETS / "fator_contribuinte.csv", nrows=500, **CSV_OPTIONS)
+    expected = df.to_dict(orient="records")
+    records = frame_records(df)
+    assert len(records) == len(expected)
+    for record, reference in zip(records, expected):
+        assert record.keys() == reference.keys()
+        assert all(_same(record[k], reference[k]) and type(record[k]) is type(reference[k]) for k in record)
+
+
+def test_load_csv_inserts_every_row_unordered_in_chunks():
+    """Testa que a carga em blocos insere todas as linhas com insert_many não ordenado"""
+    collection = MemoryCollection()
+    stats = load_csv(DATASETS / "ocorrencia_tipo.csv", collection, chunk_size=1000, writers=3)
+
+    total = len(pd.read_csv(DATASETS / "ocorrencia_tipo.csv", **CSV_OPTIONS))
+    assert stats.rows == stats.inserted == len(collection.documents) == total
+    assert all(size <= 1000 and ordered is False for size, ordered in collection.calls)
+    assert stats.peak_rss_bytes is None or stats.peak_rss_bytes > 0
+
+
+def test_group_hashes_ignore_row_order_and_detect_changes():
+    """Testa que o hash por ocorrência não depende da ordem/blocos e que o diff separa novas, alteradas e removidas"""
+    df = pd.read_csv(DATASETS / "aeronave.csv", nrows=2000, **CSV_OPTIONS)
+    key = "codigo_ocorrencia2"
+
+    whole = GroupHasher(key)
+    whole.add(frame_records(df))
+    shuffled = GroupHasher(key)
+    for chunk in (df.sample(frac=1, random_state=0).iloc[i:i + 300] for i in range(0, len(df), 300)):
+        shuffled.add(frame_records(chunk))
+    assert whole.digests() == shuffled.digests()
+
+    codes = df[key].unique()
+    edited = df[df[key] != codes[0]].copy()
+    edited.loc[edited[key] == codes[1], "aeronave_fatalidades_total"] += 1
+    edited = pd.concat([edited, df[df[key] == codes[2]].assign(**{key: 999999999})])
+
+    new = GroupHasher(key)
+    new.add(frame_records(edited))
+    diff = diff_digests(whole.digests(), new.digests())
+    assert diff.removed == {codes[0]}
+    assert diff.changed == {codes[1]}
+    assert diff.added == {999999999}
+    assert diff.unchanged == len(codes) - 2
+
+
+def _sorted_documents(documents, key):
+    return sorted(documents, key=lambda doc: (doc[key], repr(sorted(doc.items()))))
+
+
+def test_sync_csv_incremental_applies_only_the_difference():
+    """Testa o modo incremental: código novo, alterado com uma linha, de uma para várias linhas, de várias para uma e removido"""
+    key = "codigo_ocorrencia3"
+    old = pd.DataFrame({
+        key: [1, 2, 3, 4, 4, 6, 6],
+        "fator_nome": ["A", "B", "C", "D", "E", "F", "G"],
+    })
+    new = pd.DataFrame({
+        key: [1, 2, 2, 4, 4, 6, 5],
+        "fator_nome": ["A2", "B", "B2", "D", "E", "F", "H"],
+    })
+
+    collection = MemoryCollection()
+    hasher = GroupHasher(key)
+    load_csv(Path("fator_contribuinte.csv"), collection, chunk_size=2, writers=2, hasher=hasher, frame=old)
+    store = MemoryStore(hasher.digests())
+    unchanged = [doc for doc in collection.documents if doc[key] == 4]
+
+    diff, stats = sync_csv_incremental(Path("fator_contribuinte.csv"), collection, store, key,
+                                       chunk_size=2, writers=2, frame=new)
+
+    assert (diff.added, diff.changed, diff.removed, diff.unchanged) == ({5}, {1, 2, 6}, {3}, 1)
+    assert _sorted_documents(collection.documents, key) == _sorted_documents(frame_records(new), key)
+    # Ocorrências iguais não são reescritas
+    assert all(any(doc is original for doc in collection.documents) for original in unchanged)
+    expected = GroupHasher(key)
+    expected.add(frame_records(new))
+    assert store.digests == expected.digests()
+
+
+@pytest.mark.parametrize("new_names", [["Y"], ["Y", "Z"]], ids=["uma linha", "várias linhas"])
+def test_sync_csv_incremental_replaces_rows_without_code(new_names):
+    """Testa que linhas sem código (gravadas com NaN) são substituídas, e não duplicadas"""
+    key = "codigo_ocorrencia4"
+    nan = float("nan")
+    old = pd.DataFrame({key: [1, nan], "recomendacao_numero": ["A", "X"]})
+    new = pd.DataFrame({key: [1] + [nan] * len(new_names), "recomendacao_numero": ["A"] + new_names})
+
+    collection = MemoryCollection()
+    hasher = GroupHasher(key)
+    load_csv(Path("recomendacao.csv"), collection, hasher=hasher, frame=old)
+    store = MemoryStore(hasher.digests())
+
+    diff, _ = sync_csv_incremental(Path("recomendacao.csv"), collection, store, key, frame=new)
+
+    assert diff.changed == {None}
+    assert sorted(doc["recomendacao_numero"] for doc in collection.documents) == ["A"] + new_names
+
+
+def test_update_incremental_rewrites_only_affected_documents(monkeypatch):
+    """Testa que a collection mesclada incremental fica igual a uma reconstrução completa"""
+    creator = create_merged_collection.MergedCollectionCreator()
+    full = creator.load_csv_data()
+    codes = list(full["ocorrencia"]["codigo_ocorrencia"].head(30))
+    old = {
+        name: df[df[key].isin(codes)]
+        for name, df in full.items()
+        for key in [create_merged_collection.SOURCE_KEYS[name]]
+    }
+
+    collection = MemoryCollection()
+    collection.documents = frame_records(creator.clean_data(creator.merge_data(old)))
+    store = MemoryStore(creator.source_digests(old), full_load_s=1.0)
+
+    new = dict(old)
+    removed, changed, extended = codes[0], codes[1], codes[2]
+    new["ocorrencia"] = pd.concat([
+        old["ocorrencia"][old["ocorrencia"]["codigo_ocorrencia"] != removed],
+        old["ocorrencia"][old["ocorrencia"]["codigo_ocorrencia"] == codes[3]].assign(codigo_ocorrencia="999999999"),
+    ])
+    tipos = old["ocorrencia_tipo"].copy()
+    tipos.loc[tipos["codigo_ocorrencia1"] == changed, "ocorrencia_tipo"] = "ALTERADO"
+    new["ocorrencia_tipo"] = pd.concat([
+        tipos,
+        tipos[tipos["codigo_ocorrencia1"] == extended].assign(ocorrencia_tipo="OUTRO"),
+    ])
+
+    monkeypatch.setattr(create_merged_collection, "HashStore", lambda db, namespace: store)
+    monkeypatch.setattr(creator, "connect", lambda: setattr(creator, "db", {"ocorrencia_completa": collection}))
+    monkeypatch.setattr(creator, "disconnect", lambda: None)
+    monkeypatch.setattr(creator, "bump_dataset_version", lambda name: 2)
+
+    assert creator.update_incremental(new) is True
+
+    expected = {doc["codigo_ocorrencia"]: doc for doc in frame_records(creator.clean_data(creator.merge_data(new)))}
+    published = {doc["codigo_ocorrencia"]: doc for doc in collection.documents}
+    assert published.keys() == expected.keys()
+    assert removed not in published and "999999999" in published
+    assert "ALTERADO" in published[changed]["ocorrencia_tipo"]
+    assert "OUTRO" in published[extended]["ocorrencia_tipo"]
+    for code, doc in expected.items():
+        assert doc.keys() == published[code].keys()
+        assert all(_same(doc[k], published[code][k]) for k in doc), code
+
+
+def _publishing_creator(monkeypatch, db):
+    creator = create_merged_collection.MergedCollectionCreator()
+    monkeypatch.setattr(creator, "connect", lambda: setattr(creator, "db", db))
+    monkeypatch.setattr(creator, "disconnect", lambda: None)
+    return creator
+
+
+def _live_database(**staging_options):
+    db = MemoryDatabase(**staging_options)
+    db["ocorrencia_completa"].documents = [{"codigo_ocorrencia": "antigo"}]
+    db["dataset_versions"].documents = [{"_id": "ocorrencia_completa", "version": 3}]
+    db["scoring_checkpoints"].documents = [{"_id": "ocorrencia_completa", "last_id": 1}]
+    return db
+
+
+def test_save_to_mongodb_publishes_through_staging(monkeypatch):
+    """Testa a publicação: staging preenchida e indexada, rename com dropTarget e versão incrementada"""
+    df = pd.DataFrame({"codigo_ocorrencia": [str(code) for code in range(12)], "valor": range(12)})
+    db = _live_database()
+    creator = _publishing_creator(monkeypatch, db)
+
+    creator.save_to_mongodb(df)
+
+    live = db.collections["ocorrencia_completa"]
+    assert "ocorrencia_completa__staging" not in db.collections
+    assert live.renamed == [("ocorrencia_completa", True)]
+    assert live.documents == frame_records(df)
+    # Os índices foram criados antes do rename, na própria staging
+    assert "codigo_ocorrencia" in live.indexes and len(live.indexes) == 4
+    version = db["dataset_versions"].find_one({"_id": "ocorrencia_completa"})
+    assert version["version"] == 4 and version["documents"] == len(df)
+    assert db["scoring_checkpoints"].documents == []
+
+
+@pytest.mark.parametrize("staging_options", [
+    {"rejected": 1},
+    {"rejected": 1, "write_errors": True},
+], ids=["contagem", "erros de escrita"])
+def test_save_to_mongodb_keeps_live_collection_on_failure(monkeypatch, staging_options):
+    """Testa que contagem divergente ou erros de escrita descartam a staging sem tocar na collection publicada"""
+    df = pd.DataFrame({"codigo_ocorrencia": [str(code) for code in range(12)], "valor": range(12)})
+    db = _live_database(**staging_options)
+    live = db["ocorrencia_completa"]
+    creator = _publishing_creator(monkeypatch, db)
+
+    with pytest.raises(RuntimeError, match="não foi alterada"):
+        creator.save_to_mongodb(df)
+
+    assert "ocorrencia_completa__staging" not in db.collections
+    assert db.collections["ocorrencia_completa"] is live
+    assert live.documents == [{"codigo_ocorrencia": "antigo"}]
+    assert db["dataset_versions"].find_one({"_id": "ocorrencia_completa"})["version"] == 3
@@ -0,0 +1,184 @@
+import math
+import sys
+from pathlib import Path
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "mongo-seeders"))
+from create_merged_collection import MergedCollectionCreator  # noqa: E402
+from seed_utils import frame_records  # noqa: E402
+from server_side_merge import JOINED_TABLES, merged_pipeline  # noqa: E402
+
+DATASETS = Path(__file__).resolve().parents[1] / "mongo-seeders" / "datasets"
+TABLES = ["ocorrencia", "aeronave", "ocorrencia_tipo", "fator_contribuinte", "recomendacao"]
+
+MISSING = object()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _same(a, b):
+    """Igualdade do MongoDB: compara o tipo, e NaN é igual a NaN"""
+    if _is_number(a) and _is_number(b):
+        return a == b or (math.isnan(a) and math.isnan(b))
+    return type(a) is type(b) and a == b
+
+
+def _get(document, path):
+    """Caminho com pontos; em arrays, pega o campo de cada elemento (como o MongoDB)"""
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [item[part] for item in value if isinstance(item, dict) and part in item]
+        elif isinstance(value, dict):
+            value = value.get(part, MISSING)
+        else:
+            return MISSING
+    return value
+
+
+def _to_string(value):
+    if value is None or value is MISSING:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def evaluate(expression, variables):
+    """Avalia os operadores de agregação usados por merged_pipeline"""
+    if isinstance(expression, str) and expression.startswith("$$"):
+        name, _, path = expression[2:].partition(".")
+        value = variables[name]
+        return _get(value, path) if path else value
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get(variables["ROOT"], expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, variables) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+
+    (operator, args), = expression.items()
+    if operator == "$let":
+        scope = dict(variables)
+        scope.update({name: evaluate(value, variables) for name, value in args["vars"].items()})
+        return evaluate(args["in"], scope)
+    if operator == "$cond":
+        condition, then, otherwise = args
+        return evaluate(then if evaluate(condition, variables) else otherwise, variables)
+    if operator == "$filter":
+        items = evaluate(args["input"], variables)
+        return [item for item in items if evaluate(args["cond"], {**variables, "this": item})]
+    if operator == "$reduce":
+        value = evaluate(args["initialValue"], variables)
+        for item in evaluate(args["input"], variables):
+            value = evaluate(args["in"], {**variables, "value": value, "this": item})
+        return value
+    if operator == "$and":
+        return all(evaluate(item, variables) for item in args)
+
+    values = evaluate(args, variables)
+    if operator == "$ifNull":
+        value, default = values
+        return default if value is None or value is MISSING else value
+    if operator == "$eq":
+        return _same(*values)
+    if operator == "$ne":
+        return not _same(*values)
+    if operator == "$in":
+        value, items = values
+        return any(_same(value, item) for item in items)
+    if operator == "$first":
+        return values[0] if values else MISSING
+    if operator == "$size":
+        return len(values)
+    if operator == "$concatArrays":
+        return [item for array in values for item in array]
+    if operator == "$concat":
+        return "".join(values)
+    if operator == "$toString":
+        return _to_string(values)
+    raise NotImplementedError(operator)
+
+
+def run_pipeline(collections, pipeline):
+    """Executa o pipeline sobre listas de documentos, com as comparações de tipo do MongoDB"""
+    documents = [dict(document) for document in collections["ocorrencia"]]
+    for stage in pipeline:
+        (name, args), = stage.items()
+        if name == "$set":
+            documents = [
+                {**document, **{field: evaluate(value, {"ROOT": document}) for field, value in args.items()}}
+                for document in documents
+            ]
+        elif name == "$lookup":
+            foreign = collections[args["from"]]
+            for document in documents:
+                local = document[args["localField"]]
+                document[args["as"]] = [
+                    row for row in foreign
+                    if any(_same(row.get(args["foreignField"]), value) for value in local)
+                ]
+        elif name == "$unset":
+            documents = [{k: v for k, v in document.items() if k not in args} for document in documents]
+        elif name != "$out":
+            raise NotImplementedError(name)
+    return documents
+
+
+def _same_document(a, b):
+    return a.keys() == b.keys() and all(_same(a[key], b[key]) or a[key] == b[key] for key in a)
+
+
+def load_sample():
+    """
+    Ocorrências com e sem recomendação, algumas com tipos vazios, e as
+    linhas delas em cada tabela,
+    com os tipos das colunas do CSV inteiro (como ficam no MongoDB)
+    """
+    frames = {}
+    for name in TABLES:
+        df = pd.read_csv(DATASETS / f"{name}.csv", sep=";", encoding="latin1")
+        df.columns = df.columns.str.strip()
+        frames[name] = df
+
+    codes = frames["ocorrencia"]["codigo_ocorrencia"]
+    with_recommendation = codes[codes.astype(str).isin(frames["recomendacao"]["codigo_ocorrencia4"].astype(str))]
+    types = frames["ocorrencia_tipo"]
+    empty_types = types.groupby("codigo_ocorrencia1")["ocorrencia_tipo"].count().loc[lambda count: count == 0]
+    sample = set(with_recommendation.head(20)) | set(empty_types.index[:5]) | set(codes.head(20))
+
+    data = {"ocorrencia": frames["ocorrencia"][codes.isin(sample)]}
+    for name, key in [("aeronave", "codigo_ocorrencia2")] + [(name, key) for name, key, *_ in JOINED_TABLES]:
+        keys = frames[name][key].astype(str)
+        data[name] = frames[name][keys.isin({str(code) for code in sample})]
+    return data
+
+
+def test_pipeline_matches_pandas_merge_values():
+    """Testa que o pipeline do servidor gera os mesmos documentos que merge_data + clean_data"""
+    data = load_sample()
+    creator = MergedCollectionCreator()
+    expected = {
+        document["codigo_ocorrencia"]: document
+        for document in frame_records(creator.clean_data(creator.merge_data(creator.load_csv_data(frames=data))))
+    }
+
+    # Documentos como o seed_database grava: os valores do CSV, sem converter os códigos
+    collections = {name: frame_records(df) for name, df in data.items()}
+    text_fields = {
+        column for name in ("ocorrencia", "aeronave") for column, dtype in data[name].dtypes.items()
+        if dtype == object
+    }
+    pipeline = merged_pipeline(list(data["ocorrencia"].columns), list(data["aeronave"].columns),
+                               text_fields, "staging")
+    produced = run_pipeline(collections, pipeline)
+
+    assert len(produced) == len(expected) == len(data["ocorrencia"])
+    assert any(document["recomendacao_numero"] not in ("None", None) for document in produced)
+    assert any(document["fator_nome"] == "None" for document in produced)
+    assert any(document["ocorrencia_tipo"] is None for document in produced)
+    for document in produced:
+        assert _same_document(document, expected[document["codigo_ocorrencia"]]), document["codigo_ocorrencia"]
+    assert pipeline[-1] == {"$out": "staging"}
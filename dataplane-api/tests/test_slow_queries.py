@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from main import app
+from app.config.settings import settings
+from app.models.monitoring import (
+    CommandMetricsListener,
+    SlowQueryLog,
+    redact_shape,
+    summarize_explain,
+)
+
+client = TestClient(app)
+
+
+def test_redact_shape_hides_values():
+    """Testa que o formato do filtro mantém campos e operadores, mas não valores"""
+    shape = redact_shape({"ocorrencia_uf": {"$in": ["SP", "RJ"]}, "ocorrencia_dia": {"$gte": "2020-01-01"}})
+    assert shape == {"ocorrencia_uf": {"$in": ["?"]}, "ocorrencia_dia": {"$gte": "?"}}
+    assert redact_shape({"ocorrencia_uf": {"$in": ["SP"]}}) == redact_shape({"ocorrencia_uf": {"$in": ["MG", "BA", "PR"]}})
+
+
+def test_summarize_explain_reports_collection_scan():
+    """Testa o resumo de um explain('executionStats')"""
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "COLLSCAN"}}},
+        "executionStats": {"nReturned": 10, "totalDocsExamined": 5000, "totalKeysExamined": 0, "executionTimeMillis": 42},
+    }
+    summary = summarize_explain(explain)
+    assert summary["winning_plan"] == ["LIMIT", "COLLSCAN"]
+    assert summary["uses_collection_scan"] is True
+    assert summary["docs_examined"] == 5000
+    assert summary["docs_returned"] == 10
+
+
+def test_listener_records_slow_commands_once_per_shape():
+    """Testa que comandos acima do limite entram no log agrupados por formato"""
+    log = SlowQueryLog(max_entries=10)
+    listener = CommandMetricsListener(log)
+    slow_micros = int((settings.SLOW_QUERY_THRESHOLD_MS + 50) * 1000)
+
+    for request_id, state in enumerate(["SP", "RJ"]):
+        command = {"find": "ocorrencia", "filter": {"ocorrencia_uf": {"$in": [state]}}}
+        listener.started(SimpleNamespace(command=command, command_name="find", connection_id=1, request_id=request_id))
+        listener.succeeded(SimpleNamespace(
+            command_name="find", connection_id=1, request_id=request_id, duration_micros=slow_micros,
+            reply={"cursor": {"firstBatch": [{}, {}, {}]}}
+        ))
+
+    report = log.report()
+    assert len(report["entries"]) == 2
+    assert report["entries"][0]["docs_returned"] == 3
+    assert len(report["shapes"]) == 1
+    assert report["shapes"][0]["count"] == 2
+
+
+def test_slow_queries_endpoint_requires_token():
+    """Testa que o endpoint administrativo exige o API token"""
+    assert client.get("/api/v1/admin/slow-queries").status_code == 403
+    response = client.get(
+        "/api/v1/admin/slow-queries",
+        headers={"Authorization": f"Bearer {settings.API_TOKEN}"}
+    )
+    assert response.status_code == 200
+    assert "shapes" in response.json()
@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.utils.timing import ServerTiming, timed
+
+client = TestClient(app)
+
+
+def test_server_timing_header_format():
+    """Testa a formatação das fases no padrão Server-Timing"""
+    timing = ServerTiming()
+    timing.add("db_find", 0.010)
+    timing.add("db_find", 0.005)
+    timing.add("serialize", 0.002)
+
+    assert timing.header_value(total=0.020) == "db_find;dur=15.000, serialize;dur=2.000, total;dur=20.000"
+    assert timing.as_dict() == {"db_find": 15.0, "serialize": 2.0}
+
+
+def test_timed_is_noop_outside_requests():
+    """Testa que timed não falha fora do contexto de uma requisição"""
+    with timed("fase"):
+        pass
+
+
+def test_responses_carry_server_timing_header():
+    """Testa que as respostas trazem o header Server-Timing"""
+    response = client.get("/api/v1/health/")
+    assert response.status_code == 200
+    assert "total;dur=" in response.headers["server-timing"]
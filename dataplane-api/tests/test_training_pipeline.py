@@ -0,0 +1,46 @@
+import joblib
+from app.services.model_registry import ModelRegistry
+from model.training.tuning import CandidateReport, mark_pareto
+from model.training.pipeline import (
+    TrainingConfig, StageTimer, build_training_frame, encode_features, load_datasets, publish, train
+)
+
+
+def test_features_match_shipped_encoders():
+    """Testa que as features montadas dos CSVs geram os mesmos encoders do modelo em produção"""
+    X, y, label_encoders, target_encoder = encode_features(build_training_frame(load_datasets()))
+    shipped = joblib.load('model/label_encoders/label_encoders.joblib')
+    shipped_target = joblib.load('model/target_encoders/target_encoder.joblib')
+    for col, encoder in label_encoders.items():
+        assert list(encoder.classes_) == list(shipped[col].classes_)
+    assert list(target_encoder.classes_) == list(shipped_target.classes_)
+    assert len(X) == len(y)
+
+
+def test_train_and_publish_bundle(tmp_path):
+    """Testa o pipeline completo publicando uma versão no registro"""
+    config = TrainingConfig(n_estimators=5, max_depth=6, cv_folds=2)
+    timer = StageTimer(verbose=False)
+    result = train(config, timer=timer)
+    assert 0.0 < result.metrics["accuracy"] <= 1.0
+    assert "cv_accuracy_mean" in result.metrics
+    assert "Treino" in timer.timings
+
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    manifest = publish(result, config, "rf-teste", registry)
+    assert manifest["training_rows"] == result.n_rows
+    assert registry.active_version() == "rf-teste"
+
+
+def test_pareto_front_excludes_dominated_candidates():
+    """Testa que candidatos piores em F1, latência e tamanho ficam fora da fronteira"""
+    def report(name, f1, p99, size):
+        return CandidateReport(name, {"f1_macro": f1, "single_p99_ms": p99, "joblib_mb": size})
+
+    reports = [
+        report("preciso", 0.90, 0.50, 10.0),
+        report("barato", 0.80, 0.20, 1.0),
+        report("dominado", 0.79, 0.30, 2.0),
+    ]
+    mark_pareto(reports)
+    assert [r.name for r in reports if r.pareto] == ["preciso", "barato"]
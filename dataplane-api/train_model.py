@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script para treinar o modelo de nível de dano a partir dos CSVs locais
+Substitui o notebook do Colab: lê mongo-seeders/datasets, treina o
+RandomForest e a validação cruzada em paralelo e publica o modelo e os
+encoders como uma nova versão do registro (model/registry/<versão>).
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from model.training.pipeline import TrainingConfig, StageTimer, train, publish
+from app.services.model_registry import model_registry
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Treina o modelo de nível de dano")
+    parser.add_argument("--version", help="Nome da versão no registro (padrão: rf-<data>-<hora>)")
+    parser.add_argument("--n-estimators", type=int, default=100, help="Número de árvores")
+    parser.add_argument("--max-depth", type=int, default=15, help="Profundidade máxima (0 = sem limite)")
+    parser.add_argument("--cv-folds", type=int, default=5, help="Folds da validação cruzada (0 = pula)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Núcleos usados (-1 = todos)")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--activate", action="store_true", help="Marca a versão como ativa no registro")
+    parser.add_argument("--dry-run", action="store_true", help="Treina e avalia sem publicar")
+    return parser.parse_args()
+
+
+def main():
+    """Função principal"""
+    args = parse_args()
+    config = TrainingConfig(
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth or None,
+        cv_folds=args.cv_folds,
+        n_jobs=args.n_jobs,
+        random_state=args.random_state,
+    )
+    version = args.version or datetime.now().strftime("rf-%Y%m%d-%H%M%S")
+
+    print("=" * 60)
+    print("🧠 TREINO DO MODELO")
+    print("=" * 60)
+    start = time.perf_counter()
+    timer = StageTimer()
+    result = train(config, timer=timer)
+
+    print()
+    print(f"📊 Linhas de treino: {result.n_rows}")
+    for name, value in result.metrics.items():
+        print(f"   {name}: {value:.4f}")
+
+    if not args.dry_run:
+        with timer.stage("Publicação no registro"):
+            try:
+                publish(result, config, version, model_registry)
+            except (OSError, ValueError) as e:
+                print(f"❌ Erro ao publicar a versão: {e}")
+                sys.exit(1)
+        if args.activate:
+            model_registry.set_active(version)
+        print(f"📦 Versão {version} publicada em {model_registry.version_dir(version)}")
+        print(f"   Para servir: POST /api/v1/admin/models/{version}/load")
+
+    print()
+    print("⏱️  Tempo por etapa:")
+    for name, elapsed in timer.timings.items():
+        print(f"   {name:<40} {elapsed:>8.2f}s")
+    print(f"   {'Total':<40} {time.perf_counter() - start:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Script para comparar acurácia e custo de serviço de várias configurações
+Varre número de árvores e profundidade do RandomForest (e, com --hgb, o
+HistGradientBoosting) e imprime uma tabela com a fronteira de Pareto
+entre F1, latência de uma linha e tamanho do artefato.
+"""
+
+import argparse
+import json
+import time
+from model.training.pipeline import FEATURE_COLUMNS, TrainingConfig
+from model.training.tuning import (
+    format_table, hist_gradient_boosting_candidates, random_forest_grid, run_sweep
+)
+
+
+def parse_int_list(value: str):
+    """Lista separada por vírgulas; 0 ou 'none' = sem limite de profundidade"""
+    return [None if item.strip().lower() in ("0", "none") else int(item) for item in value.split(",")]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Varredura de acurácia x latência do modelo")
+    parser.add_argument("--n-estimators", type=parse_int_list, default=[25, 50, 100, 200])
+    parser.add_argument("--max-depth", type=parse_int_list, default=[8, 12, 15, None])
+    parser.add_argument("--hgb", action="store_true", help="Inclui HistGradientBoostingClassifier")
+    parser.add_argument("--batch-size", type=int, default=256, help="Linhas do lote medido")
+    parser.add_argument("--repeats", type=int, default=200, help="Repetições por medida de latência")
+    parser.add_argument("--output", help="Salva o relatório completo em JSON")
+    return parser.parse_args()
+
+
+def main():
+    """Função principal"""
+    args = parse_args()
+    print("=" * 60)
+    print("📐 VARREDURA ACURÁCIA x LATÊNCIA")
+    print("=" * 60)
+
+    config = TrainingConfig()
+    candidates = random_forest_grid(args.n_estimators, args.max_depth, config.random_state)
+    if args.hgb:
+        candidates += hist_gradient_boosting_candidates(FEATURE_COLUMNS, config.random_state)
+
+    start = time.perf_counter()
+    reports = run_sweep(candidates, config, batch_size=args.batch_size, repeats=args.repeats)
+    print()
+    print(format_table(reports))
+    print()
+    print("★ = fronteira de Pareto (F1 x latência p99 de 1 linha x tamanho)")
+    print("Para publicar um candidato RF: python train_model.py --n-estimators N --max-depth D")
+    print(f"⏱️  {len(reports)} candidatos em {time.perf_counter() - start:.1f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                [{"name": r.name, "pareto": r.pareto, **r.metrics} for r in reports],
+                f, indent=2, ensure_ascii=False
+            )
+        print(f"💾 Relatório salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()